@@ -0,0 +1,52 @@
+"""Compares `Interpreter.decide` with `CompiledTree.decide` and `GeneratedTree.decide`.
+
+Run it from the repository root with `python -m benchmarks.compiled_tree`.
+"""
+from __future__ import print_function
+
+import timeit
+
+from craftai import Interpreter
+
+from tests.data import decision_trees
+
+ITERATIONS = 2000
+
+def compare(index, tree, decide_args):
+  compiled_tree = Interpreter.compile(tree)
+  generated_tree = Interpreter.generate_code(tree)
+
+  def run(decide):
+    for state, time in decide_args:
+      try:
+        decide(state, time)
+      except Exception: #pylint: disable=W0703
+        pass
+
+  interpreted = min(timeit.repeat(
+    lambda: run(lambda state, time: Interpreter.decide(tree, [state, time])),
+    number=1, repeat=3))
+  compiled = min(timeit.repeat(
+    lambda: run(compiled_tree.decide),
+    number=1, repeat=3))
+  generated = min(timeit.repeat(
+    lambda: run(generated_tree.decide),
+    number=1, repeat=3))
+  print("tree #{}: Interpreter.decide {:.2f}us/call, CompiledTree.decide {:.2f}us/call"
+        " (x{:.1f}), GeneratedTree.decide {:.2f}us/call (x{:.1f})".format(
+          index,
+          1e6 * interpreted / len(decide_args),
+          1e6 * compiled / len(decide_args),
+          interpreted / compiled,
+          1e6 * generated / len(decide_args),
+          interpreted / generated))
+
+def main():
+  trees = [decision_trees.random_tree(seed) for seed in range(10)]
+  decide_args = [decision_trees.random_decide_args(seed) for seed in range(ITERATIONS)]
+  decide_args = [(state, time) for state, time in decide_args if time is not None]
+  for index, tree in enumerate(trees):
+    compare(index, tree, decide_args)
+
+if __name__ == "__main__":
+  main()
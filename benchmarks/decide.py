@@ -0,0 +1,121 @@
+"""Compares the iterative traversal of `Interpreter.decide` with the former
+recursive one, and the cache hits of `CompiledTree.decide` with its
+decisions without cache, on random trees and on deep trees.
+
+Run it from the repository root with `python -m benchmarks.decide`.
+"""
+from __future__ import print_function
+
+import functools
+import timeit
+
+from craftai import Interpreter
+
+from tests.data import decision_trees
+
+#pylint: disable=W0212
+
+def recursive_decide(node, context):
+  """The former recursive traversal of `Interpreter.decide`."""
+  if not (node.get("children") is not None and len(node.get("children"))):
+    leaf = {
+      "predicted_value": node.get("predicted_value"),
+      "confidence": node.get("confidence") or 0,
+      "decision_rules": []
+    }
+    if node.get("standard_deviation", None) is not None:
+      leaf["standard_deviation"] = node.get("standard_deviation")
+    return leaf
+
+  matching_child = Interpreter._find_matching_child(node, context)
+  result = recursive_decide(matching_child, context)
+  new_predicates = [{
+    "property": matching_child["decision_rule"]["property"],
+    "operator": matching_child["decision_rule"]["operator"],
+    "operand": matching_child["decision_rule"]["operand"]
+  }]
+  final_result = {
+    "predicted_value": result["predicted_value"],
+    "confidence": result["confidence"],
+    "decision_rules": new_predicates + result["decision_rules"]
+  }
+  if result.get("standard_deviation", None) is not None:
+    final_result["standard_deviation"] = result.get("standard_deviation")
+  return final_result
+
+def decided_contexts(tree, decide_args):
+  compiled_tree = Interpreter.compile(tree)
+  contexts = []
+  for state, time in decide_args:
+    try:
+      compiled_tree.decide(state, time)
+      contexts.append(compiled_tree._build_context(state, time))
+    except Exception: #pylint: disable=W0703
+      pass
+  return contexts
+
+def compare(description, tree, contexts):
+  _, configuration, _ = Interpreter._parse_tree(tree)
+  roots = [tree["trees"][output] for output in configuration["output"]]
+
+  def run(decide, **kwargs):
+    for context in contexts:
+      for root in roots:
+        decide(root, context, **kwargs)
+
+  run(Interpreter._decide_tree)
+  recursive = min(timeit.repeat(lambda: run(recursive_decide), number=1, repeat=3))
+  iterative = min(timeit.repeat(lambda: run(Interpreter._decide_tree), number=1, repeat=3))
+  without_rules = min(timeit.repeat(lambda: run(Interpreter._decide_tree, with_rules=False),
+                                    number=1, repeat=3))
+  calls = len(contexts) * len(roots)
+  print("{}: recursive {:.2f}us/call, iterative {:.2f}us/call (x{:.1f}),"
+        " without rules {:.2f}us/call (x{:.1f})".format(
+          description,
+          1e6 * recursive / calls,
+          1e6 * iterative / calls,
+          recursive / iterative,
+          1e6 * without_rules / calls,
+          recursive / without_rules))
+
+def run_decisions(decide, decide_args, with_rules):
+  for state, time in decide_args:
+    decide(state, time, with_rules=with_rules)
+
+def compare_cache(description, tree, decide_args):
+  compiled_tree = Interpreter.compile(tree)
+  # Large enough for all the decisions to be cache hits once it is filled
+  cached_tree = Interpreter.compile(tree, cache_size=len(decide_args))
+
+  timings = []
+  for with_rules in [True, False]:
+    run_decisions(cached_tree.decide, decide_args, with_rules)
+    uncached = min(timeit.repeat(
+      functools.partial(run_decisions, compiled_tree.decide, decide_args, with_rules),
+      number=1, repeat=3))
+    cached = min(timeit.repeat(
+      functools.partial(run_decisions, cached_tree.decide, decide_args, with_rules),
+      number=1, repeat=3))
+    timings.extend([1e6 * uncached / len(decide_args), 1e6 * cached / len(decide_args),
+                    uncached / cached])
+  print("{}: no cache {:.2f}us/call, cache hits {:.2f}us/call (x{:.1f}), without rules"
+        " no cache {:.2f}us/call, cache hits {:.2f}us/call (x{:.1f})".format(
+          description, *timings))
+
+def main():
+  decide_args = [decision_trees.random_decide_args(seed) for seed in range(2000)]
+  for seed in range(5):
+    tree = decision_trees.random_tree(seed, max_depth=8)
+    contexts = decided_contexts(tree, decide_args)
+    compare("random tree #{}".format(seed), tree, contexts)
+    compare_cache("random tree #{}".format(seed), tree, [(context, None) for context in contexts])
+
+  # Staying below the default recursion limit for the recursive traversal
+  for depth in [10, 100, 800]:
+    tree = decision_trees.deep_tree(depth)
+    contexts = [{"lightIntensity": depth}] * 200
+    compare("{} deep tree".format(depth), tree, contexts)
+    compare_cache("{} deep tree".format(depth), tree, [(context, None) for context in contexts])
+
+if __name__ == "__main__":
+  main()
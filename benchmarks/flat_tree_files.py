@@ -0,0 +1,54 @@
+"""Compares the loading of decision trees saved as JSON and as flat trees.
+
+Run it from the repository root with `python -m benchmarks.flat_tree_files`.
+"""
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+from craftai import Interpreter
+
+from tests.data import decision_trees
+
+TREES_COUNT = 200
+
+def main():
+  directory = tempfile.mkdtemp()
+  try:
+    json_paths = []
+    flat_paths = []
+    for seed in range(TREES_COUNT):
+      tree = decision_trees.random_tree(seed)
+      json_paths.append(os.path.join(directory, "{}.json".format(seed)))
+      with open(json_paths[-1], "w") as json_file:
+        json.dump(tree, json_file)
+      flat_paths.append(os.path.join(directory, "{}.crft".format(seed)))
+      Interpreter.save_flat_tree(tree, flat_paths[-1])
+
+    def load_json_trees():
+      trees = []
+      for path in json_paths:
+        with open(path, "rb") as json_file:
+          trees.append(Interpreter.compile(Interpreter.load_tree(json_file.read())))
+      return trees
+
+    def load_flat_trees():
+      return [Interpreter.load_flat_tree_file(path) for path in flat_paths]
+
+    json_load = min(timeit.repeat(load_json_trees, number=1, repeat=3))
+    flat_load = min(timeit.repeat(load_flat_trees, number=1, repeat=3))
+    json_size = sum(os.path.getsize(path) for path in json_paths)
+    flat_size = sum(os.path.getsize(path) for path in flat_paths)
+    print("{} trees: JSON {:.1f}ms ({}KB), flat trees {:.1f}ms ({}KB) (x{:.1f})".format(
+      TREES_COUNT, 1e3 * json_load, json_size // 1024, 1e3 * flat_load, flat_size // 1024,
+      json_load / flat_load
+    ))
+  finally:
+    shutil.rmtree(directory)
+
+if __name__ == "__main__":
+  main()
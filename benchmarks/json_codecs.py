@@ -0,0 +1,43 @@
+"""Compares the available JSON codecs on operations chunks and decision trees.
+
+Run it from the repository root with `python -m benchmarks.json_codecs`.
+"""
+from __future__ import print_function
+
+import json
+import os
+import timeit
+
+from craftai import json_codec
+from craftai.helpers import chunker
+
+from tests.data import decision_trees
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+def main():
+  with open(os.path.join(HERE, "..", "tests", "data", "large_operation_list.json")) as f:
+    operations = json.load(f)
+  # Like `add_operations`, the operations are sent by chunks of 200
+  chunks = [chunk for _, chunk in chunker(operations * 20, 200)]
+  trees = [decision_trees.random_tree(seed, max_depth=7) for seed in range(10)]
+  payloads = [
+    ("{} chunks of 200 operations".format(len(chunks)), chunks),
+    ("{} trees of {:.0f}KB on average".format(
+      len(trees), sum(len(json.dumps(tree)) for tree in trees) / len(trees) / 1024.
+    ), trees)
+  ]
+
+  for description, payload in payloads:
+    print(description)
+    for name in json_codec.available_codecs():
+      codec = json_codec.get_codec(name)
+      serialized = [codec.dumps(item) for item in payload]
+      dumps = min(timeit.repeat(lambda: [codec.dumps(item) for item in payload],
+                                number=1, repeat=5))
+      loads = min(timeit.repeat(lambda: [codec.loads(item) for item in serialized],
+                                number=1, repeat=5))
+      print("  {:<10} dumps {:8.2f}ms, loads {:8.2f}ms".format(name, 1e3 * dumps, 1e3 * loads))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,107 @@
+"""Compares the conversion of a `DataFrame` to operations, as done by
+`craftai.pandas.Client.add_operations`, with the former `iterrows` one, and
+the construction of a `DataFrame` from pages of operations, as done by
+`craftai.pandas.Client.get_operations_list`, with the former one.
+
+Run it from the repository root with `python -m benchmarks.pandas_operations`.
+"""
+from __future__ import print_function
+
+import json
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from craftai.pandas.operations import ColumnarFrameBuilder, operations_chunks
+
+ROWS_COUNT = 1000 * 1000
+COLUMNS_COUNT = 20
+# The former conversion is too slow to run on the whole frame
+ITERROWS_ROWS_COUNT = 20 * 1000
+CHUNK_SIZE = 200
+
+def iterrows_operations_chunks(df, chunk_size):
+  for offset in range(0, len(df.index), chunk_size):
+    chunk = df.iloc[offset:offset + chunk_size]
+    yield offset, [
+      {
+        "timestamp": row.name.value // 10 ** 9,
+        "context": {col: row[col] for col in df.columns if pd.notnull(row[col])}
+      } for _, row in chunk.iterrows()
+    ]
+
+def random_df():
+  #pylint: disable=E1101
+  rng = np.random.RandomState(0)
+  #pylint: enable=E1101
+  columns = {}
+  for index in range(COLUMNS_COUNT):
+    if index % 4 == 0:
+      columns["e{}".format(index)] = rng.choice(["CYAN", "MAGENTA", "YELLOW", "BLACK"], ROWS_COUNT)
+    else:
+      values = rng.randn(ROWS_COUNT)
+      values[rng.rand(ROWS_COUNT) < 0.1] = np.nan
+      columns["c{}".format(index)] = values
+  return pd.DataFrame(columns,
+                      index=pd.date_range("2016-01-01", periods=ROWS_COUNT, freq="1min",
+                                          tz="Europe/Paris"))
+
+HISTORY_PAGES_COUNT = 1000
+PAGE_SIZE = 500
+
+def history_pages(df):
+  """Simulates the retrieval of pages of operations, parsed one at a time."""
+  configuration = {"context": {
+    col: {"type": "enum" if col.startswith("e") else "continuous"} for col in df.columns
+  }}
+  pages = [page for _, page in operations_chunks(df.iloc[:PAGE_SIZE], PAGE_SIZE)]
+  return configuration, (json.loads(json.dumps(pages[0])) for _ in range(HISTORY_PAGES_COUNT))
+
+# Same signature as `columnar_to_df`, the configuration isn't needed here
+def list_to_df(configuration, pages): #pylint: disable=W0613
+  operations = [operation for page in pages for operation in page]
+  return pd.DataFrame(
+    [operation["context"] for operation in operations],
+    index=pd.to_datetime([operation["timestamp"] for operation in operations], unit="s")
+  )
+
+def columnar_to_df(configuration, pages):
+  frame_builder = ColumnarFrameBuilder(configuration)
+  for page in pages:
+    frame_builder.add_page(page)
+  return frame_builder.to_df()
+
+def measure_construction(to_df, df):
+  duration = min(timeit.repeat(lambda: to_df(*history_pages(df)), number=1, repeat=1))
+  # Tracing the allocations slows the construction down, it is measured apart
+  tracemalloc.start()
+  to_df(*history_pages(df))
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return duration, peak
+
+def main():
+  df = random_df()
+
+  def convert(to_chunks, frame):
+    for _ in to_chunks(frame, CHUNK_SIZE):
+      pass
+
+  columnar = min(timeit.repeat(lambda: convert(operations_chunks, df), number=1, repeat=3))
+  iterrows = min(timeit.repeat(lambda: convert(iterrows_operations_chunks,
+                                               df.iloc[:ITERROWS_ROWS_COUNT]),
+                               number=1, repeat=1))
+  iterrows = iterrows * ROWS_COUNT / ITERROWS_ROWS_COUNT
+  print("{} rows x {} columns: column-wise {:.1f}s, iterrows {:.1f}s (extrapolated"
+        " from {} rows, x{:.0f})".format(ROWS_COUNT, COLUMNS_COUNT, columnar, iterrows,
+                                         ITERROWS_ROWS_COUNT, iterrows / columnar))
+
+  print("{} pages of {} operations:".format(HISTORY_PAGES_COUNT, PAGE_SIZE))
+  for name, to_df in [("list of dicts", list_to_df), ("columnar", columnar_to_df)]:
+    duration, peak = measure_construction(to_df, df)
+    print("  {:<13} {:.1f}s, peak memory {:.0f}MB".format(name, duration, peak / 1024. ** 2))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,11 @@
+from .. import errors, Interpreter, Time
+from .client import Client
+
+# Defining what will be imported when doing `from craftai.aio import *`
+
+__all__ = [
+  "Client",
+  "errors",
+  "Interpreter",
+  "Time"
+]
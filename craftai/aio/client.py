@@ -0,0 +1,441 @@
+import asyncio
+import weakref
+
+import aiohttp #pylint: disable=E0401
+
+from .. import helpers, json_codec
+from ..client import USER_AGENT, check_agent_id, complete_config, current_time_ms
+from ..client import compress_body, decision_tree_retrieval_delay, decode_response
+from ..errors import CraftAiBadRequestError, CraftAiError, CraftAiInternalError
+from ..errors import CraftAiLongRequestTimeOutError, CraftAiOperationsAdditionError
+from ..interpreter import Interpreter
+from .single_flight import SingleFlight
+
+class Client(object): #pylint: disable=R0902
+  """Asynchronous client class for craft ai's API, based on asyncio.
+
+  Its configuration and methods are the same as `craftai.Client` but every
+  method doing a request is a coroutine and the paginated routes are read
+  with asynchronous iterators.
+  """
+
+  def __init__(self, cfg):
+    self._base_url = ""
+    self._headers = {}
+    self._config = {}
+    self._session = None
+    self._json_codec = None
+    self._stale_sessions = []
+    # Dropped once no addition of operations holds them
+    self._agents_locks = weakref.WeakValueDictionary()
+    self._decision_tree_flights = SingleFlight()
+
+    self.config = cfg
+
+  @property
+  def config(self):
+    return self._config
+
+  @config.setter
+  def config(self, cfg):
+    cfg = complete_config(cfg)
+    self._config = cfg
+
+    self._base_url = "{}/api/v1/{}/{}".format(self.config["url"],
+                                              self.config["owner"],
+                                              self.config["project"])
+
+    self._headers = {}
+    self._headers["Authorization"] = "Bearer " + self.config.get("token")
+    self._headers["User-Agent"] = USER_AGENT
+    self._headers["Accept-Encoding"] = "gzip, deflate"
+
+    self._json_codec = json_codec.get_codec(self.config["jsonCodec"])
+
+    # The session is created lazily, in the running event loop, the previous
+    # one is closed by `close`
+    if self._session is not None:
+      self._stale_sessions.append(self._session)
+      self._session = None
+
+  async def close(self):
+    """Closes the connections kept alive by the client."""
+    sessions = self._stale_sessions + [self._session]
+    self._stale_sessions = []
+    self._session = None
+    for session in sessions:
+      if session is not None:
+        await session.close()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback):
+    await self.close()
+
+  def _get_session(self):
+    if self._session is None:
+      connector = aiohttp.TCPConnector(
+        limit_per_host=max(self.config["poolMaxSize"],
+                           self.config["operationsAdditionConcurrency"])
+      )
+      timeout = self.config["requestTimeout"]
+      self._session = aiohttp.ClientSession(
+        connector=connector,
+        headers=self._headers,
+        timeout=aiohttp.ClientTimeout(total=None if timeout is None else timeout / 1000.)
+      )
+    return self._session
+
+  async def _request(self, method, url, params=None, **kwargs):
+    """Sends a request and returns its status, headers and parsed body.
+
+    Like the requests adapter of `craftai.Client`, connections that can't be
+    established are retried up to `maxRetries` times.
+    """
+    if params is not None:
+      params = {key: value for key, value in params.items() if value is not None}
+    if kwargs.get("data") is not None:
+      kwargs["data"], encoding = compress_body(self.config, kwargs["data"])
+      if encoding is not None:
+        kwargs["headers"] = helpers.join_dicts(kwargs.get("headers", {}),
+                                               {"Content-Encoding": encoding})
+
+    retries = self.config["maxRetries"]
+    while True:
+      try:
+        async with self._get_session().request(method, url, params=params, **kwargs) as resp:
+          body = await resp.read()
+          decoded_body = self._decode_response(resp.status, body, resp.headers)
+          return resp.status, resp.headers, decoded_body
+      except aiohttp.ClientConnectorError:
+        if retries <= 0:
+          raise
+        retries -= 1
+
+  #################
+  # Agent methods #
+  #################
+
+  async def create_agent(self, configuration, agent_id=""):
+    # Building payload and checking that it is valid for a JSON
+    # serialization
+    payload = {"configuration": configuration}
+
+    if agent_id != "":
+      # Raises an error when agent_id is invalid
+      check_agent_id(agent_id)
+
+      payload["id"] = agent_id
+
+    try:
+      json_pl = self._json_codec.dumps(payload)
+    except json_codec.DUMPS_ERRORS as e:
+      raise CraftAiBadRequestError("Invalid configuration or agent id given. {}"
+                                   .format(e.__str__()))
+
+    req_url = "{}/agents".format(self._base_url)
+    _, _, agent = await self._request("POST", req_url, data=json_pl, headers={
+      "Content-Type": "application/json; charset=utf-8"
+    })
+
+    return agent
+
+  async def get_agent(self, agent_id):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}".format(self._base_url, agent_id)
+    _, _, agent = await self._request("GET", req_url)
+
+    return agent
+
+  async def list_agents(self):
+    req_url = "{}/agents".format(self._base_url)
+    _, _, agents = await self._request("GET", req_url)
+
+    return agents["agentsList"]
+
+  async def delete_agent(self, agent_id):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}".format(self._base_url, agent_id)
+    _, _, decoded_resp = await self._request("DELETE", req_url)
+
+    return decoded_resp
+
+  async def get_shared_agent_inspector_url(self, agent_id, timestamp=None):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}/shared".format(self._base_url, agent_id)
+    _, _, url = await self._request("GET", req_url)
+
+    if timestamp != None:
+      return "{}?t={}".format(url["shortUrl"], str(timestamp))
+
+    return url["shortUrl"]
+
+  async def delete_shared_agent_inspector_url(self, agent_id):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}/shared".format(self._base_url, agent_id)
+    _, _, decoded_resp = await self._request("DELETE", req_url)
+
+    return decoded_resp
+
+  ###################
+  # Context methods #
+  ###################
+
+  async def add_operations(self, agent_id, operations):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    chunks = helpers.chunker(operations, self.config["operationsChunksSize"])
+    chunks_report = await self._add_operations_chunks([(agent_id, chunks)])
+
+    result = {
+      "message": "Successfully added %i operation(s) to the agent \"%s/%s/%s\" context."
+                 % (len(operations), self.config["owner"], self.config["project"], agent_id)
+    }
+    if chunks_report is not None:
+      result["chunks"] = chunks_report
+    return result
+
+  async def add_agents_operations(self, agents_operations):
+    """Adds operations to several agents, given as a dictionary of lists of
+    operations indexed by agent id."""
+    for agent_id in agents_operations:
+      # Raises an error when agent_id is invalid
+      check_agent_id(agent_id)
+
+    chunks_report = await self._add_operations_chunks([
+      (agent_id, helpers.chunker(operations, self.config["operationsChunksSize"]))
+      for agent_id, operations in agents_operations.items()
+    ])
+
+    result = {
+      "message": "Successfully added %i operation(s) to %i agent(s) of \"%s/%s\"."
+                 % (sum(len(operations) for operations in agents_operations.values()),
+                    len(agents_operations), self.config["owner"], self.config["project"])
+    }
+    if chunks_report is not None:
+      result["chunks"] = chunks_report
+    return result
+
+  async def _add_operations_chunks(self, agents_chunks):
+    """Sends the given chunks of operations, see
+    `craftai.Client._add_operations_chunks`."""
+    concurrency = self.config["operationsAdditionConcurrency"]
+    if concurrency == 1:
+      for agent_id, chunks in agents_chunks:
+        for _, operations in chunks:
+          await self._post_operations(agent_id, operations)
+      return None
+
+    semaphore = asyncio.Semaphore(concurrency)
+    if self.config["operationsAdditionOrdered"]:
+      # Each agent's chunks are sent in order by a single task
+      agents_reports = await asyncio.gather(*[
+        self._add_ordered_operations_chunks(semaphore, agent_id, chunks)
+        for agent_id, chunks in agents_chunks
+      ])
+      chunks_report = [chunk for report in agents_reports for chunk in report]
+    else:
+      tasks = []
+      for agent_id, chunks in agents_chunks:
+        for offset, operations in chunks:
+          # Bounding the chunks in flight, to avoid building them all upfront
+          await semaphore.acquire()
+          task = asyncio.ensure_future(self._add_operations_chunk(agent_id, offset, operations))
+          task.add_done_callback(lambda _: semaphore.release())
+          tasks.append(task)
+      chunks_report = await asyncio.gather(*tasks)
+
+    failed_chunks = [chunk for chunk in chunks_report if chunk["status"] != "success"]
+    if failed_chunks:
+      raise CraftAiOperationsAdditionError(
+        "%i chunk(s) out of %i were not added, the first error being: %s"
+        % (len(failed_chunks), len(chunks_report), failed_chunks[0]["error"]),
+        chunks_report
+      )
+    return chunks_report
+
+  async def _add_ordered_operations_chunks(self, semaphore, agent_id, chunks):
+    chunks_report = []
+    lock = self._agents_locks.get(agent_id)
+    if lock is None:
+      lock = asyncio.Lock()
+      self._agents_locks[agent_id] = lock
+    async with semaphore, lock:
+      for offset, operations in chunks:
+        if chunks_report and chunks_report[-1]["status"] != "success":
+          # Once a chunk failed, the following ones are not sent to keep the
+          # operations in order
+          chunks_report.append({
+            "agent_id": agent_id,
+            "offset": offset,
+            "count": len(operations),
+            "status": "skipped",
+            "error": None,
+            "operations": operations
+          })
+        else:
+          chunks_report.append(await self._add_operations_chunk(agent_id, offset, operations))
+    return chunks_report
+
+  async def _add_operations_chunk(self, agent_id, offset, operations):
+    chunk_report = {
+      "agent_id": agent_id,
+      "offset": offset,
+      "count": len(operations),
+      "status": "success",
+      "error": None
+    }
+    try:
+      await self._post_operations(agent_id, operations)
+    except (CraftAiError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+      chunk_report["status"] = "error"
+      chunk_report["error"] = e
+      chunk_report["operations"] = operations
+    return chunk_report
+
+  async def _post_operations(self, agent_id, operations):
+    try:
+      json_pl = self._json_codec.dumps(operations)
+    except json_codec.DUMPS_ERRORS as e:
+      raise CraftAiBadRequestError("Invalid configuration or agent id given. {}"
+                                   .format(e.__str__()))
+
+    req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
+    _, _, decoded_resp = await self._request("POST", req_url, data=json_pl, headers={
+      "Content-Type": "application/json; charset=utf-8"
+    })
+
+    return decoded_resp
+
+  async def _iter_pages(self, url, params=None):
+    """Yields the successive pages of a paginated route."""
+    while url is not None:
+      _, headers, page = await self._request("GET", url, params=params)
+
+      yield page
+
+      # The next page url already includes the query parameters
+      url = headers.get("x-craft-ai-next-page-url")
+      params = None
+
+  @staticmethod
+  async def _iter_pages_items(pages):
+    async for page in pages:
+      for item in page:
+        yield item
+
+  def iter_operations_pages(self, agent_id, start=None, end=None):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
+    req_params = {
+      "start": start,
+      "end": end
+    }
+
+    return self._iter_pages(req_url, req_params)
+
+  def iter_operations(self, agent_id, start=None, end=None):
+    return self._iter_pages_items(self.iter_operations_pages(agent_id, start, end))
+
+  async def get_operations_list(self, agent_id, start=None, end=None):
+    return [operation async for operation in self.iter_operations(agent_id, start, end)]
+
+  def iter_state_history_pages(self, agent_id, start=None, end=None):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}/context/state/history".format(self._base_url, agent_id)
+    req_params = {
+      "start": start,
+      "end": end
+    }
+
+    return self._iter_pages(req_url, req_params)
+
+  def iter_state_history(self, agent_id, start=None, end=None):
+    return self._iter_pages_items(self.iter_state_history_pages(agent_id, start, end))
+
+  async def get_state_history(self, agent_id, start=None, end=None):
+    return [state async for state in self.iter_state_history(agent_id, start, end)]
+
+  async def get_context_state(self, agent_id, timestamp):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    req_url = "{}/agents/{}/context/state?t={}".format(self._base_url,
+                                                       agent_id,
+                                                       timestamp)
+    _, _, context_state = await self._request("GET", req_url)
+
+    return context_state
+
+  #########################
+  # Decision tree methods #
+  #########################
+
+  async def _get_decision_tree(self, agent_id, timestamp):
+    req_url = "{}/agents/{}/decision/tree?t={}".format(self._base_url,
+                                                       agent_id,
+                                                       timestamp)
+    _, _, decision_tree = await self._request("GET", req_url)
+
+    return decision_tree
+
+  async def get_decision_tree(self, agent_id, timestamp):
+    # Raises an error when agent_id is invalid
+    check_agent_id(agent_id)
+
+    # Concurrent retrievals of the same tree are done once, the tree is shared
+    # between their callers, it must not be modified
+    key = (self.config["owner"], self.config["project"], agent_id, timestamp)
+    return await self._decision_tree_flights.run(key,
+                                                 self._poll_decision_tree,
+                                                 agent_id,
+                                                 timestamp)
+
+  async def _poll_decision_tree(self, agent_id, timestamp):
+    timeout = self._config["decisionTreeRetrievalTimeout"]
+    if timeout is False:
+      # Don't retry
+      return await self._get_decision_tree(agent_id, timestamp)
+
+    start = current_time_ms()
+    attempt = 0
+    while True:
+      try:
+        return await self._get_decision_tree(agent_id, timestamp)
+      except CraftAiLongRequestTimeOutError as e:
+        remaining = timeout - (current_time_ms() - start)
+        if remaining <= 0:
+          # Client side timeout
+          raise CraftAiLongRequestTimeOutError()
+        delay = decision_tree_retrieval_delay(self._config, attempt, e.retry_after)
+        await asyncio.sleep(min(delay, remaining / 1000.))
+        attempt += 1
+
+  @staticmethod
+  def decide(tree, *args, **kwargs):
+    return Interpreter.decide(tree, args, **kwargs)
+
+  def _parse_body(self, body):
+    try:
+      return self._json_codec.loads(body)
+    except:
+      raise CraftAiInternalError(
+        "Internal Error, the craft ai server responded in an invalid format."
+      )
+
+  def _decode_response(self, status_code, body, headers):
+    return decode_response(status_code, lambda: self._parse_body(body), headers)
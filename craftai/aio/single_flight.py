@@ -0,0 +1,22 @@
+import asyncio
+
+class SingleFlight(object): #pylint: disable=R0903
+  """Deduplicates concurrent coroutines sharing the same key.
+
+  The first caller runs the coroutine function in a task that the others,
+  calling `run` with the same key before it is done, wait for as well. The task
+  is not cancelled with its callers.
+  """
+  def __init__(self):
+    self._calls = {}
+
+  async def run(self, key, coroutine_function, *args):
+    call = self._calls.get(key)
+    if call is None:
+      call = self._calls[key] = asyncio.ensure_future(coroutine_function(*args))
+      call.add_done_callback(lambda _: self._forget(key, call))
+    return await asyncio.shield(call)
+
+  def _forget(self, key, call):
+    if self._calls.get(key) is call:
+      del self._calls[key]
@@ -0,0 +1,157 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+# Marks the keys missing from a cache
+_MISSING = object()
+
+class DecisionTreeCache(object): #pylint: disable=R0902
+  """Thread safe cache of decision trees.
+
+  Trees are indexed by agent and by bucket of `time_bucket` seconds of their
+  timestamp. The least recently used trees are evicted once the size of the
+  cached trees, in bytes, exceeds `max_size`, and trees older than `ttl`
+  milliseconds expire.
+
+  Trees retrieved while their agent is invalidated are not cached: `put` is
+  given the agent's `generation`, read before the retrieval.
+  """
+  def __init__(self, max_size, ttl, time_bucket):
+    self.max_size = max_size
+    self.ttl = ttl
+    self.time_bucket = time_bucket
+    self.size = 0
+    self._entries = OrderedDict()
+    self._agents_keys = {}
+    self._agents_generations = {}
+    self._lock = threading.Lock()
+    self._stats = {
+      "hits": 0,
+      "misses": 0,
+      "evictions": 0,
+      "expirations": 0,
+      "invalidations": 0
+    }
+
+  @property
+  def stats(self):
+    with self._lock:
+      stats = self._stats.copy()
+      stats["count"] = len(self._entries)
+      stats["size"] = self.size
+      return stats
+
+  def key(self, owner, project, agent_id, timestamp):
+    """Returns the key of the agent's tree at the given timestamp, `None` when
+    the timestamp isn't a number and the tree can't be cached."""
+    try:
+      return (owner, project, agent_id, int(timestamp) // self.time_bucket)
+    except (TypeError, ValueError, OverflowError):
+      return None
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and time.time() - entry[2] > self.ttl / 1000.:
+        self._remove(key)
+        self._stats["expirations"] += 1
+        entry = None
+      if entry is None:
+        self._stats["misses"] += 1
+        return None
+      self._stats["hits"] += 1
+      # Marking the tree as the most recently used
+      self._entries[key] = self._entries.pop(key)
+      return entry[0]
+
+  def generation(self, owner, project, agent_id):
+    with self._lock:
+      return self._agents_generations.get((owner, project, agent_id), 0)
+
+  def put(self, key, tree, size, generation=0):
+    if size > self.max_size:
+      # Would evict every other tree without fitting anyway
+      return
+    with self._lock:
+      if self._agents_generations.get(key[:3], 0) != generation:
+        return
+      if key in self._entries:
+        self._remove(key)
+      self._entries[key] = (tree, size, time.time())
+      self._agents_keys.setdefault(key[:3], set()).add(key)
+      self.size += size
+      while self.size > self.max_size:
+        self._remove(next(iter(self._entries)))
+        self._stats["evictions"] += 1
+
+  def invalidate(self, owner, project, agent_id):
+    """Removes the cached trees of an agent."""
+    with self._lock:
+      agent = (owner, project, agent_id)
+      self._agents_generations[agent] = self._agents_generations.get(agent, 0) + 1
+      for key in list(self._agents_keys.get(agent, [])):
+        self._remove(key)
+        self._stats["invalidations"] += 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._agents_keys.clear()
+      self.size = 0
+
+  def _remove(self, key):
+    _, size, _ = self._entries.pop(key)
+    self.size -= size
+    agent_keys = self._agents_keys[key[:3]]
+    agent_keys.discard(key)
+    if not agent_keys:
+      del self._agents_keys[key[:3]]
+
+class LruCache(object):
+  """Thread safe LRU cache of up to `max_size` values, by hashable key."""
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+    self._stats = {
+      "hits": 0,
+      "misses": 0,
+      "evictions": 0
+    }
+
+  @property
+  def stats(self):
+    """Returns the hits, misses, evictions, count and hit rate of the cache."""
+    with self._lock:
+      stats = self._stats.copy()
+      stats["count"] = len(self._entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = float(stats["hits"]) / lookups if lookups else 0.
+    return stats
+
+  def get(self, key, compute):
+    """Returns the value cached for `key`, computed by `compute()` if it
+    isn't cached. Values are not cached when `compute` raises."""
+    with self._lock:
+      value = self._entries.pop(key, _MISSING)
+      if value is not _MISSING:
+        self._stats["hits"] += 1
+        # Marking the value as the most recently used
+        self._entries[key] = value
+        return value
+
+    value = compute()
+
+    with self._lock:
+      self._stats["misses"] += 1
+      self._entries[key] = value
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+        self._stats["evictions"] += 1
+    return value
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._stats = dict.fromkeys(self._stats, 0)
@@ -2,20 +2,30 @@
 # cf. https://stackoverflow.com/a/28854227
 from __future__ import absolute_import
 
-import json
+import random
+import threading
 import time
+import weakref
+import zlib
 
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import mktime_tz, parsedate_tz
 from platform import python_implementation, python_version
 
 import requests
 import six
 
-from craftai import helpers, __version__ as pkg_version
+from requests.adapters import HTTPAdapter #pylint: disable=C0412
+
+from craftai import helpers, json_codec, __version__ as pkg_version
+from craftai.cache import DecisionTreeCache
 from craftai.constants import AGENT_ID_PATTERN
 from craftai.errors import CraftAiCredentialsError, CraftAiBadRequestError, CraftAiNotFoundError
 from craftai.errors import CraftAiUnknownError, CraftAiInternalError, CraftAiLongRequestTimeOutError
+from craftai.errors import CraftAiError, CraftAiOperationsAdditionError
 from craftai.interpreter import Interpreter
 from craftai.jwt_decode import jwt_decode
+from craftai.single_flight import SingleFlight
 
 USER_AGENT = "craft-ai-client-python/{} [{} {}]".format(pkg_version,
                                                         python_implementation(),
@@ -24,13 +34,194 @@ USER_AGENT = "craft-ai-client-python/{} [{} {}]".format(pkg_version,
 def current_time_ms():
   return int(round(time.time() * 1000))
 
-class CraftAIClient(object):
+# `(key, default, minimum, maximum)` of the integer settings, the invalid or
+# out of bounds values are replaced by the default
+_INTEGER_SETTINGS = [
+  ("operationsChunksSize", 200, None, None),
+  ("decisionTreeRetrievalInitialDelay", 200, None, None),
+  ("decisionTreeRetrievalMaxDelay", 1000 * 10, None, None), # 10 seconds
+  ("decisionTreeCacheMaxSize", 0, None, None), # No cache
+  ("decisionTreeCacheTtl", 1000 * 60, None, None), # 1 minute
+  ("decisionTreeCacheTimeBucket", 1, 1, None), # 1 second
+  ("operationsAdditionConcurrency", 1, 1, None), # Sequential
+  ("poolConnections", 10, None, None),
+  ("poolMaxSize", 10, None, None),
+  ("maxRetries", 0, None, None),
+  ("requestTimeout", None, None, None), # No timeout
+  ("requestCompressionLevel", 6, 0, 9),
+  ("requestCompressionThreshold", 1024, None, None) # 1 KB
+]
+
+def _complete_credentials(cfg, payload):
+  cfg["owner"] = cfg["owner"] if "owner" in cfg else payload.get("owner")
+  cfg["project"] = cfg["project"] if "project" in cfg else payload.get("project")
+  cfg["url"] = cfg["url"] if "url" in cfg else payload.get("platform")
+
+  if not isinstance(cfg.get("project"), six.string_types):
+    raise CraftAiCredentialsError("""Unable to create client with no"""
+                                  """ or invalid project provided.""")
+  else:
+    splitted_project = cfg.get("project").split("/")
+    if len(splitted_project) == 2:
+      cfg["owner"] = splitted_project[0]
+      cfg["project"] = splitted_project[1]
+    elif len(splitted_project) > 2:
+      raise CraftAiCredentialsError("""Unable to create client with invalid"""
+                                    """ project name.""")
+  if not isinstance(cfg.get("owner"), six.string_types):
+    raise CraftAiCredentialsError("""Unable to create client with no"""
+                                  """ or invalid owner provided.""")
+
+def _complete_integer_settings(cfg):
+  for key, default, minimum, maximum in _INTEGER_SETTINGS:
+    value = cfg.get(key)
+    if (not isinstance(value, six.integer_types) or
+        (minimum is not None and value < minimum) or
+        (maximum is not None and value > maximum)):
+      cfg[key] = default
+
+def complete_config(cfg):
+  """Returns a copy of the given configuration checked and completed with
+  the token's payload and the default values."""
+  cfg = cfg.copy()
+  (payload, _, _, _) = jwt_decode(cfg.get("token"))
+  _complete_credentials(cfg, payload)
+
+  _complete_integer_settings(cfg)
+  if (cfg.get("decisionTreeRetrievalTimeout") is not False and
+      not isinstance(cfg.get("decisionTreeRetrievalTimeout"), six.integer_types)):
+    cfg["decisionTreeRetrievalTimeout"] = 1000 * 60 * 5 # 5 minutes
+  if not isinstance(cfg.get("operationsAdditionOrdered"), bool):
+    cfg["operationsAdditionOrdered"] = False
+  if cfg.get("requestCompression") is None:
+    cfg["requestCompression"] = None # No compression
+  elif cfg["requestCompression"] not in ["gzip", "deflate"]:
+    raise CraftAiBadRequestError("""Unable to create client with invalid"""
+                                 """ request compression provided, it"""
+                                 """ should be "gzip" or "deflate".""")
+  if cfg.get("jsonCodec") is None:
+    cfg["jsonCodec"] = "auto"
+  if not isinstance(cfg.get("url"), six.string_types):
+    cfg["url"] = "https://beta.craft.ai"
+  if cfg.get("url").endswith("/"):
+    raise CraftAiBadRequestError("""Unable to create client with"""
+                                 """ invalid url provided. The url"""
+                                 """ should not terminate with a"""
+                                 """ slash.""")
+  return cfg
+
+def check_agent_id(agent_id):
+  """Checks that the given agent_id is a valid non-empty string.
+
+  Raises an error if the given agent_id is not of type string or if it is
+  an empty string.
+  """
+  if (not isinstance(agent_id, six.string_types) or
+      AGENT_ID_PATTERN.match(agent_id) is None):
+    raise CraftAiBadRequestError("""Invalid agent id given."""
+                                 """It must be a string containaing only"""
+                                 """characters in \"a-zA-Z0-9_-\""""
+                                 """and must be between 1 and 36 characters.""")
+
+def compress_body(cfg, body):
+  """Compresses a request body according to the `requestCompression`
+  configuration, if it is larger than `requestCompressionThreshold` bytes.
+
+  Returns the body and its content encoding, `None` if it wasn't compressed.
+  """
+  if isinstance(body, six.text_type):
+    body = body.encode("utf-8")
+  encoding = cfg["requestCompression"]
+  if encoding is None or len(body) < cfg["requestCompressionThreshold"]:
+    return body, None
+  if encoding == "gzip":
+    compressor = zlib.compressobj(cfg["requestCompressionLevel"],
+                                  zlib.DEFLATED,
+                                  16 + zlib.MAX_WBITS) # gzip header and trailer
+  else:
+    compressor = zlib.compressobj(cfg["requestCompressionLevel"])
+  return compressor.compress(body) + compressor.flush(), encoding
+
+def retry_after_seconds(headers):
+  """Parses the `Retry-After` header, given as seconds or as an HTTP date."""
+  value = headers.get("Retry-After") if headers is not None else None
+  if value is None:
+    return None
+  try:
+    return max(0., float(value))
+  except ValueError:
+    date = parsedate_tz(value)
+    if date is None:
+      return None
+    return max(0., mktime_tz(date) - time.time())
+
+def decision_tree_retrieval_delay(cfg, attempt, retry_after=None):
+  """Returns the delay, in seconds, before retrying to retrieve a decision
+  tree that is still being computed.
+
+  The delay grows exponentially with the attempts, up to
+  `decisionTreeRetrievalMaxDelay`, and is randomized over the whole interval
+  so that waiting clients don't poll in sync. A `Retry-After` hint sent by the
+  API takes precedence.
+  """
+  if retry_after is not None:
+    return retry_after
+  max_delay = min(cfg["decisionTreeRetrievalMaxDelay"],
+                  cfg["decisionTreeRetrievalInitialDelay"] * 2 ** attempt)
+  return random.uniform(0, max_delay) / 1000.
+
+def decode_response(status_code, parse_body, headers=None):
+  """Returns the body of a response, parsed by calling `parse_body`, or
+  raises the error matching its status code."""
+  if status_code == 200 or status_code == 201 or status_code == 204:
+    return parse_body()
+  if status_code == 202:
+    raise CraftAiLongRequestTimeOutError(parse_body()["message"],
+                                         retry_after_seconds(headers))
+  if status_code == 401 or status_code == 403:
+    raise CraftAiCredentialsError(parse_body()["message"])
+  if status_code == 400:
+    raise CraftAiBadRequestError(parse_body()["message"])
+  if status_code == 404:
+    raise CraftAiNotFoundError(parse_body()["message"])
+  if status_code == 413:
+    raise CraftAiBadRequestError("Given payload is too large")
+  if status_code == 500:
+    raise CraftAiInternalError(parse_body()["message"])
+  if status_code == 504:
+    raise CraftAiBadRequestError("Request has timed out")
+
+  raise CraftAiUnknownError(parse_body()["message"])
+
+class _AgentLock(object): #pylint: disable=R0903
+  """Lock of the operations of an agent, weakly referenced by the client so
+  that it is dropped once no addition of operations holds it."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+
+  def __enter__(self):
+    self._lock.acquire()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self._lock.release()
+
+class CraftAIClient(object): #pylint: disable=R0902,R0904
   """Client class for craft ai's API"""
 
   def __init__(self, cfg):
     self._base_url = ""
     self._headers = {}
     self._config = {}
+    self._session = None
+    self._json_codec = None
+    self._agents_locks = weakref.WeakValueDictionary()
+    self._agents_locks_lock = threading.Lock()
+    self._executor = None
+    self._executor_lock = threading.Lock()
+    self._decision_tree_cache = None
+    self._decision_tree_flights = SingleFlight()
 
     try:
       self.config = cfg
@@ -43,38 +234,7 @@ class CraftAIClient(object):
 
   @config.setter
   def config(self, cfg):
-    cfg = cfg.copy()
-    (payload, _, _, _) = jwt_decode(cfg.get("token"))
-    cfg["owner"] = cfg["owner"] if "owner" in cfg else payload.get("owner")
-    cfg["project"] = cfg["project"] if "project" in cfg else payload.get("project")
-    cfg["url"] = cfg["url"] if "url" in cfg else payload.get("platform")
-
-    if not isinstance(cfg.get("project"), six.string_types):
-      raise CraftAiCredentialsError("""Unable to create client with no"""
-                                    """ or invalid project provided.""")
-    else:
-      splitted_project = cfg.get("project").split("/")
-      if len(splitted_project) == 2:
-        cfg["owner"] = splitted_project[0]
-        cfg["project"] = splitted_project[1]
-      elif len(splitted_project) > 2:
-        raise CraftAiCredentialsError("""Unable to create client with invalid"""
-                                      """ project name.""")
-    if not isinstance(cfg.get("owner"), six.string_types):
-      raise CraftAiCredentialsError("""Unable to create client with no"""
-                                    """ or invalid owner provided.""")
-    if not isinstance(cfg.get("operationsChunksSize"), six.integer_types):
-      cfg["operationsChunksSize"] = 200
-    if (cfg.get("decisionTreeRetrievalTimeout") is not False and
-        not isinstance(cfg.get("decisionTreeRetrievalTimeout"), six.integer_types)):
-      cfg["decisionTreeRetrievalTimeout"] = 1000 * 60 * 5 # 5 minutes
-    if not isinstance(cfg.get("url"), six.string_types):
-      cfg["url"] = "https://beta.craft.ai"
-    if cfg.get("url").endswith("/"):
-      raise CraftAiBadRequestError("""Unable to create client with"""
-                                   """ invalid url provided. The url"""
-                                   """ should not terminate with a"""
-                                   """ slash.""")
+    cfg = complete_config(cfg)
     self._config = cfg
 
     self._base_url = "{}/api/v1/{}/{}".format(self.config["url"],
@@ -86,6 +246,64 @@ class CraftAIClient(object):
     self._headers = {}
     self._headers["Authorization"] = "Bearer " + self.config.get("token")
     self._headers["User-Agent"] = USER_AGENT
+    # Large responses, like operations lists and decision trees, are sent
+    # compressed and transparently decompressed
+    self._headers["Accept-Encoding"] = "gzip, deflate"
+
+    self._json_codec = json_codec.get_codec(self.config["jsonCodec"])
+
+    # The session, and its connections pool, is reused by every request
+    # and has to be recreated to take into account a new configuration
+    if self._session is not None:
+      self._session.close()
+    self._session = requests.Session()
+    # Keeping enough connections for the concurrent operations additions
+    adapter = HTTPAdapter(pool_connections=self.config["poolConnections"],
+                          pool_maxsize=max(self.config["poolMaxSize"],
+                                           self.config["operationsAdditionConcurrency"]),
+                          max_retries=self.config["maxRetries"])
+    self._session.mount("http://", adapter)
+    self._session.mount("https://", adapter)
+
+    self._decision_tree_cache = None
+    if self.config["decisionTreeCacheMaxSize"] > 0:
+      self._decision_tree_cache = DecisionTreeCache(self.config["decisionTreeCacheMaxSize"],
+                                                    self.config["decisionTreeCacheTtl"],
+                                                    self.config["decisionTreeCacheTimeBucket"])
+
+  @property
+  def decision_tree_cache(self):
+    """The cache of decision trees, `None` unless `decisionTreeCacheMaxSize`
+    is set."""
+    return self._decision_tree_cache
+
+  def close(self):
+    """Closes the connections kept alive by the client, after the retrieval
+    of the pending decision tree futures."""
+    with self._executor_lock:
+      if self._executor is not None:
+        self._executor.shutdown()
+        self._executor = None
+    if self._session is not None:
+      self._session.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def _request(self, method, url, **kwargs):
+    if kwargs.get("data") is not None:
+      kwargs["data"], encoding = compress_body(self.config, kwargs["data"])
+      if encoding is not None:
+        kwargs["headers"] = helpers.join_dicts(kwargs.get("headers", {}),
+                                               {"Content-Encoding": encoding})
+    timeout = self.config["requestTimeout"]
+    return self._session.request(method,
+                                 url,
+                                 timeout=None if timeout is None else timeout / 1000.,
+                                 **kwargs)
 
   #################
   # Agent methods #
@@ -107,13 +325,13 @@ class CraftAIClient(object):
       payload["id"] = agent_id
 
     try:
-      json_pl = json.dumps(payload)
-    except TypeError as e:
+      json_pl = self._json_codec.dumps(payload)
+    except json_codec.DUMPS_ERRORS as e:
       raise CraftAiBadRequestError("Invalid configuration or agent id given. {}"
                                    .format(e.__str__()))
 
     req_url = "{}/agents".format(self._base_url)
-    resp = requests.post(req_url, headers=headers, data=json_pl)
+    resp = self._request("POST", req_url, headers=headers, data=json_pl)
 
     agent = self._decode_response(resp)
 
@@ -127,7 +345,7 @@ class CraftAIClient(object):
     headers = self._headers.copy()
 
     req_url = "{}/agents/{}".format(self._base_url, agent_id)
-    resp = requests.get(req_url, headers=headers)
+    resp = self._request("GET", req_url, headers=headers)
 
     agent = self._decode_response(resp)
 
@@ -138,7 +356,7 @@ class CraftAIClient(object):
     headers = self._headers.copy()
 
     req_url = "{}/agents".format(self._base_url)
-    resp = requests.get(req_url, headers=headers)
+    resp = self._request("GET", req_url, headers=headers)
 
     agents = self._decode_response(resp)
 
@@ -153,7 +371,10 @@ class CraftAIClient(object):
     headers = self._headers.copy()
 
     req_url = "{}/agents/{}".format(self._base_url, agent_id)
-    resp = requests.delete(req_url, headers=headers)
+    try:
+      resp = self._request("DELETE", req_url, headers=headers)
+    finally:
+      self._invalidate_decision_trees(agent_id)
 
     decoded_resp = self._decode_response(resp)
 
@@ -167,7 +388,7 @@ class CraftAIClient(object):
     headers = self._headers.copy()
 
     req_url = "{}/agents/{}/shared".format(self._base_url, agent_id)
-    resp = requests.get(req_url, headers=headers)
+    resp = self._request("GET", req_url, headers=headers)
 
     url = self._decode_response(resp)
 
@@ -184,7 +405,7 @@ class CraftAIClient(object):
     headers = self._headers.copy()
 
     req_url = "{}/agents/{}/shared".format(self._base_url, agent_id)
-    resp = requests.delete(req_url, headers=headers)
+    resp = self._request("DELETE", req_url, headers=headers)
 
     decoded_resp = self._decode_response(resp)
 
@@ -198,100 +419,199 @@ class CraftAIClient(object):
     # Raises an error when agent_id is invalid
     self._check_agent_id(agent_id)
 
-    # Building final headers
-    ct_header = {"Content-Type": "application/json; charset=utf-8"}
-    headers = helpers.join_dicts(self._headers, ct_header)
-
-    session = requests.Session()
-    offset = 0
-
-    is_looping = True
+    chunks = helpers.chunker(operations, self.config["operationsChunksSize"])
+    chunks_report = self._add_operations_chunks([(agent_id, chunks)])
 
-    while is_looping:
-      next_offset = offset + self.config["operationsChunksSize"]
+    return self._operations_addition_result(agent_id, len(operations), chunks_report)
 
-      try:
-        json_pl = json.dumps(operations[offset:next_offset])
-      except TypeError as e:
-        raise CraftAiBadRequestError("Invalid configuration or agent id given. {}"
-                                     .format(e.__str__()))
-
-      req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
-      resp = session.post(req_url, headers=headers, data=json_pl)
-
-      self._decode_response(resp)
+  def add_agents_operations(self, agents_operations):
+    """Adds operations to several agents, given as a dictionary of lists of
+    operations indexed by agent id."""
+    for agent_id in agents_operations:
+      # Raises an error when agent_id is invalid
+      self._check_agent_id(agent_id)
 
-      if next_offset >= len(operations):
-        is_looping = False
+    chunks_report = self._add_operations_chunks([
+      (agent_id, helpers.chunker(operations, self.config["operationsChunksSize"]))
+      for agent_id, operations in agents_operations.items()
+    ])
 
-      offset = next_offset
+    result = {
+      "message": "Successfully added %i operation(s) to %i agent(s) of \"%s/%s\"."
+                 % (sum(len(operations) for operations in agents_operations.values()),
+                    len(agents_operations), self.config["owner"], self.config["project"])
+    }
+    if chunks_report is not None:
+      result["chunks"] = chunks_report
+    return result
 
-    return {
+  def _operations_addition_result(self, agent_id, operations_count, chunks_report):
+    result = {
       "message": "Successfully added %i operation(s) to the agent \"%s/%s/%s\" context."
-                 % (len(operations), self.config["owner"], self.config["project"], agent_id)
+                 % (operations_count, self.config["owner"], self.config["project"], agent_id)
     }
+    if chunks_report is not None:
+      result["chunks"] = chunks_report
+    return result
+
+  def _add_operations_chunks(self, agents_chunks):
+    """Sends the given chunks of operations, given as `(agent_id, chunks)`
+    where `chunks` is an iterable of `(offset, operations)`.
+
+    Chunks are sent one after the other unless the
+    `operationsAdditionConcurrency` configuration is greater than 1. In that
+    case a report of every chunk is returned and, if some chunks failed, a
+    `CraftAiOperationsAdditionError` holding this report is raised.
+    """
+    concurrency = self.config["operationsAdditionConcurrency"]
+    if concurrency == 1:
+      for agent_id, chunks in agents_chunks:
+        for _, operations in chunks:
+          self._post_operations(agent_id, operations)
+      return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+      if self.config["operationsAdditionOrdered"]:
+        # Each agent's chunks are sent in order by a single worker
+        futures = [
+          executor.submit(self._add_ordered_operations_chunks, agent_id, chunks)
+          for agent_id, chunks in agents_chunks
+        ]
+        chunks_report = [chunk for future in futures for chunk in future.result()]
+      else:
+        # Bounding the chunks in flight, to avoid building them all upfront
+        in_flight = threading.BoundedSemaphore(2 * concurrency)
+        futures = []
+        for agent_id, chunks in agents_chunks:
+          for offset, operations in chunks:
+            in_flight.acquire()
+            future = executor.submit(self._add_operations_chunk, agent_id, offset, operations)
+            future.add_done_callback(lambda _: in_flight.release())
+            futures.append(future)
+        chunks_report = [future.result() for future in futures]
+
+    failed_chunks = [chunk for chunk in chunks_report if chunk["status"] != "success"]
+    if failed_chunks:
+      raise CraftAiOperationsAdditionError(
+        "%i chunk(s) out of %i were not added, the first error being: %s"
+        % (len(failed_chunks), len(chunks_report), failed_chunks[0]["error"]),
+        chunks_report
+      )
+    return chunks_report
+
+  def _add_ordered_operations_chunks(self, agent_id, chunks):
+    chunks_report = []
+    with self._agent_lock(agent_id):
+      for offset, operations in chunks:
+        if chunks_report and chunks_report[-1]["status"] != "success":
+          # Once a chunk failed, the following ones are not sent to keep the
+          # operations in order
+          chunks_report.append({
+            "agent_id": agent_id,
+            "offset": offset,
+            "count": len(operations),
+            "status": "skipped",
+            "error": None,
+            "operations": operations
+          })
+        else:
+          chunks_report.append(self._add_operations_chunk(agent_id, offset, operations))
+    return chunks_report
+
+  def _add_operations_chunk(self, agent_id, offset, operations):
+    chunk_report = {
+      "agent_id": agent_id,
+      "offset": offset,
+      "count": len(operations),
+      "status": "success",
+      "error": None
+    }
+    try:
+      self._post_operations(agent_id, operations)
+    except (CraftAiError, requests.RequestException) as e:
+      chunk_report["status"] = "error"
+      chunk_report["error"] = e
+      chunk_report["operations"] = operations
+    return chunk_report
+
+  def _agent_lock(self, agent_id):
+    with self._agents_locks_lock:
+      lock = self._agents_locks.get(agent_id)
+      if lock is None:
+        lock = _AgentLock()
+        self._agents_locks[agent_id] = lock
+      return lock
+
+  def _post_operations(self, agent_id, operations):
+    # Building final headers
+    ct_header = {"Content-Type": "application/json; charset=utf-8"}
+    headers = helpers.join_dicts(self._headers, ct_header)
+
+    try:
+      json_pl = self._json_codec.dumps(operations)
+    except json_codec.DUMPS_ERRORS as e:
+      raise CraftAiBadRequestError("Invalid configuration or agent id given. {}"
+                                   .format(e.__str__()))
+
+    req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
+    try:
+      resp = self._request("POST", req_url, headers=headers, data=json_pl)
+    finally:
+      # Even failed requests may have added some operations
+      self._invalidate_decision_trees(agent_id)
 
-  def _get_operations_list_pages(self, url, ops_list):
-    if url is None:
-      return ops_list
+    return self._decode_response(resp)
 
+  def _iter_pages(self, url, params=None):
+    """Yields the successive pages of a paginated route."""
     headers = self._headers.copy()
 
-    resp = requests.get(url, headers=headers)
+    while url is not None:
+      resp = self._request("GET", url, params=params, headers=headers)
 
-    new_ops_list = self._decode_response(resp)
-    next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+      yield self._decode_response(resp)
 
-    return self._get_operations_list_pages(next_page_url, ops_list + new_ops_list)
+      # The next page url already includes the query parameters
+      url = resp.headers.get("x-craft-ai-next-page-url")
+      params = None
 
-  def get_operations_list(self, agent_id, start=None, end=None):
+  def iter_operations_pages(self, agent_id, start=None, end=None):
     # Raises an error when agent_id is invalid
     self._check_agent_id(agent_id)
 
-    headers = self._headers.copy()
-
     req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
     req_params = {
       "start": start,
       "end": end
     }
-    resp = requests.get(req_url, params=req_params, headers=headers)
-
-    initial_ops_list = self._decode_response(resp)
-    next_page_url = resp.headers.get("x-craft-ai-next-page-url")
 
-    return self._get_operations_list_pages(next_page_url, initial_ops_list)
+    return self._iter_pages(req_url, req_params)
 
-  def _get_state_history_pages(self, url, state_history):
-    if url is None:
-      return state_history
+  def iter_operations(self, agent_id, start=None, end=None):
+    pages = self.iter_operations_pages(agent_id, start, end)
+    return (operation for page in pages for operation in page)
 
-    headers = self._headers.copy()
-
-    resp = requests.get(url, headers=headers)
-
-    new_state_history = self._decode_response(resp)
-    next_page_url = resp.headers.get("x-craft-ai-next-page-url")
-
-    return self._get_state_history_pages(next_page_url, state_history + new_state_history)
+  def get_operations_list(self, agent_id, start=None, end=None):
+    return list(self.iter_operations(agent_id, start, end))
 
-  def get_state_history(self, agent_id, start=None, end=None):
+  def iter_state_history_pages(self, agent_id, start=None, end=None):
     # Raises an error when agent_id is invalid
     self._check_agent_id(agent_id)
 
-    headers = self._headers.copy()
-
     req_url = "{}/agents/{}/context/state/history".format(self._base_url, agent_id)
     req_params = {
       "start": start,
       "end": end
     }
-    resp = requests.get(req_url, params=req_params, headers=headers)
 
-    initial_states_history = self._decode_response(resp)
-    next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+    return self._iter_pages(req_url, req_params)
 
-    return self._get_state_history_pages(next_page_url, initial_states_history)
+  def iter_state_history(self, agent_id, start=None, end=None):
+    pages = self.iter_state_history_pages(agent_id, start, end)
+    return (state for page in pages for state in page)
+
+  def get_state_history(self, agent_id, start=None, end=None):
+    return list(self.iter_state_history(agent_id, start, end))
 
   def get_context_state(self, agent_id, timestamp):
     # Raises an error when agent_id is invalid
@@ -302,7 +622,7 @@ class CraftAIClient(object):
     req_url = "{}/agents/{}/context/state?t={}".format(self._base_url,
                                                        agent_id,
                                                        timestamp)
-    resp = requests.get(req_url, headers=headers)
+    resp = self._request("GET", req_url, headers=headers)
 
     context_state = self._decode_response(resp)
 
@@ -312,6 +632,12 @@ class CraftAIClient(object):
   # Decision tree methods #
   #########################
 
+  def _invalidate_decision_trees(self, agent_id):
+    if self._decision_tree_cache is not None:
+      self._decision_tree_cache.invalidate(self.config["owner"],
+                                           self.config["project"],
+                                           agent_id)
+
   def _get_decision_tree(self, agent_id, timestamp):
     headers = self._headers.copy()
 
@@ -319,78 +645,101 @@ class CraftAIClient(object):
                                                        agent_id,
                                                        timestamp)
 
-    resp = requests.get(req_url, headers=headers)
+    resp = self._request("GET", req_url, headers=headers)
 
     decision_tree = self._decode_response(resp)
 
+    return decision_tree, len(resp.content)
+
+  def _poll_decision_tree(self, agent_id, timestamp):
+    """Returns the decision tree and its size, retrying while it is being
+    computed."""
+    timeout = self._config["decisionTreeRetrievalTimeout"]
+    if timeout is False:
+      # Don't retry
+      return self._get_decision_tree(agent_id, timestamp)
+
+    start = current_time_ms()
+    attempt = 0
+    while True:
+      try:
+        return self._get_decision_tree(agent_id, timestamp)
+      except CraftAiLongRequestTimeOutError as e:
+        remaining = timeout - (current_time_ms() - start)
+        if remaining <= 0:
+          # Client side timeout
+          raise CraftAiLongRequestTimeOutError()
+        delay = decision_tree_retrieval_delay(self._config, attempt, e.retry_after)
+        time.sleep(min(delay, remaining / 1000.))
+        attempt += 1
+
+  def _retrieve_cached_decision_tree(self, key, agent_id, timestamp):
+    cache = self._decision_tree_cache
+    generation = cache.generation(*key[:3])
+    decision_tree, size = self._poll_decision_tree(agent_id, timestamp)
+    cache.put(key, decision_tree, size, generation)
     return decision_tree
 
   def get_decision_tree(self, agent_id, timestamp):
     # Raises an error when agent_id is invalid
     self._check_agent_id(agent_id)
 
-    if self._config["decisionTreeRetrievalTimeout"] is False:
-      # Don't retry
-      return self._get_decision_tree(agent_id, timestamp)
-    else:
-      start = current_time_ms()
-      while True:
-        now = current_time_ms()
-        if now - start > self._config["decisionTreeRetrievalTimeout"]:
-          # Client side timeout
-          raise CraftAiLongRequestTimeOutError()
-        try:
-          return self._get_decision_tree(agent_id, timestamp)
-        except CraftAiLongRequestTimeOutError:
-          # Do nothing and continue.
-          continue
+    # Concurrent retrievals of the same tree are done once, the tree is shared
+    # between their callers, and with the cache, it must not be modified
+    cache = self._decision_tree_cache
+    key = None
+    if cache is not None:
+      key = cache.key(self.config["owner"], self.config["project"], agent_id, timestamp)
+    if key is None:
+      # Invalid timestamps are rejected by the API, with or without the cache
+      key = (self.config["owner"], self.config["project"], agent_id, timestamp)
+      decision_tree, _ = self._decision_tree_flights.run(key,
+                                                         self._poll_decision_tree,
+                                                         agent_id,
+                                                         timestamp)
+      return decision_tree
+
+    decision_tree = cache.get(key)
+    if decision_tree is None:
+      decision_tree = self._decision_tree_flights.run(key,
+                                                      self._retrieve_cached_decision_tree,
+                                                      key,
+                                                      agent_id,
+                                                      timestamp)
+    return decision_tree
 
-  @staticmethod
-  def decide(tree, *args):
-    return Interpreter.decide(tree, args)
+  def get_decision_tree_future(self, agent_id, timestamp):
+    """Retrieves a decision tree in the background.
+
+    Returns a `concurrent.futures.Future` of the result of
+    `get_decision_tree`, the trees are retrieved by up to `poolMaxSize`
+    threads of the client.
+    """
+    # Raises an error when agent_id is invalid
+    self._check_agent_id(agent_id)
+
+    with self._executor_lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(max_workers=self.config["poolMaxSize"])
+      return self._executor.submit(self.get_decision_tree, agent_id, timestamp)
 
   @staticmethod
-  def _parse_body(response):
+  def decide(tree, *args, **kwargs):
+    return Interpreter.decide(tree, args, **kwargs)
+
+  def _parse_body(self, response):
     try:
-      return response.json()
+      return self._json_codec.loads(response.content)
     except:
       raise CraftAiInternalError(
         "Internal Error, the craft ai server responded in an invalid format."
       )
 
-  @staticmethod
-  def _decode_response(response):
-    status_code = response.status_code
-
-    if status_code == 200 or status_code == 201 or status_code == 204:
-      return CraftAIClient._parse_body(response)
-    if status_code == 202:
-      raise CraftAiLongRequestTimeOutError(CraftAIClient._parse_body(response)["message"])
-    if status_code == 401 or status_code == 403:
-      raise CraftAiCredentialsError(CraftAIClient._parse_body(response)["message"])
-    if status_code == 400:
-      raise CraftAiBadRequestError(CraftAIClient._parse_body(response)["message"])
-    if status_code == 404:
-      raise CraftAiNotFoundError(CraftAIClient._parse_body(response)["message"])
-    if status_code == 413:
-      raise CraftAiBadRequestError("Given payload is too large")
-    if status_code == 500:
-      raise CraftAiInternalError(CraftAIClient._parse_body(response)["message"])
-    if status_code == 504:
-      raise CraftAiBadRequestError("Request has timed out")
-
-    raise CraftAiUnknownError(CraftAIClient._parse_body(response)["message"])
+  def _decode_response(self, response):
+    return decode_response(response.status_code,
+                           lambda: self._parse_body(response),
+                           response.headers)
 
   @staticmethod
   def _check_agent_id(agent_id):
-    """Checks that the given agent_id is a valid non-empty string.
-
-    Raises an error if the given agent_id is not of type string or if it is
-    an empty string.
-    """
-    if (not isinstance(agent_id, six.string_types) or
-        AGENT_ID_PATTERN.match(agent_id) is None):
-      raise CraftAiBadRequestError("""Invalid agent id given."""
-                                   """It must be a string containaing only"""
-                                   """characters in \"a-zA-Z0-9_-\""""
-                                   """and must be between 1 and 36 characters.""")
+    check_agent_id(agent_id)
@@ -0,0 +1,295 @@
+"""Generation of the python code of decision trees.
+
+Each output of a decision tree is generated as functions of nested `if`
+statements, evaluating the decision rules with their operands written as
+literals. The nodes deeper than `_MAX_NESTING` levels below the root of a
+function are generated in other functions, which are returned instead of a
+leaf to be called in turn, deep trees thus neither exceed the indentation
+limit of python nor recurse.
+
+The generated source is a module which can be cached on disk, along with
+its compiled code, in files named after the hash of the decision tree. The
+disk cache requires python 3.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import six
+
+from craftai.errors import CraftAiDecisionError, CraftAiNullDecisionError
+from craftai.interpreter import CompiledTree, Interpreter, _CompiledTreeBase, \
+                                _INVALID_OPERATOR_MESSAGE
+from craftai.operators import _OPERATORS
+
+# Changing the generated code must change this version, to invalidate the cached trees
+_CODEGEN_VERSION = 1
+_MAX_NESTING = 24
+_INDENT = "  "
+
+def _missing_property(property_name):
+  return CraftAiDecisionError(
+    """Unable to take decision, property '{}' is missing from the given context.""".
+    format(property_name)
+  )
+
+def _no_matching_rule(context_value, property_name):
+  return CraftAiNullDecisionError(
+    """Unable to take decision: value '{}' for property '{}' doesn't"""
+    """ validate any of the decision rules.""".format(context_value, property_name)
+  )
+
+def _null_decision():
+  return CraftAiNullDecisionError(
+    """Unable to take decision: the decision tree has no valid"""
+    """ predicted value for the given context."""
+  )
+
+def _invalid_operator(operator):
+  return CraftAiDecisionError(_INVALID_OPERATOR_MESSAGE.format(operator))
+
+def _decision_rules(rules, parents, index):
+  """Builds the decision rules leading from the root to the node `index`."""
+  decision_rules = []
+  while index != 0:
+    property_name, operator, operand = rules[index]
+    decision_rules.append({
+      "property": property_name,
+      "operator": operator,
+      "operand": operand
+    })
+    index = parents[index]
+  decision_rules.reverse()
+  return decision_rules
+
+def _literal(value): #pylint: disable=R0911
+  """Returns the python literal of a value of a decision tree."""
+  if value is None or isinstance(value, bool):
+    return repr(value)
+  if isinstance(value, six.string_types):
+    return repr(value)
+  if isinstance(value, six.integer_types):
+    return repr(int(value))
+  if isinstance(value, float):
+    if value != value:
+      return "float(\"nan\")"
+    if value in (float("inf"), float("-inf")):
+      return "float(\"{}\")".format(value)
+    return repr(float(value))
+  if isinstance(value, list):
+    return "[{}]".format(", ".join(_literal(item) for item in value))
+  if isinstance(value, tuple):
+    return "({}{})".format(", ".join(_literal(item) for item in value),
+                           "," if len(value) == 1 else "")
+  if isinstance(value, dict):
+    return "{{{}}}".format(", ".join(
+      "{}: {}".format(_literal(key), _literal(item)) for key, item in value.items()
+    ))
+  raise CraftAiDecisionError(
+    "Unable to generate the code of the decision tree, {!r} is not a valid value.".format(value)
+  )
+
+def _condition(operator, operand):
+  """Returns the python expression evaluating a decision rule on `value`,
+  `None` when its operator is invalid."""
+  if not isinstance(operator, six.string_types) or operator not in _OPERATORS:
+    return None
+  if operator == "is":
+    return "value == {}".format(_literal(operand))
+  if operator in (">=", "<"):
+    return "value {} {}".format(operator, _literal(operand))
+  if (isinstance(operand, (list, tuple)) and len(operand) == 2 and
+      all(isinstance(bound, (float,) + six.integer_types) and not isinstance(bound, bool)
+          for bound in operand)):
+    lower_bound, upper_bound = _literal(operand[0]), _literal(operand[1])
+    if operand[0] < operand[1]:
+      return "value >= {} and value < {}".format(lower_bound, upper_bound)
+    return "value >= {} or value < {}".format(lower_bound, upper_bound)
+  return "_OPERATORS[\"[in[\"](value, {})".format(_literal(operand))
+
+class _OutputGenerator(object):
+  def __init__(self, output_index, nodes):
+    self.output_index = output_index
+    self.children = nodes["children"]
+    self.rules = nodes["rules"]
+    self.leaves = nodes["leaves"]
+    self.lines = []
+    self._functions_roots = []
+
+  def function_name(self, index):
+    return "_output_{}_node_{}".format(self.output_index, index)
+
+  def generate(self):
+    parents = [-1] * len(self.children)
+    for index, node_children in enumerate(self.children):
+      for child_index in node_children:
+        parents[child_index] = index
+    self.lines.append("_RULES_{} = {}".format(self.output_index, _literal(tuple(self.rules))))
+    self.lines.append("_PARENTS_{} = {}".format(self.output_index, _literal(tuple(parents))))
+
+    self._functions_roots.append(0)
+    while self._functions_roots:
+      index = self._functions_roots.pop()
+      self.lines.append("")
+      self.lines.append("def {}(context, with_rules):".format(self.function_name(index)))
+      self._node(index, 1)
+    return self.lines
+
+  def _emit(self, depth, line):
+    self.lines.append(_INDENT * depth + line)
+
+  def _node(self, index, depth):
+    if not self.children[index]:
+      self._leaf(index, depth)
+    elif depth > _MAX_NESTING:
+      # Continued in another function
+      self._emit(depth, "return {}".format(self.function_name(index)))
+      self._functions_roots.append(index)
+    else:
+      self._split(index, depth)
+
+  def _split(self, index, depth):
+    node_children = self.children[index]
+    property_name = None
+    for child_index in node_children:
+      child_property_name, operator, operand = self.rules[child_index]
+      if property_name is None or child_property_name != property_name:
+        property_name = child_property_name
+        self._emit(depth, "value = context.get({})".format(_literal(property_name)))
+        self._emit(depth, "if value is None:")
+        self._emit(depth + 1, "raise _missing_property({})".format(_literal(property_name)))
+      condition = _condition(operator, operand)
+      if condition is None:
+        self._emit(depth, "raise _invalid_operator({})".format(_literal(operator)))
+        return
+      self._emit(depth, "if {}:".format(condition))
+      self._node(child_index, depth + 1)
+
+    first_property_name = _literal(self.rules[node_children[0]][0])
+    self._emit(depth, "raise _no_matching_rule(context.get({0}), {0})".format(first_property_name))
+
+  def _leaf(self, index, depth):
+    predicted_value, confidence, standard_deviation = self.leaves[index]
+    if predicted_value is None:
+      self._emit(depth, "raise _null_decision()")
+      return
+    self._emit(depth, "leaf = {{\"predicted_value\": {}, \"confidence\": {}}}".format(
+      _literal(predicted_value), _literal(confidence)
+    ))
+    self._emit(depth, "if with_rules:")
+    self._emit(depth + 1, "leaf[\"decision_rules\"] = _decision_rules({}, {}, {})".format(
+      "_RULES_{}".format(self.output_index), "_PARENTS_{}".format(self.output_index), index
+    ))
+    if standard_deviation is not None:
+      self._emit(depth, "leaf[\"standard_deviation\"] = {}".format(_literal(standard_deviation)))
+    self._emit(depth, "return leaf")
+
+def tree_hash(tree):
+  """Returns the hash identifying the generated code of a decision tree."""
+  serialized_tree = json.dumps([_CODEGEN_VERSION, tree], sort_keys=True)
+  return hashlib.sha256(serialized_tree.encode("utf-8")).hexdigest()
+
+def generate_source(tree, name=None):
+  """Returns the python source of the module taking decisions on the given
+  decision tree or `CompiledTree`.
+
+  The module defines `OUTPUTS`, the list of the `(output, function)` of the
+  tree. Each function is called with the context and the `with_rules` flag
+  and returns either the decision or the next function to call.
+  """
+  if not isinstance(tree, CompiledTree):
+    tree = CompiledTree(tree)
+
+  lines = [
+    "# Decision tree {}, generated by craftai.codegen.".format(name) if name else
+    "# Decision tree generated by craftai.codegen.",
+    "from craftai.codegen import _decision_rules, _invalid_operator, _missing_property, \\",
+    "                            _no_matching_rule, _null_decision",
+    "from craftai.operators import _OPERATORS",
+    ""
+  ]
+  outputs = []
+  for output_index, (output_name, nodes) in enumerate(tree.outputs):
+    generator = _OutputGenerator(output_index, nodes)
+    lines.extend(generator.generate())
+    lines.append("")
+    outputs.append("({}, {})".format(_literal(output_name), generator.function_name(0)))
+  lines.append("OUTPUTS = [{}]".format(", ".join(outputs)))
+  lines.append("")
+  return "\n".join(lines)
+
+def _write_atomically(path, data):
+  """Writes a file of the cache, for concurrent processes to never read it
+  partially written."""
+  directory = os.path.dirname(path)
+  if not os.path.isdir(directory):
+    os.makedirs(directory)
+  temporary_file, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+  try:
+    with os.fdopen(temporary_file, "wb") as cache_file:
+      cache_file.write(data)
+    os.replace(temporary_path, path)
+  finally:
+    if os.path.exists(temporary_path):
+      os.remove(temporary_path)
+
+def _load_cached_code(tree, cache_dir):
+  """Returns the code object of the module of the given tree and its source,
+  cached in `cache_dir`. The source is cached in a `.py` file and the code
+  object in a file specific to the python version."""
+  import importlib.util
+  import marshal
+  import sys
+
+  name = "craftai_tree_{}".format(tree_hash(tree))
+  source_path = os.path.join(cache_dir, name + ".py")
+  code_path = os.path.join(cache_dir, "{}.{}.code".format(name, sys.implementation.cache_tag))
+
+  if os.path.exists(source_path):
+    with open(source_path, "rb") as source_file:
+      source = source_file.read().decode("utf-8")
+  else:
+    source = generate_source(tree, name)
+    _write_atomically(source_path, source.encode("utf-8"))
+
+  if os.path.exists(code_path):
+    with open(code_path, "rb") as code_file:
+      data = code_file.read()
+    if data.startswith(importlib.util.MAGIC_NUMBER):
+      try:
+        return marshal.loads(data[len(importlib.util.MAGIC_NUMBER):]), source
+      except (EOFError, TypeError, ValueError):
+        # Compiled again below
+        pass
+
+  code = compile(source, source_path, "exec")
+  _write_atomically(code_path, importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+  return code, source
+
+class GeneratedTree(_CompiledTreeBase): #pylint: disable=R0903
+  """Decision tree taking decisions with the python code generated for it.
+
+  Decisions are identical to the ones of `Interpreter.decide`. The generated
+  module is cached in `cache_dir` when given, and `source` holds its code.
+  """
+
+  def __init__(self, tree, cache_dir=None):
+    _, configuration, version = Interpreter._parse_tree(tree) #pylint: disable=W0212
+    self._set_configuration(configuration, version)
+
+    if cache_dir is None:
+      self.source = generate_source(tree)
+      code = compile(self.source, "<craftai decision tree>", "exec")
+    else:
+      code, self.source = _load_cached_code(tree, cache_dir)
+    namespace = {}
+    six.exec_(code, namespace)
+    self.outputs = namespace["OUTPUTS"]
+
+  @staticmethod
+  def _decide_output(nodes, context, with_rules=True):
+    result = nodes(context, with_rules)
+    while not isinstance(result, dict):
+      result = result(context, with_rules)
+    return result
@@ -81,8 +81,24 @@ class CraftAiTokenError(CraftAiError):
     super(CraftAiTokenError, self).__init__(message)
 
 class CraftAiLongRequestTimeOutError(CraftAiError):
-  """Raised when a request takes a long time"""
-  def __init__(self, message=None):
+  """Raised when a request takes a long time.
+
+  `retry_after` is the delay, in seconds, suggested by craft ai before trying
+  again, if any.
+  """
+  def __init__(self, message=None, retry_after=None):
     self.message = message if message is None else (
       "Request timed out because the computation is not finished, please try again")
+    self.retry_after = retry_after
     super(CraftAiLongRequestTimeOutError, self).__init__(message)
+
+class CraftAiOperationsAdditionError(CraftAiError):
+  """Raised when some chunks of operations couldn't be added to an agent.
+
+  `chunks` reports the outcome of each chunk, failed and skipped chunks keep
+  their operations so that they can be retried.
+  """
+  def __init__(self, message, chunks):
+    self.message = "".join(("Unable to add operations: ", message))
+    self.chunks = chunks
+    super(CraftAiOperationsAdditionError, self).__init__(message)
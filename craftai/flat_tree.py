@@ -0,0 +1,565 @@
+"""Flat, array backed, layout of compiled decision trees.
+
+A flat tree is a single buffer holding a small JSON header (the tree's
+configuration and the tables of its strings and other non numerical values)
+followed by arrays indexed by node. It is evaluated in place, without being
+deserialized into dictionaries, from `bytes`, an `mmap` or a shared memory
+block, which can thus be shared by many processes. It is also the format of
+the decision trees saved to files, which are loaded by mapping them in memory.
+It requires python 3.3+.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+
+import six
+
+from craftai.errors import CraftAiDecisionError, CraftAiError, CraftAiNullDecisionError
+from craftai.interpreter import (CompiledTree, Interpreter, _CompiledTreeBase,
+                                 _INVALID_OPERATOR_MESSAGE)
+from craftai.operators import _OPERATORS
+
+# `memoryview.cast` and `array.tobytes` appeared in python 3.3
+_UNSUPPORTED = sys.version_info < (3, 3)
+
+_MAGIC = b"CRFT"
+_FORMAT_VERSION = 1
+# Magic, format version, byte order and metadata length
+_HEADER = struct.Struct("<4sHcxQ")
+_BYTE_ORDERS = {"little": b"l", "big": b"b"}
+
+# Operators codes, the rules which can't be encoded are kept as values
+_ROOT = -1
+_IS = 0
+_GTE = 1
+_LT = 2
+_IN = 3
+_OTHER = 4
+_OPERATORS_CODES = {"is": _IS, ">=": _GTE, "<": _LT, "[in[": _IN}
+
+# Values kinds, the other values are kept in the values table
+_NONE = 0
+_FLOAT = 1
+_INT = 2
+_VALUE = 3
+# Absent leaf values, and the values of the other nodes
+_MISSING = 4
+_LEAF_KEYS = ["predicted_value", "confidence", "standard_deviation"]
+
+# `(name, format, values count per node)` of the arrays of each output, the
+# 8 bytes ones first to keep all the arrays aligned. The `children_start`
+# and `children` arrays are an offset per node in the children indices.
+_ARRAYS = [
+  ("operands", "d", 2),
+  ("values", "d", 3),
+  ("children_start", "i", 1),
+  ("children", "i", 1),
+  ("properties", "i", 1),
+  ("operators", "b", 1),
+  ("operands_kinds", "B", 2),
+  ("values_kinds", "B", 3)
+]
+
+def _check_supported():
+  if _UNSUPPORTED:
+    raise CraftAiError("Flat decision trees require python 3.3+.")
+
+def _is_number(value):
+  return isinstance(value, (float,) + six.integer_types) and not isinstance(value, bool)
+
+def _is_inlined(value):
+  """Whether a number is encoded as is, integers beyond 2 ** 53 not being
+  exactly represented by doubles."""
+  return isinstance(value, float) or (_is_number(value) and abs(value) < 2 ** 53)
+
+class _FlatTreeWriter(object):
+  def __init__(self):
+    self.values = []
+    self._values_indices = {}
+    self.properties = []
+    self._properties_indices = {}
+
+  def property_index(self, prop_name):
+    if prop_name not in self._properties_indices:
+      self._properties_indices[prop_name] = len(self.properties)
+      self.properties.append(prop_name)
+    return self._properties_indices[prop_name]
+
+  def encode(self, value):
+    """Returns the `(kind, number)` encoding the given value."""
+    if value is None:
+      return _NONE, 0.
+    if isinstance(value, float):
+      return _FLOAT, value
+    if _is_inlined(value):
+      return _INT, float(value)
+    try:
+      key = (type(value), value)
+      if key not in self._values_indices:
+        self._values_indices[key] = len(self.values)
+        self.values.append(value)
+      return _VALUE, float(self._values_indices[key])
+    except TypeError:
+      # Unhashable values, like lists, are not shared
+      self.values.append(value)
+      return _VALUE, float(len(self.values) - 1)
+
+  def leaf_values(self, leaf, node):
+    """Returns the encoded values of a leaf, given as its `CompiledTree` tuple
+    or, to save the absent values too, as its node."""
+    if node is None:
+      predicted_value, confidence, standard_deviation = leaf
+      return [self.encode(predicted_value), self.encode(confidence),
+              (_MISSING, 0.) if standard_deviation is None else self.encode(standard_deviation)]
+    return [self.encode(node[key]) if key in node else (_MISSING, 0.) for key in _LEAF_KEYS]
+
+  def write_output(self, nodes, tree_nodes=None): #pylint: disable=R0914
+    children = nodes["children"]
+    arrays = {name: array(array_format) for name, array_format, _ in _ARRAYS}
+    children_count = 0
+    for index, node_children in enumerate(children):
+      arrays["children_start"].append(children_count)
+      arrays["children"].extend(node_children)
+      children_count += len(node_children)
+
+      rule = nodes["rules"][index]
+      operands = [(_NONE, 0.), (_NONE, 0.)]
+      if rule is None:
+        arrays["properties"].append(-1)
+        arrays["operators"].append(_ROOT)
+      else:
+        prop_name, operator, operand = rule
+        arrays["properties"].append(self.property_index(prop_name))
+        operator_code = _OPERATORS_CODES.get(operator) if isinstance(operator, six.string_types) \
+                        else None
+        if operator_code == _IS:
+          operands[0] = self.encode(operand)
+        elif operator_code in (_GTE, _LT) and _is_inlined(operand):
+          operands[0] = self.encode(operand)
+        elif (operator_code == _IN and isinstance(operand, (list, tuple)) and len(operand) == 2 and
+              all(_is_inlined(bound) for bound in operand)):
+          operands = [self.encode(operand[0]), self.encode(operand[1])]
+        else:
+          # Invalid operators and unexpected operands are evaluated as the interpreter does
+          operator_code = _OTHER
+          operands[0] = self.encode([operator, operand])
+        arrays["operators"].append(operator_code)
+      for kind, number in operands:
+        arrays["operands_kinds"].append(kind)
+        arrays["operands"].append(number)
+
+      leaf = nodes["leaves"][index]
+      if leaf is None:
+        values = [(_MISSING, 0.)] * 3
+      else:
+        values = self.leaf_values(leaf, None if tree_nodes is None else tree_nodes[index])
+      for kind, number in values:
+        arrays["values_kinds"].append(kind)
+        arrays["values"].append(number)
+    arrays["children_start"].append(children_count)
+    return arrays
+
+def _preorder_nodes(root):
+  """Lists the nodes of a tree in the order of `CompiledTree._flatten`."""
+  nodes = []
+  to_visit = [root]
+  while to_visit:
+    node = to_visit.pop()
+    nodes.append(node)
+    node_children = node.get("children")
+    if node_children:
+      to_visit.extend(reversed(node_children))
+  return nodes
+
+def _sections(outputs_arrays):
+  """Returns the sections of the arrays of the outputs, aligned on 8 bytes,
+  and the `[output_name, {name: [offset, size]}]` of their arrays."""
+  sections = []
+  outputs = []
+  offset = 0
+  for output_name, arrays in outputs_arrays:
+    output_arrays = {}
+    for name, _, _ in _ARRAYS:
+      data = arrays[name].tobytes()
+      output_arrays[name] = [offset, len(data)]
+      sections.append(data)
+      padding = -len(data) % 8
+      sections.append(b"\0" * padding)
+      offset += len(data) + padding
+    outputs.append([output_name, output_arrays])
+  return sections, outputs
+
+def dump_flat_tree(tree):
+  """Returns the flat layout of the given decision tree or `CompiledTree`,
+  as `bytes`.
+
+  `FlatTree.to_tree` restores the decision rules of the nodes of the
+  decision tree given as a dictionary, and the `predicted_value`,
+  `confidence` and `standard_deviation` of its leaves, as they are. The other
+  keys of the nodes and the empty lists of `children` are not kept. From a
+  `CompiledTree`, its leaves without confidence are restored with a null one.
+  """
+  _check_supported()
+  bare_tree = None
+  if not isinstance(tree, CompiledTree):
+    bare_tree = Interpreter._parse_tree(tree)[0] #pylint: disable=W0212
+    tree = CompiledTree(tree)
+
+  writer = _FlatTreeWriter()
+  outputs_arrays = [
+    (output_name, writer.write_output(
+      nodes, None if bare_tree is None else _preorder_nodes(bare_tree[output_name])
+    ))
+    for output_name, nodes in tree.outputs
+  ]
+
+  # The arrays follow the header and the metadata
+  sections, outputs = _sections(outputs_arrays)
+  metadata = json.dumps({
+    "version": tree.version,
+    "configuration": tree.configuration,
+    "properties": writer.properties,
+    "values": writer.values,
+    "outputs": outputs
+  }).encode("utf-8")
+  metadata += b" " * (-(_HEADER.size + len(metadata)) % 8)
+  header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, _BYTE_ORDERS[sys.byteorder], len(metadata))
+  return b"".join([header, metadata] + sections)
+
+def dump_flat_tree_to_shared_memory(tree, name=None):
+  """Dumps the given decision tree or `CompiledTree` into a new shared memory
+  block, named `name` or randomly, and returns this
+  `multiprocessing.shared_memory.SharedMemory` (python 3.8+).
+
+  The caller owns the block, it must `close` and `unlink` it once the
+  processes using it are done.
+  """
+  from multiprocessing import shared_memory #pylint: disable=E0611
+
+  data = dump_flat_tree(tree)
+  block = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+  block.buf[:len(data)] = data
+  return block
+
+def save_flat_tree(tree, path):
+  """Saves the flat layout of the given decision tree or `CompiledTree` to
+  the file at `path`, to be loaded by `FlatTree.from_file`."""
+  data = dump_flat_tree(tree)
+  with open(path, "wb") as flat_file:
+    flat_file.write(data)
+
+class FlatTree(_CompiledTreeBase):
+  """Decision tree evaluated in place from its flat layout.
+
+  `buffer` is any object supporting the buffer protocol holding a tree
+  dumped by `dump_flat_tree`, it must not be modified. Decisions are
+  identical to the ones of `Interpreter.decide`.
+  """
+
+  def __init__(self, buffer):
+    _check_supported()
+    self._shared_memory = None
+    self._mmap = None
+    self._views = []
+    self.outputs = []
+    self._buffer = memoryview(buffer)
+    try:
+      self._load()
+    except Exception:
+      # Releases the buffer for its owner to be closed
+      self.release()
+      raise
+
+  def _load(self):
+    if len(self._buffer) < _HEADER.size:
+      raise CraftAiDecisionError("Invalid flat decision tree, the buffer is too small.")
+    magic, format_version, byte_order, metadata_size = _HEADER.unpack_from(self._buffer)
+    if magic != _MAGIC:
+      raise CraftAiDecisionError("Invalid flat decision tree, the buffer doesn't hold one.")
+    if format_version != _FORMAT_VERSION:
+      raise CraftAiDecisionError(
+        "Unsupported flat decision tree format version {}.".format(format_version)
+      )
+    if byte_order != _BYTE_ORDERS[sys.byteorder]:
+      raise CraftAiDecisionError(
+        "Invalid flat decision tree, it was dumped on a platform with another byte order."
+      )
+
+    data_start = _HEADER.size + metadata_size
+    try:
+      metadata = json.loads(
+        self._buffer[_HEADER.size:data_start].tobytes().decode("utf-8")
+      )
+      self._set_configuration(metadata["configuration"], metadata["version"])
+      self._properties_names = metadata["properties"]
+      self._values = metadata["values"]
+
+      for output_name, output_arrays in metadata["outputs"]:
+        nodes = self._output_nodes(data_start, output_arrays)
+        self._check_nodes(nodes)
+        self.outputs.append((output_name, nodes))
+    except (KeyError, TypeError, ValueError) as e:
+      raise CraftAiDecisionError("Invalid flat decision tree, it can't be read. {}".format(e))
+
+  def _output_nodes(self, data_start, output_arrays):
+    nodes = {}
+    for name, array_format, _ in _ARRAYS:
+      start, size = output_arrays[name]
+      if start < 0 or size < 0 or data_start + start + size > len(self._buffer):
+        raise CraftAiDecisionError("Invalid flat decision tree, it is truncated.")
+      view = self._buffer[data_start + start:data_start + start + size].cast(array_format)
+      self._views.append(view)
+      nodes[name] = view
+    return nodes
+
+  def _check_nodes(self, nodes):
+    """Checks that the nodes only refer to existing nodes, properties and
+    values, for corrupted trees to fail when loaded rather than in `decide`."""
+    children_start = nodes["children_start"]
+    children = nodes["children"]
+    nodes_count = len(children_start) - 1
+    is_valid = (
+      nodes_count > 0 and
+      all(len(nodes[name]) == count * nodes_count
+          for name, _, count in _ARRAYS if name not in ("children_start", "children")) and
+      children_start[0] == 0 and children_start[nodes_count] == len(children) and
+      nodes["operators"][0] == _ROOT and
+      all(_ROOT < operator_code <= _OTHER for operator_code in nodes["operators"][1:]) and
+      all(0 <= prop < len(self._properties_names) for prop in nodes["properties"][1:])
+    )
+    # Children follow their parent, the walks down the tree always end
+    index = 0
+    while is_valid and index < nodes_count:
+      start, end = children_start[index], children_start[index + 1]
+      is_valid = start <= end and all(index < child_index < nodes_count
+                                      for child_index in children[start:end])
+      index += 1
+    for kinds_name, numbers_name in [("operands_kinds", "operands"), ("values_kinds", "values")]:
+      is_valid = is_valid and all(
+        kind <= _MISSING and
+        (kind != _VALUE or (number.is_integer() and 0 <= number < len(self._values)))
+        for kind, number in zip(nodes[kinds_name], nodes[numbers_name])
+      )
+    if not is_valid:
+      raise CraftAiDecisionError("Invalid flat decision tree, its nodes are corrupted.")
+
+  @classmethod
+  def from_shared_memory(cls, name):
+    """Returns the `FlatTree` held by the shared memory block named `name`,
+    created by `dump_flat_tree_to_shared_memory`. The block is closed, but
+    not unlinked, by `release`."""
+    from multiprocessing import shared_memory #pylint: disable=E0611
+
+    try:
+      block = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+      # Before python 3.13, the block is tracked, and unlinked when the process
+      # exits, unless it shares the resource tracker of the process that
+      # created it, like the processes it forks or starts with `multiprocessing`
+      block = shared_memory.SharedMemory(name=name)
+    flat_tree = cls(block.buf)
+    flat_tree._shared_memory = block #pylint: disable=W0212
+    return flat_tree
+
+  @classmethod
+  def from_file(cls, path):
+    """Returns the `FlatTree` saved to the file at `path` by `save_flat_tree`.
+
+    The file is mapped in memory and read once to check its nodes, the
+    decisions then only access the pages of the nodes they visit. The mapping
+    is closed by `release`, the file must not be modified until then.
+    """
+    with open(path, "rb") as flat_file:
+      if os.fstat(flat_file.fileno()).st_size == 0:
+        raise CraftAiDecisionError("Invalid flat decision tree, the buffer is too small.")
+      mapping = mmap.mmap(flat_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      flat_tree = cls(mapping)
+    except BaseException:
+      mapping.close()
+      raise
+    flat_tree._mmap = mapping #pylint: disable=W0212
+    return flat_tree
+
+  def release(self):
+    """Releases the views on the buffer, and closes its shared memory block or
+    file mapping if any. The tree can't be used afterwards."""
+    for view in self._views:
+      view.release()
+    self._views = []
+    self.outputs = []
+    if self._buffer is not None:
+      self._buffer.release()
+      self._buffer = None
+    if self._shared_memory is not None:
+      self._shared_memory.close()
+      self._shared_memory = None
+    if self._mmap is not None:
+      self._mmap.close()
+      self._mmap = None
+
+  def _check_released(self):
+    if self._buffer is None:
+      raise CraftAiDecisionError("Unable to use the flat decision tree, it has been released.")
+
+  def decide(self, state, time=None, with_rules=True):
+    self._check_released()
+    return super(FlatTree, self).decide(state, time, with_rules)
+
+  def to_tree(self):
+    """Returns the decision tree, in the format of `client.get_decision_tree`.
+
+    Nodes are restored with their decision rule and, for leaves, their
+    `predicted_value`, `confidence` and `standard_deviation`.
+    """
+    self._check_released()
+    return {
+      "_version": self.version,
+      "configuration": self.configuration,
+      "trees": {output_name: self._output_tree(nodes) for output_name, nodes in self.outputs}
+    }
+
+  def _output_tree(self, nodes): #pylint: disable=R0914
+    children_start = nodes["children_start"]
+    children = nodes["children"]
+    values_kinds = nodes["values_kinds"]
+    values = nodes["values"]
+
+    tree_nodes = []
+    for index in range(len(children_start) - 1):
+      node = {}
+      if nodes["operators"][index] != _ROOT:
+        property_name, operator, operand = self._rule(nodes, index)
+        node["decision_rule"] = {
+          "property": property_name,
+          "operator": operator,
+          "operand": operand
+        }
+      if children_start[index] == children_start[index + 1]:
+        for position, key in enumerate(_LEAF_KEYS):
+          kind = values_kinds[3 * index + position]
+          if kind != _MISSING:
+            node[key] = self._decode(kind, values[3 * index + position])
+      tree_nodes.append(node)
+
+    # Children are linked once all the nodes exist, deep trees aren't recursed
+    for index, node in enumerate(tree_nodes):
+      if children_start[index] < children_start[index + 1]:
+        node["children"] = [
+          tree_nodes[child_index]
+          for child_index in children[children_start[index]:children_start[index + 1]]
+        ]
+    return tree_nodes[0]
+
+  def _decode(self, kind, number):
+    if kind == _FLOAT:
+      return number
+    if kind == _INT:
+      return int(number)
+    if kind == _VALUE:
+      return self._values[int(number)]
+    return None
+
+  def _rule(self, nodes, index):
+    operator_code = nodes["operators"][index]
+    operands_kinds = nodes["operands_kinds"]
+    operands = nodes["operands"]
+    if operator_code == _OTHER:
+      return [self._properties_names[nodes["properties"][index]]] + \
+             self._decode(operands_kinds[2 * index], operands[2 * index])
+    if operator_code == _IN:
+      operand = [self._decode(operands_kinds[2 * index], operands[2 * index]),
+                 self._decode(operands_kinds[2 * index + 1], operands[2 * index + 1])]
+    else:
+      operand = self._decode(operands_kinds[2 * index], operands[2 * index])
+    return [self._properties_names[nodes["properties"][index]],
+            ["is", ">=", "<", "[in["][operator_code],
+            operand]
+
+  def _matches(self, nodes, index, context_value):
+    operator_code = nodes["operators"][index]
+    operands = nodes["operands"]
+    if operator_code == _IS:
+      return context_value == self._decode(nodes["operands_kinds"][2 * index], operands[2 * index])
+    if operator_code == _GTE:
+      return context_value >= operands[2 * index]
+    if operator_code == _LT:
+      return context_value < operands[2 * index]
+    if operator_code == _IN:
+      lower_bound = operands[2 * index]
+      upper_bound = operands[2 * index + 1]
+      if lower_bound < upper_bound:
+        return context_value >= lower_bound and context_value < upper_bound
+      return context_value >= lower_bound or context_value < upper_bound
+
+    _, operator, operand = self._rule(nodes, index)
+    if not isinstance(operator, six.string_types) or operator not in _OPERATORS_CODES:
+      raise CraftAiDecisionError(_INVALID_OPERATOR_MESSAGE.format(operator))
+    return _OPERATORS[operator](context_value, operand)
+
+  def _decide_output(self, nodes, context, with_rules=True): #pylint: disable=R0914
+    children_start = nodes["children_start"]
+    children = nodes["children"]
+    properties = nodes["properties"]
+
+    path = []
+    index = 0
+    while children_start[index] < children_start[index + 1]:
+      node_children = children[children_start[index]:children_start[index + 1]]
+      matching_index = None
+      for child_index in node_children:
+        property_name = self._properties_names[properties[child_index]]
+        context_value = context.get(property_name)
+        if context_value is None:
+          raise CraftAiDecisionError(
+            """Unable to take decision, property '{}' is missing from the given context.""".
+            format(property_name)
+          )
+        if self._matches(nodes, child_index, context_value):
+          matching_index = child_index
+          break
+
+      if matching_index is None:
+        prop = self._properties_names[properties[node_children[0]]]
+        raise CraftAiNullDecisionError(
+          """Unable to take decision: value '{}' for property '{}' doesn't"""
+          """ validate any of the decision rules.""".format(context.get(prop), prop)
+        )
+      path.append(matching_index)
+      index = matching_index
+
+    values_kinds = nodes["values_kinds"]
+    values = nodes["values"]
+    predicted_value, confidence, standard_deviation = [
+      self._decode(values_kinds[3 * index + position], values[3 * index + position])
+      for position in range(3)
+    ]
+    confidence = confidence or 0
+    if predicted_value is None:
+      raise CraftAiNullDecisionError(
+        """Unable to take decision: the decision tree has no valid"""
+        """ predicted value for the given context."""
+      )
+
+    leaf = {
+      "predicted_value": predicted_value,
+      "confidence": confidence
+    }
+    if with_rules:
+      leaf["decision_rules"] = []
+      for child_index in path:
+        property_name, operator, operand = self._rule(nodes, child_index)
+        leaf["decision_rules"].append({
+          "property": property_name,
+          "operator": operator,
+          "operand": operand
+        })
+
+    if standard_deviation is not None:
+      leaf["standard_deviation"] = standard_deviation
+
+    return leaf
@@ -1,3 +1,5 @@
+from six.moves import range
+
 def join_dicts(old_dicts, *new_dicts):
   joined_dicts = old_dicts.copy()
 
@@ -12,3 +14,8 @@ def dict_depth(collection):
   if isinstance(collection, list) and collection:
     return 1 + max(dict_depth(a) for a in collection)
   return 0
+
+def chunker(to_be_chunked, chunk_size):
+  """Yields `(offset, chunk)` for successive chunks of the given sequence."""
+  return ((pos, to_be_chunked[pos:pos + chunk_size])
+          for pos in range(0, len(to_be_chunked), chunk_size))
@@ -1,8 +1,13 @@
 import numbers
 import re
+
+from bisect import bisect_right
+
 import semver
 import six
 
+from craftai import json_codec
+from craftai.cache import LruCache
 from craftai.errors import CraftAiDecisionError, CraftAiNullDecisionError
 from craftai.operators import _OPERATORS
 from craftai.time import Time
@@ -20,21 +25,127 @@ _VALUE_VALIDATORS = {
 
 _DECISION_VERSION = "1.1.0"
 
+_VERSION_PATTERN = re.compile(r"\d+.\d+.\d+")
+
+_GENERATED_TYPES = ["time_of_day", "day_of_week", "day_of_month", "month_of_year", "timezone"]
+
+# Versions of decision trees already validated
+_VALID_VERSIONS = LruCache(128)
+
+# Analyses of the configurations of decision trees, by their content
+_CONFIGURATIONS_ANALYSES = LruCache(128)
+
+def _is_number(value):
+  return isinstance(value, numbers.Real) and value == value
+
+def _frozen_outputs(outputs):
+  """Returns the immutable form of the outputs of a decision, a tuple of
+  `(output, predicted_value, confidence, standard_deviation, rules)` where
+  `rules` is `None` or a tuple of `(property, operator, operand)`, list
+  operands becoming tuples."""
+  return tuple(
+    (output_name, leaf["predicted_value"], leaf["confidence"], leaf.get("standard_deviation"),
+     tuple(
+       (rule["property"], rule["operator"],
+        tuple(rule["operand"]) if isinstance(rule["operand"], list) else rule["operand"])
+       for rule in leaf["decision_rules"]
+     ) if "decision_rules" in leaf else None)
+    for output_name, leaf in outputs.items()
+  )
+
+def _thawed_outputs(frozen_outputs):
+  """Builds new outputs dictionaries from their immutable form."""
+  outputs = {}
+  for output_name, predicted_value, confidence, standard_deviation, rules in frozen_outputs:
+    leaf = {
+      "predicted_value": predicted_value,
+      "confidence": confidence
+    }
+    if rules is not None:
+      leaf["decision_rules"] = [{
+        "property": property_name,
+        "operator": operator,
+        "operand": list(operand) if isinstance(operand, tuple) else operand
+      } for property_name, operator, operand in rules]
+    if standard_deviation is not None:
+      leaf["standard_deviation"] = standard_deviation
+    outputs[output_name] = leaf
+  return outputs
+
+def _children_selector(rules):
+  """Indexes the decision rules of the children of a node.
+
+  Returns a function giving the position of the first child whose rule is
+  validated by a context value, -1 when there is none, or `None` when the
+  value can't be looked up and the rules must be evaluated one by one. When
+  the rules can't be indexed, `None` is returned instead of the function.
+
+  The `is` rules on strings are indexed in a dictionary of their operands.
+  The `>=`, `<` and `[in[` rules on numbers are indexed by the sorted bounds
+  of the intervals between their operands: each rule is validated either by
+  all the values of such an interval or by none, the first child validated
+  by each interval is thus computed once by evaluating the rules on its
+  lower bound.
+  """
+  if not rules or len(set(prop for prop, _, _ in rules)) != 1:
+    return None
+  operators = set(operator for _, operator, _ in rules)
+
+  if operators == set(["is"]):
+    if not all(isinstance(operand, six.string_types) for _, _, operand in rules):
+      return None
+    positions = {}
+    for position, (_, _, operand) in enumerate(rules):
+      positions.setdefault(operand, position)
+    return lambda value: positions.get(value, -1) if isinstance(value, six.string_types) else None
+
+  if not operators.issubset(set([">=", "<", "[in["])):
+    return None
+  bounds = set()
+  for _, operator, operand in rules:
+    operands = operand if operator == "[in[" else [operand]
+    if (operator == "[in[" and not (isinstance(operand, (list, tuple)) and len(operand) == 2) or
+        not all(_is_number(bound) for bound in operands)):
+      return None
+    bounds.update(operands)
+  bounds = sorted(bounds)
+
+  segments = []
+  for lower_bound in [float("-inf")] + bounds:
+    matching_positions = [
+      position for position, (_, operator, operand) in enumerate(rules)
+      if _OPERATORS[operator](lower_bound, operand)
+    ]
+    segments.append(matching_positions[0] if matching_positions else -1)
+  return lambda value: segments[bisect_right(bounds, value)] if _is_number(value) else None
+
+_INVALID_OPERATOR_MESSAGE = (
+  """Invalid decision tree format, {} is not a valid"""
+  """decision operator."""
+)
+
 class Interpreter(object):
 
   @staticmethod
-  def decide(tree, args):
+  def decide(tree, args, with_rules=True): #pylint: disable=R0914
+    """Takes a decision on the given tree for the context made of the given
+    args, a state and optionally a `Time`.
+
+    When `with_rules` is `False`, the `decision_rules` leading to each
+    decision are not built and are left out of the decision.
+    """
     errors = []
     bare_tree, configuration, _ = Interpreter._parse_tree(tree)
+    analysis = None
     if configuration != {}:
+      analysis = Interpreter._cached_configuration_analysis(configuration)
       state = args[0]
       time = None if len(args) == 1 else args[1]
-      context_result = Interpreter._rebuild_context(configuration, state, time)
-      context = context_result["context"]
+      context = Interpreter._rebuild_context(configuration, state, time, analysis)["context"]
     else:
       context = Interpreter.join_decide_args(args)
 
-    errors = Interpreter._check_context(configuration, context)
+    errors = Interpreter._check_context(configuration, context, analysis)
 
     # deal with missing properties
     if errors:
@@ -49,61 +160,151 @@ class Interpreter(object):
     decision = {}
     decision["output"] = {}
     for output in configuration.get("output"):
-      decision["output"][output] = Interpreter._decide_recursion(bare_tree[output], context)
+      decision["output"][output] = Interpreter._decide_tree(bare_tree[output], context, with_rules)
     decision["context"] = context
     decision["_version"] = _DECISION_VERSION
 
     return decision
 
+  @staticmethod
+  def compile(tree, cache_size=None):
+    """Parses the given tree once and returns a `CompiledTree` taking decisions on it,
+    caching up to `cache_size` decisions when given."""
+    return CompiledTree(tree, cache_size)
+
+  @staticmethod
+  def generate_code(tree, cache_dir=None):
+    """Generates the python code of the given tree and returns a
+    `GeneratedTree` taking decisions with it, caching the code in `cache_dir`
+    when given."""
+    from craftai.codegen import GeneratedTree #pylint: disable=R0401
+    return GeneratedTree(tree, cache_dir)
+
+  @staticmethod
+  def generate_source(tree):
+    """Returns the python source of the code generated for the given tree."""
+    from craftai.codegen import generate_source #pylint: disable=R0401
+    return generate_source(tree)
+
+  @staticmethod
+  def dump_flat_tree(tree):
+    """Returns the flat layout of the given tree as `bytes`, to be loaded by
+    `Interpreter.load_flat_tree` in other processes."""
+    from craftai.flat_tree import dump_flat_tree #pylint: disable=R0401
+    return dump_flat_tree(tree)
+
+  @staticmethod
+  def load_flat_tree(buffer):
+    """Returns a `FlatTree` taking decisions in place on the flat tree held by
+    the given buffer, like `bytes`, an `mmap` or a shared memory block."""
+    from craftai.flat_tree import FlatTree #pylint: disable=R0401
+    return FlatTree(buffer)
+
+  @staticmethod
+  def save_flat_tree(tree, path):
+    """Saves the flat layout of the given tree to the file at `path`, to be
+    loaded by `Interpreter.load_flat_tree_file`."""
+    from craftai.flat_tree import save_flat_tree #pylint: disable=R0401
+    save_flat_tree(tree, path)
+
+  @staticmethod
+  def load_flat_tree_file(path):
+    """Returns a `FlatTree` taking decisions on the flat tree saved to the file
+    at `path`, mapped in memory."""
+    from craftai.flat_tree import FlatTree #pylint: disable=R0401
+    return FlatTree.from_file(path)
+
+  @staticmethod
+  def load_tree(serialized_tree, codec="auto"):
+    """Loads a decision tree serialized as JSON, given as `str` or `bytes`,
+    with the given JSON codec, by default the fastest one installed."""
+    return json_codec.get_codec(codec).loads(serialized_tree)
+
   ####################
   # Internal helpers #
   ####################
 
   @staticmethod
-  def _rebuild_context(configuration, state, time=None):
-    missings = []
-    # Model should come from _parse_tree and is assumed to be checked upon
-    # already
+  def get_cache_stats():
+    """Returns the hits, misses, evictions, count and hit rate of the caches of
+    the validated versions and of the analysed configurations of decision
+    trees."""
+    return {
+      "versions": _VALID_VERSIONS.stats,
+      "configurations": _CONFIGURATIONS_ANALYSES.stats
+    }
+
+  @staticmethod
+  def clear_cache():
+    _VALID_VERSIONS.clear()
+    _CONFIGURATIONS_ANALYSES.clear()
+
+  @staticmethod
+  def _analyze_configuration(configuration):
     output = configuration["output"]
     context = configuration["context"]
 
     # We should not use the output key(s) to compare against
-    configuration_ctx = {
-      key: context[key] for (key, value) in context.items() if (key not in output)
+    properties_types = {
+      key: value["type"] for (key, value) in context.items() if (key not in output)
     }
 
     # Check if we need the time object
     to_generate = []
 
-    for prop in configuration_ctx.items():
-      prop_name = prop[0]
-      prop_attributes = prop[1]
-      if prop_attributes["type"] in ["time_of_day", "day_of_week", "day_of_month",
-                                     "month_of_year", "timezone"]:
-        # is_generated is at True, we must generate the time for the associated context property
-        case_1 = "is_generated" in list(prop_attributes.keys()) and prop[1]["is_generated"]
-        # is_generated is not given, by default at True, so we must generate it as well
-        case_2 = "is_generated" not in list(prop_attributes.keys())
-        if case_1 or case_2:
+    for prop_name, prop_attributes in context.items():
+      if prop_name in properties_types and prop_attributes["type"] in _GENERATED_TYPES:
+        # is_generated is at True or not given, by default at True, so we must
+        # generate the time for the associated context property
+        if prop_attributes.get("is_generated", True):
           to_generate.append(prop_name)
 
+    # The required properties (i.e. those that are not the output)
+    expected_properties = [p for p in context if not p in output]
+
+    return properties_types, tuple(to_generate), tuple(expected_properties)
+
+  @staticmethod
+  def _cached_configuration_analysis(configuration):
+    """Analyses the configuration once per content, the analysis is shared and
+    must not be modified."""
+    # Everything the analysis depends on, the configuration may be modified
+    # between decisions
+    key = (tuple(configuration["output"]), tuple(
+      (prop_name, prop_attributes["type"], bool(prop_attributes.get("is_generated", True)))
+      for prop_name, prop_attributes in configuration["context"].items()
+    ))
+    return _CONFIGURATIONS_ANALYSES.get(
+      key, lambda: Interpreter._analyze_configuration(configuration)
+    )
+
+  @staticmethod
+  def _rebuild_context(configuration, state, time=None, analysis=None):
+    missings = []
+    # Model should come from _parse_tree and is assumed to be checked upon
+    # already
+    if analysis is None:
+      analysis = Interpreter._analyze_configuration(configuration)
+    properties_types, to_generate, _ = analysis
+
     # Propagate missings properties to next function
     if to_generate:
       # Can't generate from time -> missings properties are errors
       if not isinstance(time, Time):
         # Check for missings properties
         for prop in to_generate:
-          if prop not in list(state.keys()):
+          if prop not in state:
             missings.append("expected property '{}' is not defined".format(prop))
 
       # Generate context properties which need to
       else:
+        time_dict = time.to_dict()
         for prop in to_generate:
-          state[prop] = time.to_dict()[configuration_ctx[prop]["type"]]
+          state[prop] = time_dict[properties_types[prop]]
 
     # Rebuild the context with generated and non-generated values
     context = {
-      feature: state.get(feature) for feature, properties in configuration_ctx.items()
+      feature: state.get(feature) for feature in properties_types
     }
 
     return {
@@ -127,64 +328,55 @@ class Interpreter(object):
     return True
 
   @staticmethod
-  def _decide_recursion(node, context):
-    # If we are on a leaf
-    if not (node.get("children") is not None and len(node.get("children"))):
-      predicted_value = node.get("predicted_value")
-      if predicted_value is None:
+  def _decide_tree(root, context, with_rules=True):
+    # Walking down the tree, the matching children are kept to build the
+    # decision rules once the leaf is reached
+    path = []
+    node = root
+    while node.get("children"):
+      # Finding the first element in this node's childrens matching the
+      # operator condition with given context
+      matching_child = Interpreter._find_matching_child(node, context)
+
+      if not matching_child:
+        prop = node.get("children")[0].get("decision_rule").get("property")
         raise CraftAiNullDecisionError(
-          """Unable to take decision: the decision tree has no valid"""
-          """ predicted value for the given context."""
+          """Unable to take decision: value '{}' for property '{}' doesn't"""
+          """ validate any of the decision rules.""".format(context.get(prop), prop)
         )
 
-      leaf = {
-        "predicted_value": predicted_value,
-        "confidence": node.get("confidence") or 0,
-        "decision_rules": []
-      }
-
-      if node.get("standard_deviation", None) is not None:
-        leaf["standard_deviation"] = node.get("standard_deviation")
-
-      return leaf
-
-    # Finding the first element in this node's childrens matching the
-    # operator condition with given context
-    matching_child = Interpreter._find_matching_child(node, context)
+      path.append(matching_child)
+      node = matching_child
 
-    if not matching_child:
-      prop = node.get("children")[0].get("decision_rule").get("property")
+    predicted_value = node.get("predicted_value")
+    if predicted_value is None:
       raise CraftAiNullDecisionError(
-        """Unable to take decision: value '{}' for property '{}' doesn't"""
-        """ validate any of the decision rules.""".format(context.get(prop), prop)
+        """Unable to take decision: the decision tree has no valid"""
+        """ predicted value for the given context."""
       )
 
-    # If a matching child is found, recurse
-    result = Interpreter._decide_recursion(matching_child, context)
-    new_predicates = [{
-      "property": matching_child["decision_rule"]["property"],
-      "operator": matching_child["decision_rule"]["operator"],
-      "operand": matching_child["decision_rule"]["operand"]
-    }]
-
-    final_result = {
-      "predicted_value": result["predicted_value"],
-      "confidence": result["confidence"],
-      "decision_rules": new_predicates + result["decision_rules"]
+    leaf = {
+      "predicted_value": predicted_value,
+      "confidence": node.get("confidence") or 0
     }
+    if with_rules:
+      leaf["decision_rules"] = [{
+        "property": child["decision_rule"]["property"],
+        "operator": child["decision_rule"]["operator"],
+        "operand": child["decision_rule"]["operand"]
+      } for child in path]
 
-    if result.get("standard_deviation", None) is not None:
-      final_result["standard_deviation"] = result.get("standard_deviation")
+    if node.get("standard_deviation", None) is not None:
+      leaf["standard_deviation"] = node.get("standard_deviation")
 
-    return final_result
+    return leaf
 
   @staticmethod
-  def _check_context(configuration, context):
+  def _check_context(configuration, context, analysis=None):
     # Extract the required properties (i.e. those that are not the output)
-    expected_properties = [
-      p for p in configuration["context"]
-      if not p in configuration["output"]
-    ]
+    if analysis is None:
+      analysis = Interpreter._analyze_configuration(configuration)
+    _, _, expected_properties = analysis
 
     # Retrieve the missing properties
     missing_properties = [
@@ -227,10 +419,7 @@ class Interpreter(object):
         )
       if (not isinstance(operator, six.string_types) or
           not operator in _OPERATORS):
-        raise CraftAiDecisionError(
-          """Invalid decision tree format, {} is not a valid"""
-          """decision operator.""".format(operator)
-        )
+        raise CraftAiDecisionError(_INVALID_OPERATOR_MESSAGE.format(operator))
 
       # To be compared, continuous parameters should not be strings
       if "continuous" in operator:
@@ -271,26 +460,316 @@ class Interpreter(object):
       )
 
     # Checking version and tree validity according to version
-    if re.compile(r"\d+.\d+.\d+").match(tree_version) is None:
+    _VALID_VERSIONS.get(tree_version, lambda: Interpreter._check_version(tree_version))
+    if tree_object.get("configuration") is None:
+      raise CraftAiDecisionError(
+        """Invalid decision tree format, no configuration found"""
+      )
+    if tree_object.get("trees") is None:
+      raise CraftAiDecisionError(
+        """Invalid decision tree format, no tree found."""
+      )
+    bare_tree = tree_object.get("trees")
+    configuration = tree_object.get("configuration")
+    return bare_tree, configuration, tree_version
+
+  @staticmethod
+  def _check_version(tree_version):
+    if _VERSION_PATTERN.match(tree_version) is None:
       raise CraftAiDecisionError(
         """Invalid decision tree format, "{}" is not a valid version.""".
         format(tree_version)
       )
-    elif semver.match(tree_version, ">=1.0.0") and semver.match(tree_version, "<2.0.0"):
-      if tree_object.get("configuration") is None:
-        raise CraftAiDecisionError(
-          """Invalid decision tree format, no configuration found"""
-        )
-      if tree_object.get("trees") is None:
-        raise CraftAiDecisionError(
-          """Invalid decision tree format, no tree found."""
-        )
-      bare_tree = tree_object.get("trees")
-      configuration = tree_object.get("configuration")
-    else:
+    if not (semver.match(tree_version, ">=1.0.0") and semver.match(tree_version, "<2.0.0")):
       raise CraftAiDecisionError(
         """Invalid decision tree format, {} is not a supported"""
         """ version.""".
         format(tree_version)
       )
-    return bare_tree, configuration, tree_version
+    return tree_version
+
+class _CompiledTreeBase(object): #pylint: disable=R0903
+  """Validation of the contexts and decisions of the compiled trees.
+
+  Subclasses set `outputs` to a list of `(output, nodes)` and implement
+  `_decide_output(nodes, context, with_rules)`. They may set
+  `_decisions_cache` to an `LruCache` of the decisions' outputs, by the
+  values of the `_split_properties` of the context.
+  """
+  _decisions_cache = None
+  _split_properties = ()
+  outputs = ()
+  configuration = None
+  version = None
+  properties = ()
+  generated_properties = ()
+  _validators = ()
+
+  def _set_configuration(self, configuration, version):
+    self.configuration = configuration
+    self.version = version
+
+    output = configuration["output"]
+    context = configuration["context"]
+    # `(name, type)` of the context properties, and of the ones generated from a `Time`
+    self.properties = []
+    self.generated_properties = []
+    for prop_name, prop_attributes in context.items():
+      if prop_name in output:
+        continue
+      prop_type = prop_attributes["type"]
+      self.properties.append((prop_name, prop_type))
+      if prop_type in _GENERATED_TYPES and prop_attributes.get("is_generated", True):
+        self.generated_properties.append((prop_name, prop_type))
+    self._validators = [
+      (prop_name, _VALUE_VALIDATORS.get(prop_type)) for prop_name, prop_type in self.properties
+    ]
+
+  def decide(self, state, time=None, with_rules=True):
+    """Takes a decision for the given state and optional `Time`.
+
+    When `with_rules` is `False`, the `decision_rules` leading to each
+    decision are not built and are left out of the decision.
+    """
+    context = self._build_context(state, time)
+
+    decision = {}
+    if self._decisions_cache is None:
+      decision["output"] = self._decide_outputs(context, with_rules)
+    else:
+      key = tuple(context.get(prop_name) for prop_name in self._split_properties)
+      # The cached outputs are immutable, each decision gets its own dictionaries
+      computed_outputs = []
+      def compute():
+        computed_outputs.append(self._decide_outputs(context, with_rules))
+        return _frozen_outputs(computed_outputs[0])
+      frozen_outputs = self._decisions_cache.get((with_rules,) + key, compute)
+      if computed_outputs:
+        decision["output"] = computed_outputs[0]
+      else:
+        decision["output"] = _thawed_outputs(frozen_outputs)
+    decision["context"] = context
+    decision["_version"] = _DECISION_VERSION
+
+    return decision
+
+  def _decide_output(self, nodes, context, with_rules=True):
+    raise NotImplementedError()
+
+  def _decide_outputs(self, context, with_rules):
+    return {
+      output_name: self._decide_output(nodes, context, with_rules)
+      for output_name, nodes in self.outputs
+    }
+
+  def _build_context(self, state, time):
+    generated = {}
+    if self.generated_properties and isinstance(time, Time):
+      time_dict = time.to_dict()
+      generated = {
+        prop_name: time_dict[prop_type] for prop_name, prop_type in self.generated_properties
+      }
+
+    context = {}
+    is_valid = True
+    for prop_name, validator in self._validators:
+      value = generated[prop_name] if prop_name in generated else state.get(prop_name)
+      context[prop_name] = value
+      if value is None or (validator is not None and not validator(value)):
+        is_valid = False
+
+    if not is_valid:
+      # Only build the detailed error messages on the slow path
+      #pylint: disable=W0212
+      errors = Interpreter._check_context(self.configuration, context)
+      #pylint: enable=W0212
+      message = "Unable to take decision, the given context is not valid: " + errors.pop(0)
+
+      for error in errors:
+        message = "".join((message, ", ", error))
+      message = message + "."
+
+      raise CraftAiDecisionError(message)
+
+    return context
+
+class CompiledTree(_CompiledTreeBase):
+  """Decision tree parsed once and flattened to take many decisions quickly.
+
+  The tree is validated and each of its outputs is flattened into arrays
+  indexed by node, the root being the node 0. Decisions taken with
+  `CompiledTree.decide` are identical to the ones of `Interpreter.decide`.
+
+  When `cache_size` is given, the outputs of up to `cache_size` decisions
+  are cached by the values of the context properties the tree splits on,
+  the other properties don't affect the decisions.
+  """
+
+  def __init__(self, tree, cache_size=None):
+    bare_tree, configuration, version = Interpreter._parse_tree(tree) #pylint: disable=W0212
+    self._set_configuration(configuration, version)
+
+    # `(output, nodes)` where `nodes` is the flattened tree of this output
+    self.outputs = [
+      (output_name, CompiledTree._flatten(bare_tree[output_name]))
+      for output_name in configuration.get("output")
+    ]
+
+    if cache_size is not None:
+      self._split_properties = sorted(set(
+        rule[0] for _, nodes in self.outputs for rule in nodes["rules"] if rule is not None
+      ))
+      self._decisions_cache = LruCache(cache_size)
+
+  def get_cache_stats(self):
+    """Returns the hits, misses, evictions, count and hit rate of the cache of
+    decisions, `None` when decisions are not cached."""
+    return None if self._decisions_cache is None else self._decisions_cache.stats
+
+  def clear_cache(self):
+    """Empties the cache of decisions, if any."""
+    if self._decisions_cache is not None:
+      self._decisions_cache.clear()
+
+  @staticmethod
+  def _flatten(root):
+    """Flattens a tree into parallel lists indexed by node.
+
+    - `children` holds the tuple of the children indices of each node,
+    empty for leaves;
+    - `rules` holds the decision rule of each node as a `(property,
+    operator, operand)` tuple, `None` for the root;
+    - `functions` holds the operator function of each rule, `None` when the
+    operator is invalid;
+    - `leaves` holds the `(predicted_value, confidence, standard_deviation)`
+    tuple of each leaf, `None` for the other nodes;
+    - `selectors` holds the function indexing the rules of the children of
+    each node, `None` for the leaves and when they can't be indexed.
+    """
+    children = []
+    rules = []
+    functions = []
+    leaves = []
+
+    # Iterative depth first traversal, the nodes are numbered when they are
+    # first encountered.
+    to_visit = [(root, None)]
+    while to_visit:
+      node, parent_index = to_visit.pop()
+      index = len(children)
+      if parent_index is not None:
+        children[parent_index].append(index)
+
+      if parent_index is None:
+        rules.append(None)
+        functions.append(None)
+      else:
+        decision_rule = node["decision_rule"]
+        operator = decision_rule["operator"]
+        rules.append((decision_rule["property"], operator, decision_rule["operand"]))
+        if isinstance(operator, six.string_types) and operator in _OPERATORS:
+          functions.append(_OPERATORS[operator])
+        else:
+          functions.append(None)
+
+      node_children = node.get("children")
+      children.append([])
+      if node_children:
+        leaves.append(None)
+        # Pushed in reverse order to be visited in order
+        to_visit.extend((child, index) for child in reversed(node_children))
+      else:
+        leaves.append((
+          node.get("predicted_value"),
+          node.get("confidence") or 0,
+          node.get("standard_deviation", None)
+        ))
+
+    return {
+      "children": [tuple(node_children) for node_children in children],
+      "rules": rules,
+      "functions": functions,
+      "leaves": leaves,
+      "selectors": [
+        _children_selector([rules[child_index] for child_index in node_children])
+        for node_children in children
+      ]
+    }
+
+  #pylint: disable=R0912,R0914
+  @staticmethod
+  def _decide_output(nodes, context, with_rules=True):
+    children = nodes["children"]
+    rules = nodes["rules"]
+    functions = nodes["functions"]
+    selectors = nodes["selectors"]
+
+    decision_rules = []
+    index = 0
+    while children[index]:
+      matching_index = None
+      position = None
+      selector = selectors[index]
+      if selector is not None:
+        property_name = rules[children[index][0]][0]
+        context_value = context.get(property_name)
+        if context_value is None:
+          raise CraftAiDecisionError(
+            """Unable to take decision, property '{}' is missing from the given context.""".
+            format(property_name)
+          )
+        position = selector(context_value)
+        if position is not None and position >= 0:
+          matching_index = children[index][position]
+
+      # Evaluating the rules one by one when the value can't be looked up
+      for child_index in children[index] if position is None else ():
+        property_name, operator, operand = rules[child_index]
+        context_value = context.get(property_name)
+        if context_value is None:
+          raise CraftAiDecisionError(
+            """Unable to take decision, property '{}' is missing from the given context.""".
+            format(property_name)
+          )
+        function = functions[child_index]
+        if function is None:
+          raise CraftAiDecisionError(_INVALID_OPERATOR_MESSAGE.format(operator))
+        if function(context_value, operand):
+          matching_index = child_index
+          break
+
+      if matching_index is None:
+        prop = rules[children[index][0]][0]
+        raise CraftAiNullDecisionError(
+          """Unable to take decision: value '{}' for property '{}' doesn't"""
+          """ validate any of the decision rules.""".format(context.get(prop), prop)
+        )
+
+      if with_rules:
+        property_name, operator, operand = rules[matching_index]
+        decision_rules.append({
+          "property": property_name,
+          "operator": operator,
+          "operand": operand
+        })
+      index = matching_index
+
+    predicted_value, confidence, standard_deviation = nodes["leaves"][index]
+    if predicted_value is None:
+      raise CraftAiNullDecisionError(
+        """Unable to take decision: the decision tree has no valid"""
+        """ predicted value for the given context."""
+      )
+
+    leaf = {
+      "predicted_value": predicted_value,
+      "confidence": confidence
+    }
+    if with_rules:
+      leaf["decision_rules"] = decision_rules
+
+    if standard_deviation is not None:
+      leaf["standard_deviation"] = standard_deviation
+
+    return leaf
+  #pylint: enable=R0912,R0914
@@ -0,0 +1,103 @@
+"""JSON codecs used for the bodies of the requests and responses."""
+import json
+
+from collections import OrderedDict
+
+import six
+
+from craftai.errors import CraftAiBadRequestError
+
+# Errors raised by the codecs' `dumps` for the objects they can't encode
+DUMPS_ERRORS = (TypeError, ValueError, OverflowError)
+
+# Errors raised by the codecs' factories when their library is missing, or its
+# version is not supported
+_UNAVAILABLE_ERRORS = (ImportError, AttributeError)
+
+class JsonCodec(object): #pylint: disable=R0903
+  """A named couple of `dumps` and `loads` functions.
+
+  `dumps` may return `str` or `bytes`, `loads` accepts both.
+  """
+  def __init__(self, name, dumps, loads):
+    self.name = name
+    self.dumps = dumps
+    self.loads = loads
+
+def _orjson_codec():
+  import orjson #pylint: disable=E0401
+  # Like the standard library, non string keys and numpy values are accepted,
+  # these options missing before orjson 2.5
+  option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+  return JsonCodec("orjson", lambda obj: orjson.dumps(obj, option=option), orjson.loads)
+
+def _rapidjson_codec():
+  import rapidjson #pylint: disable=E0401
+  return JsonCodec("rapidjson", rapidjson.dumps, rapidjson.loads)
+
+def _ujson_codec():
+  #pylint: disable=I1101
+  import ujson
+  # Before 2.0, ujson loses the precision of floats, it is then not supported
+  if int(ujson.__version__.split(".")[0]) < 2:
+    raise ImportError("ujson 2.0+ is required, {} is installed".format(ujson.__version__))
+  return JsonCodec("ujson", ujson.dumps, ujson.loads)
+  #pylint: enable=I1101
+
+def _json_codec():
+  def loads(data):
+    if isinstance(data, six.binary_type):
+      data = data.decode("utf-8")
+    return json.loads(data)
+  return JsonCodec("json", json.dumps, loads)
+
+# Ordered from the fastest to the slowest, the last one always being available
+_CODECS_FACTORIES = OrderedDict([
+  ("orjson", _orjson_codec),
+  ("rapidjson", _rapidjson_codec),
+  ("ujson", _ujson_codec),
+  ("json", _json_codec)
+])
+
+_CODECS = {}
+
+def _load_codec(name):
+  if name not in _CODECS:
+    _CODECS[name] = _CODECS_FACTORIES[name]()
+  return _CODECS[name]
+
+def available_codecs():
+  """Returns the names of the codecs whose library is installed."""
+  names = []
+  for name in _CODECS_FACTORIES:
+    try:
+      _load_codec(name)
+      names.append(name)
+    except _UNAVAILABLE_ERRORS:
+      pass
+  return names
+
+def get_codec(codec="auto"):
+  """Returns the `JsonCodec` named `codec`, one of "orjson", "rapidjson",
+  "ujson" and "json", or the fastest available one for "auto". All of them
+  encode and decode floats without losing precision.
+
+  A `JsonCodec` is returned as is.
+  """
+  if isinstance(codec, JsonCodec):
+    return codec
+  if codec == "auto":
+    for name in _CODECS_FACTORIES:
+      try:
+        return _load_codec(name)
+      except _UNAVAILABLE_ERRORS:
+        pass
+  if codec not in _CODECS_FACTORIES:
+    raise CraftAiBadRequestError("""Unknown JSON codec '{}', it should be one of"""
+                                 """ "auto", "{}".""".format(codec,
+                                                             "\", \"".join(_CODECS_FACTORIES)))
+  try:
+    return _load_codec(codec)
+  except _UNAVAILABLE_ERRORS:
+    raise CraftAiBadRequestError("""The JSON codec '{}' is not installed, or its installed"""
+                                 """ version is not supported.""".format(codec))
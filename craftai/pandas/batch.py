@@ -0,0 +1,402 @@
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from ..errors import CraftAiDecisionError, CraftAiNullDecisionError
+from ..interpreter import CompiledTree, _INVALID_OPERATOR_MESSAGE, _VALUE_VALIDATORS
+from ..time import time_features
+
+_NUMERICAL_TYPES = ["continuous", "time_of_day", "day_of_week", "day_of_month", "month_of_year"]
+
+# Vectorized counterparts of `craftai.operators._OPERATORS`
+_VECTORIZED_OPERATORS = {
+  "is": lambda values, operand: np.asarray(values == operand, dtype=bool),
+  ">=": lambda values, operand: values >= operand,
+  "<": lambda values, operand: values < operand,
+  "[in[": lambda values, operand:
+          (values >= operand[0]) & (values < operand[1]) if operand[0] < operand[1]
+          else (values >= operand[0]) | (values < operand[1])
+}
+
+def _time_columns(index, generated_properties):
+  if not generated_properties:
+    return {}
+  features = time_features(index)
+  return {
+    prop_name: features[prop_type] for prop_name, prop_type in generated_properties
+  }
+
+_INTEGER_TYPES = ["day_of_week", "day_of_month", "month_of_year"]
+
+# Bounds of the numerical properties' values, like `craftai.interpreter._VALUE_VALIDATORS`
+_NUMERICAL_BOUNDS = {
+  "time_of_day": lambda values: (values >= 0) & (values < 24),
+  "day_of_week": lambda values: (values >= 0) & (values <= 6),
+  "day_of_month": lambda values: (values >= 1) & (values <= 31),
+  "month_of_year": lambda values: (values >= 1) & (values <= 12)
+}
+
+def _values_kind(values):
+  """Returns the kind of the values of an array without missing values:
+  "integer", "floating", "string" or `None` when they are mixed or of other
+  types."""
+  if values.dtype.kind in "biu":
+    return "integer"
+  if values.dtype.kind == "f":
+    return "floating"
+  inferred_type = pd.api.types.infer_dtype(values)
+  if inferred_type in ("integer", "boolean"):
+    return "integer"
+  if inferred_type == "floating":
+    return "floating"
+  if inferred_type == "string":
+    return "string"
+  return None
+
+def _valid_values(prop_type, values):
+  """Vectorized `craftai.interpreter._VALUE_VALIDATORS`, returns the mask of
+  the valid values of an array without missing values."""
+  validator = _VALUE_VALIDATORS.get(prop_type)
+  if validator is None or not values.size:
+    return np.ones(len(values), dtype=bool)
+
+  kind = _values_kind(values)
+  if kind is None:
+    # Mixed values are validated one by one
+    return np.array([validator(value) for value in values], dtype=bool)
+
+  if kind == "string":
+    if prop_type == "timezone":
+      value_indices, unique_values = pd.factorize(values)
+      return np.array([validator(value) for value in unique_values], dtype=bool)[value_indices]
+    valid = prop_type == "enum"
+  else:
+    valid = prop_type in _NUMERICAL_TYPES and (kind == "integer" or prop_type not in _INTEGER_TYPES)
+    if valid and prop_type in _NUMERICAL_BOUNDS:
+      return np.asarray(_NUMERICAL_BOUNDS[prop_type](np.asarray(values, dtype=np.float64)),
+                        dtype=bool)
+  return np.full(len(values), valid, dtype=bool)
+
+def _raw_values(prop_type, column):
+  """Returns the values of a context property with the masks of its missing
+  and invalid values."""
+  if isinstance(column, (np.ndarray, pd.Series, pd.Index)):
+    raw_values = np.asarray(column)
+  else:
+    # Not letting numpy coerce the values of lists, like ints mixed with floats
+    raw_values = np.empty(len(column), dtype=object)
+    raw_values[:] = list(column)
+  missing = pd.isnull(raw_values)
+  invalid = np.zeros(len(raw_values), dtype=bool)
+  #pylint: disable=E1130
+  invalid[~missing] = ~_valid_values(prop_type, raw_values[~missing])
+  #pylint: enable=E1130
+  return raw_values, missing, invalid
+
+def _context_columns(compiled_tree, data):
+  """Retrieves the context properties as arrays with missing and invalid
+  values masks.
+
+  Numerical properties are converted to float64 arrays, the others to object
+  arrays. Like when taking a single decision, generated properties are
+  computed from the index of a time indexed `DataFrame`.
+
+  Returns the arrays, the raw values, the masks of the missing values and
+  the masks of the invalid values of each property, the arrays and masks
+  being `None` for the missing properties.
+  """
+  generated = {}
+  if isinstance(data, pd.DataFrame) and isinstance(data.index, pd.DatetimeIndex):
+    generated = _time_columns(data.index, compiled_tree.generated_properties)
+
+  columns = {}
+  raw_columns = {}
+  missings = {}
+  invalids = {}
+  for prop_name, prop_type in compiled_tree.properties:
+    if prop_name in generated:
+      column = generated[prop_name]
+    elif prop_name in data:
+      column = data[prop_name]
+    else:
+      column = None
+
+    if column is None:
+      columns[prop_name] = raw_columns[prop_name] = None
+      missings[prop_name] = invalids[prop_name] = None
+      continue
+
+    raw_values, missing, invalid = _raw_values(prop_type, column)
+    if prop_type in _NUMERICAL_TYPES:
+      values = np.full(len(raw_values), np.nan)
+      decidable = ~(missing | invalid)
+      values[decidable] = np.asarray(raw_values[decidable], dtype=np.float64)
+    else:
+      values = np.asarray(raw_values, dtype=object)
+    columns[prop_name] = values
+    raw_columns[prop_name] = raw_values
+    missings[prop_name] = missing
+    invalids[prop_name] = invalid
+
+  return columns, raw_columns, missings, invalids
+
+def _rows_count(data):
+  if isinstance(data, pd.DataFrame):
+    return len(data.index)
+  return max([len(column) for column in data.values()] or [0])
+
+def _properties_matrix(prop_names, masks, rows_count, default):
+  matrix = np.zeros((rows_count, len(prop_names)), dtype=bool)
+  for prop_index, prop_name in enumerate(prop_names):
+    matrix[:, prop_index] = default if masks[prop_name] is None else masks[prop_name]
+  return matrix
+
+def _context_error(messages):
+  message = "Unable to take decision, the given context is not valid: {}.".format(
+    ", ".join(messages)
+  )
+  return CraftAiDecisionError(message).message
+
+#pylint: disable=R0914
+def _invalid_context_errors(compiled_tree, raw_columns, missings, invalids, rows_count):
+  """Computes the error of the rows having missing or invalid properties,
+  with the same message as `Interpreter.decide`."""
+  errors = np.full(rows_count, None, dtype=object)
+  prop_names = sorted(prop_name for prop_name, _ in compiled_tree.properties)
+  prop_types = dict(compiled_tree.properties)
+  missing_matrix = _properties_matrix(prop_names, missings, rows_count, True)
+  invalid_matrix = _properties_matrix(prop_names, invalids, rows_count, False)
+
+  has_invalid_values = invalid_matrix.any(axis=1)
+  missing_rows = np.flatnonzero(missing_matrix.any(axis=1) & ~has_invalid_values)
+  if missing_rows.size:
+    # Rows only missing the same properties share the same error
+    pattern_indices, patterns = pd.factorize(np.array(
+      [row.tobytes() for row in missing_matrix[missing_rows]], dtype=object
+    ))
+    messages = []
+    for pattern in patterns:
+      pattern = np.frombuffer(pattern, dtype=bool)
+      messages.append(_context_error([
+        "expected property '{}' is not defined".format(prop_name)
+        for prop_name, is_missing in zip(prop_names, pattern) if is_missing
+      ]))
+    errors[missing_rows] = np.array(messages, dtype=object)[pattern_indices]
+
+  # The messages of the invalid values hold the values, they are built row by row
+  for row in np.flatnonzero(has_invalid_values):
+    errors[row] = _context_error([
+      "expected property '{}' is not defined".format(prop_name)
+      for prop_name, is_missing in zip(prop_names, missing_matrix[row]) if is_missing
+    ] + [
+      "'{}' is not a valid value for property '{}' of type '{}'".format(
+        raw_columns[prop_name][row], prop_name, prop_types[prop_name]
+      )
+      for prop_name, is_invalid in zip(prop_names, invalid_matrix[row]) if is_invalid
+    ])
+  return errors
+#pylint: enable=R0914
+
+#pylint: disable=R0914
+def _route_rows(nodes, columns, rows, errors):
+  """Routes the given rows through the tree, level by level.
+
+  Returns the index of the leaf reached by each row, -1 for the rows
+  without decision whose error is set in `errors`.
+  """
+  children = nodes["children"]
+  rules = nodes["rules"]
+  leaf_indices = np.full(len(errors), -1, dtype=np.int64)
+
+  level = [(0, rows)]
+  while level:
+    next_level = []
+    for index, node_rows in level:
+      if not children[index]:
+        leaf_indices[node_rows] = index
+        continue
+
+      remaining_rows = node_rows
+      for child_index in children[index]:
+        if not remaining_rows.size:
+          break
+        property_name, operator, operand = rules[child_index]
+        if operator not in _VECTORIZED_OPERATORS:
+          raise CraftAiDecisionError(_INVALID_OPERATOR_MESSAGE.format(operator))
+        mask = _VECTORIZED_OPERATORS[operator](columns[property_name][remaining_rows], operand)
+        next_level.append((child_index, remaining_rows[mask]))
+        remaining_rows = remaining_rows[~mask]
+
+      if remaining_rows.size:
+        prop = rules[children[index][0]][0]
+        value_indices, values = pd.factorize(columns[prop][remaining_rows])
+        messages = [
+          CraftAiNullDecisionError(
+            """Unable to take decision: value '{}' for property '{}' doesn't"""
+            """ validate any of the decision rules.""".format(value, prop)
+          ).message
+          for value in values
+        ]
+        errors[remaining_rows] = np.array(messages, dtype=object)[value_indices]
+    level = next_level
+
+  return leaf_indices
+#pylint: enable=R0914
+
+#pylint: disable=R0914
+def _leaves_masks(nodes, columns, rows_mask):
+  """Computes the mask of the rows reaching each leaf of the tree.
+
+  A row reaches a child when it reaches its parent, validates its decision
+  rule and doesn't validate the rules of the previous siblings. Returns the
+  `(leaf_index, decision_rules, mask)` of the leaves, in their index order.
+  """
+  children = nodes["children"]
+  rules = nodes["rules"]
+  leaves = []
+
+  to_visit = [(0, rows_mask, [])]
+  while to_visit:
+    index, mask, decision_rules = to_visit.pop()
+    if not children[index]:
+      leaves.append((index, decision_rules, mask))
+      continue
+
+    remaining_mask = mask
+    children_visits = []
+    for child_index in children[index]:
+      property_name, operator, operand = rules[child_index]
+      if operator not in _VECTORIZED_OPERATORS:
+        raise CraftAiDecisionError(_INVALID_OPERATOR_MESSAGE.format(operator))
+      values = columns[property_name]
+      if values is None:
+        child_mask = np.zeros(len(remaining_mask), dtype=bool)
+      else:
+        child_mask = remaining_mask & _VECTORIZED_OPERATORS[operator](values, operand)
+      remaining_mask = remaining_mask & ~child_mask
+      children_visits.append((child_index, child_mask, decision_rules + [{
+        "property": property_name,
+        "operator": operator,
+        "operand": operand
+      }]))
+    # Pushed in reverse order to be visited in order
+    to_visit.extend(reversed(children_visits))
+
+  return leaves
+#pylint: enable=R0914
+
+def _leaves_values(nodes):
+  leaves = nodes["leaves"]
+  predicted_values = [leaf[0] if leaf else None for leaf in leaves]
+  is_numerical = all(
+    value is None or isinstance(value, numbers.Real) and not isinstance(value, bool)
+    for value in predicted_values
+  )
+  if is_numerical:
+    predicted_values = np.array(
+      [np.nan if value is None else value for value in predicted_values], dtype=np.float64
+    )
+  else:
+    predicted_values = np.array(predicted_values + [None], dtype=object)[:-1]
+  confidences = np.array([leaf[1] if leaf else np.nan for leaf in leaves], dtype=np.float64)
+  standard_deviations = np.array(
+    [np.nan if not leaf or leaf[2] is None else leaf[2] for leaf in leaves], dtype=np.float64
+  )
+  return predicted_values, confidences, standard_deviations
+
+#pylint: disable=R0914
+def decide_batch(tree, data):
+  """Takes decisions for many contexts at once.
+
+  `tree` is a decision tree or a `CompiledTree`, `data` is a `DataFrame` or
+  a dictionary of equally sized columns, one per context property.
+
+  Returns, for each output, a dictionary of arrays holding for each row the
+  `predicted_value`, `confidence` and `standard_deviation` (`NaN` when not
+  applicable) of the decision, or its `error` message (`None` when a
+  decision was taken), and the `leaf_index` of the leaf reached by the row
+  (-1 when none was).
+  """
+  if not isinstance(tree, CompiledTree):
+    tree = CompiledTree(tree)
+
+  rows_count = _rows_count(data)
+  columns, raw_columns, missings, invalids = _context_columns(tree, data)
+  context_errors = _invalid_context_errors(tree, raw_columns, missings, invalids, rows_count)
+  valid_rows = np.flatnonzero(pd.isnull(context_errors))
+
+  decisions = {}
+  for output_name, nodes in tree.outputs:
+    errors = context_errors.copy()
+    leaf_indices = _route_rows(nodes, columns, valid_rows, errors)
+    predicted_values, confidences, standard_deviations = _leaves_values(nodes)
+
+    null_leaves = pd.isnull(predicted_values[leaf_indices]) & (leaf_indices >= 0)
+    if null_leaves.any():
+      errors[null_leaves] = CraftAiNullDecisionError(
+        """Unable to take decision: the decision tree has no valid"""
+        """ predicted value for the given context."""
+      ).message
+
+    decided = pd.isnull(errors)
+    output_predicted_values = np.full(rows_count,
+                                      None if predicted_values.dtype == object else np.nan,
+                                      dtype=predicted_values.dtype)
+    output_predicted_values[decided] = predicted_values[leaf_indices[decided]]
+    output_confidences = np.full(rows_count, np.nan)
+    output_confidences[decided] = confidences[leaf_indices[decided]]
+    output_standard_deviations = np.full(rows_count, np.nan)
+    output_standard_deviations[decided] = standard_deviations[leaf_indices[decided]]
+
+    decisions[output_name] = {
+      "predicted_value": output_predicted_values,
+      "confidence": output_confidences,
+      "standard_deviation": output_standard_deviations,
+      "leaf_index": leaf_indices,
+      "error": errors
+    }
+
+  return decisions
+#pylint: enable=R0914
+
+#pylint: disable=R0914
+def leaves_masks(tree, data):
+  """Partitions contexts into the leaves of a decision tree.
+
+  `tree` is a decision tree or a `CompiledTree`, `data` is a `DataFrame` or
+  a dictionary of equally sized columns, one per context property.
+
+  Returns, for each output, the list of the leaves of its tree as
+  `(leaf_index, leaf, mask)` tuples, where `leaf_index` is the one given by
+  `decide_batch`, `leaf` holds the `predicted_value`, `confidence`,
+  `standard_deviation` (if any) and `decision_rules` of the leaf, and `mask`
+  is the boolean array of the rows reaching the leaf. Rows whose context is
+  not valid don't reach any leaf.
+  """
+  if not isinstance(tree, CompiledTree):
+    tree = CompiledTree(tree)
+
+  rows_count = _rows_count(data)
+  columns, raw_columns, missings, invalids = _context_columns(tree, data)
+  valid_rows_mask = np.asarray(pd.isnull(
+    _invalid_context_errors(tree, raw_columns, missings, invalids, rows_count)
+  ), dtype=bool)
+
+  outputs_leaves = {}
+  for output_name, nodes in tree.outputs:
+    leaves = []
+    for leaf_index, decision_rules, mask in _leaves_masks(nodes, columns, valid_rows_mask):
+      predicted_value, confidence, standard_deviation = nodes["leaves"][leaf_index]
+      leaf = {
+        "predicted_value": predicted_value,
+        "confidence": confidence,
+        "decision_rules": decision_rules
+      }
+      if standard_deviation is not None:
+        leaf["standard_deviation"] = standard_deviation
+      leaves.append((leaf_index, leaf, mask))
+    outputs_leaves[output_name] = leaves
+
+  return outputs_leaves
+#pylint: enable=R0914
@@ -1,14 +1,9 @@
-from six.moves import range
-
 import pandas as pd
 
 from .. import Client as VanillaClient
 from ..errors import CraftAiBadRequestError
 from .interpreter import Interpreter
-
-def chunker(to_be_chunked_df, chunk_size):
-  return (to_be_chunked_df[pos:pos + chunk_size]
-          for pos in range(0, len(to_be_chunked_df), chunk_size))
+from .operations import ColumnarFrameBuilder, operations_chunks
 
 class Client(VanillaClient):
   """Client class for craft ai's API using pandas dataframe types"""
@@ -17,42 +12,39 @@ class Client(VanillaClient):
       if not isinstance(operations.index, pd.DatetimeIndex):
         raise CraftAiBadRequestError("Invalid dataframe given, it is not time indexed")
 
-      chunk_size = self.config["operationsChunksSize"]
-
-      for chunk in chunker(operations, chunk_size):
-        chunk_operations = [
-          {
-            "timestamp": row.name.value // 10 ** 9, # Timestamp.value returns nanoseconds
-            "context": {
-              col: row[col] for col in operations.columns if pd.notnull(row[col])
-            }
-          } for _, row in chunk.iterrows()
-        ]
-        super(Client, self).add_operations(agent_id, chunk_operations)
-
-      return {
-        "message": "Successfully added %i operation(s) to the agent \"%s/%s/%s\" context."
-                   % (len(operations), self.config["owner"], self.config["project"], agent_id)
-      }
+      # Raises an error when agent_id is invalid
+      self._check_agent_id(agent_id)
+
+      # Chunks are converted lazily, when they are about to be sent
+      chunks = operations_chunks(operations, self.config["operationsChunksSize"])
+      chunks_report = self._add_operations_chunks([(agent_id, chunks)])
+
+      return self._operations_addition_result(agent_id, len(operations), chunks_report)
     else:
       return super(Client, self).add_operations(agent_id, operations)
 
   def get_operations_list(self, agent_id, start=None, end=None):
-    operations_list = super(Client, self).get_operations_list(agent_id, start, end)
+    frame_builder = ColumnarFrameBuilder(self.get_agent(agent_id)["configuration"], "context")
+    for page in self.iter_operations_pages(agent_id, start, end):
+      frame_builder.add_page(page)
 
-    return pd.DataFrame(
-      [operation["context"] for operation in operations_list],
-      index=pd.to_datetime([operation["timestamp"] for operation in operations_list], unit="s")
-    )
+    return frame_builder.to_df()
 
   def get_state_history(self, agent_id, start=None, end=None):
-    state_history = super(Client, self).get_state_history(agent_id, start, end)
+    frame_builder = ColumnarFrameBuilder(self.get_agent(agent_id)["configuration"], "sample")
+    for page in self.iter_state_history_pages(agent_id, start, end):
+      frame_builder.add_page(page)
 
-    return pd.DataFrame(
-      [state["sample"] for state in state_history],
-      index=pd.to_datetime([state["timestamp"] for state in state_history], unit="s")
-    )
+    return frame_builder.to_df()
+
+  @staticmethod
+  def decide_from_contexts_df(tree, contexts_df, n_jobs=1):
+    return Interpreter.decide_from_contexts_df(tree, contexts_df, n_jobs)
+
+  @staticmethod
+  def decide_batch(tree, data):
+    return Interpreter.decide_batch(tree, data)
 
   @staticmethod
-  def decide_from_contexts_df(tree, contexts_df):
-    return Interpreter.decide_from_contexts_df(tree, contexts_df)
+  def leaves_masks(tree, data):
+    return Interpreter.leaves_masks(tree, data)
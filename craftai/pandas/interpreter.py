@@ -1,7 +1,11 @@
+import multiprocessing
+
+import numpy as np
 import pandas as pd
 
 from .. import Interpreter as VanillaInterpreter, Time
 from ..errors import CraftAiBadRequestError, CraftAiNullDecisionError
+from .batch import decide_batch, leaves_masks
 
 def decide_from_row(tree, columns, row):
   time = Time(
@@ -24,13 +28,63 @@ def decide_from_row(tree, columns, row):
   except CraftAiNullDecisionError as e:
     return pd.Series(data=[e.message], index=["error"])
 
+def decide_from_block(tree, contexts_df):
+  return contexts_df.apply(lambda row: decide_from_row(tree,
+                                                       contexts_df.columns,
+                                                       row)
+                           , axis=1)
+
+# The decision tree of a worker process, shipped once when the process starts
+_WORKER_TREE = {}
+
+def _init_worker(tree):
+  _WORKER_TREE["tree"] = tree
+
+def _decide_from_worker_block(contexts_df):
+  return decide_from_block(_WORKER_TREE["tree"], contexts_df)
+
+# Blocks per worker process, to balance the load between the processes
+_BLOCKS_PER_JOB = 4
+
 class Interpreter(VanillaInterpreter):
   @staticmethod
-  def decide_from_contexts_df(tree, contexts_df):
+  def decide_from_contexts_df(tree, contexts_df, n_jobs=1):
+    """Takes a decision for each row of the given time indexed `DataFrame`.
+
+    With `n_jobs` greater than 1, or -1 to use all the CPUs, the frame is
+    split into contiguous blocks scored in parallel by `n_jobs` processes,
+    the tree being sent once to each of them.
+    """
     if not isinstance(contexts_df.index, pd.DatetimeIndex):
       raise CraftAiBadRequestError("Invalid dataframe given, it is not time indexed")
 
-    return contexts_df.apply(lambda row: decide_from_row(tree,
-                                                         contexts_df.columns,
-                                                         row)
-                             , axis=1)
+    if n_jobs < 0:
+      n_jobs = multiprocessing.cpu_count()
+    n_jobs = min(n_jobs, len(contexts_df.index))
+    if n_jobs <= 1:
+      return decide_from_block(tree, contexts_df)
+
+    bounds = np.linspace(0, len(contexts_df.index), n_jobs * _BLOCKS_PER_JOB + 1).astype(int)
+    blocks = [contexts_df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])
+              if end > start]
+    pool = multiprocessing.Pool(n_jobs, _init_worker, (tree,))
+    try:
+      # The results come back in the order of the blocks
+      results = pool.map(_decide_from_worker_block, blocks)
+    finally:
+      pool.close()
+      pool.join()
+
+    # Like `DataFrame.apply`, the columns are sorted when the blocks have different ones
+    columns = results[0].columns
+    for result in results[1:]:
+      columns = columns.union(result.columns)
+    return pd.concat(results).reindex(columns=columns)
+
+  @staticmethod
+  def decide_batch(tree, data):
+    return decide_batch(tree, data)
+
+  @staticmethod
+  def leaves_masks(tree, data):
+    return leaves_masks(tree, data)
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+
+from six.moves import range
+
+import numpy as np
+import pandas as pd
+
+def _column_values(series):
+  if series.dtype.kind in "mM":
+    # Keeping pandas' timestamps and timedeltas instead of numpy integers
+    return series.astype(object).values
+  return series.values
+
+def operations_chunks(df, chunk_size):
+  """Lazily converts a time indexed `DataFrame` to chunks of operations.
+
+  Yields `(offset, operations)` for successive chunks of `chunk_size` rows.
+  The conversion is done column by column: values are converted to python
+  types, and missing values found, once per column instead of once per cell.
+  """
+  # The index values are UTC datetimes, whatever its timezone
+  timestamps = df.index.values.astype("datetime64[s]").astype(np.int64).tolist()
+  columns = list(df.columns)
+  values = [_column_values(df.iloc[:, position]) for position in range(len(columns))]
+  notnull = df.notnull().values
+  complete_rows = notnull.all(axis=1).tolist()
+
+  for offset in range(0, len(df.index), chunk_size):
+    end = min(offset + chunk_size, len(df.index))
+    if columns:
+      rows = zip(*[column_values[offset:end].tolist() for column_values in values])
+    else:
+      rows = [()] * (end - offset)
+    chunk_notnull = notnull[offset:end].tolist()
+
+    operations = []
+    for index, row in enumerate(rows, offset):
+      if complete_rows[index]:
+        context = dict(zip(columns, row))
+      else:
+        context = {
+          col: value for col, value, is_set in zip(columns, row, chunk_notnull[index - offset])
+          if is_set
+        }
+      operations.append({
+        "timestamp": timestamps[index],
+        "context": context
+      })
+    yield offset, operations
+
+_FLOAT_TYPES = ["continuous", "time_of_day", "day_of_week", "day_of_month", "month_of_year"]
+_CATEGORY_TYPES = ["enum", "timezone"]
+
+class ColumnarFrameBuilder(object):
+  """Builds a time indexed `DataFrame` from pages of operations or states.
+
+  Each page is converted to typed column buffers as soon as it is added, so
+  that the raw items can be freed, and the buffers are concatenated once by
+  `to_df`. The columns of the context properties declared in the given
+  agent's configuration are `float64` for the continuous and time
+  properties and `category` for the enum and timezone ones.
+  """
+  def __init__(self, configuration, key="context"):
+    self._key = key
+    self._properties_types = {
+      prop_name: prop["type"] for prop_name, prop in configuration["context"].items()
+    }
+    self._properties_order = list(configuration["context"])
+    self._pages = []
+    self._timestamps = []
+    self._categories = {}
+
+  def add_page(self, items):
+    contexts = [item[self._key] for item in items]
+    self._timestamps.append(np.array([item["timestamp"] for item in items], dtype=np.int64))
+
+    prop_names = set()
+    for context in contexts:
+      prop_names.update(context)
+    columns = {}
+    for prop_name in prop_names:
+      values = [context.get(prop_name) for context in contexts]
+      prop_type = self._properties_types.get(prop_name)
+      if prop_type in _FLOAT_TYPES:
+        columns[prop_name] = np.array(values, dtype=np.float64)
+      elif prop_type in _CATEGORY_TYPES:
+        categories = self._categories.setdefault(prop_name, {})
+        columns[prop_name] = np.array([
+          -1 if value is None else categories.setdefault(value, len(categories))
+          for value in values
+        ], dtype=np.int32)
+      else:
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        columns[prop_name] = column
+    self._pages.append((len(contexts), columns))
+
+  def _column(self, prop_name):
+    prop_type = self._properties_types.get(prop_name)
+    if prop_type in _FLOAT_TYPES:
+      missing_value, dtype = np.nan, np.float64
+    elif prop_type in _CATEGORY_TYPES:
+      missing_value, dtype = -1, np.int32
+    else:
+      missing_value, dtype = None, object
+    column = np.concatenate([
+      columns[prop_name] if prop_name in columns else np.full(length, missing_value, dtype=dtype)
+      for length, columns in self._pages
+    ])
+    if prop_type in _CATEGORY_TYPES:
+      categories = self._categories[prop_name]
+      return pd.Categorical.from_codes(column, sorted(categories, key=categories.get))
+    return column
+
+  def to_df(self):
+    seen_prop_names = set()
+    for _, columns in self._pages:
+      seen_prop_names.update(columns)
+    # Declared properties first, in the configuration's order
+    prop_names = [prop_name for prop_name in self._properties_order
+                  if prop_name in seen_prop_names]
+    prop_names += sorted(seen_prop_names.difference(prop_names))
+
+    timestamps = np.concatenate(self._timestamps or [np.array([], dtype=np.int64)])
+    return pd.DataFrame(
+      OrderedDict((prop_name, self._column(prop_name)) for prop_name in prop_names),
+      index=pd.to_datetime(timestamps, unit="s"),
+      columns=prop_names
+    )
@@ -0,0 +1,38 @@
+import threading
+
+from concurrent.futures import Future
+
+class SingleFlight(object): #pylint: disable=R0903
+  """Deduplicates concurrent calls sharing the same key.
+
+  The first caller runs the function while the others, calling `run` with the
+  same key before it returns, wait for its result or error.
+  """
+  def __init__(self):
+    self._calls = {}
+    self._lock = threading.Lock()
+
+  def run(self, key, function, *args):
+    with self._lock:
+      call = self._calls.get(key)
+      if call is None:
+        call = self._calls[key] = Future()
+        is_leader = True
+      else:
+        is_leader = False
+
+    if not is_leader:
+      return call.result()
+
+    try:
+      result = function(*args)
+    except BaseException as e:
+      # Waking the other callers up even on interruptions
+      call.set_exception(e)
+      raise
+    else:
+      call.set_result(result)
+      return result
+    finally:
+      with self._lock:
+        del self._calls[key]
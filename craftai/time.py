@@ -17,21 +17,60 @@ from craftai.timezones import is_timezone, timezone_offset_in_sec
 _EPOCH = datetime(1970, 1, 1, tzinfo=pyutc)
 _ISO_FMT = "%Y-%m-%dT%H:%M:%S%z"
 
+# Timezones given as strings, and the local timezone (indexed by ""), are only
+# parsed, or looked up, once
+_TIMEZONES = {}
+
+def _get_timezone(timezone):
+  if isinstance(timezone, tzinfo):
+    # If it's already a timezone object, no more work is needed
+    return timezone
+  if not timezone:
+    timezone = ""
+  try:
+    return _TIMEZONES[timezone]
+  except (KeyError, TypeError):
+    pass
+
+  if timezone == "":
+    _TIMEZONES[timezone] = get_localzone()
+  elif isinstance(timezone, six.string_types) and is_timezone(timezone):
+    # If it's a string, we convert it to a usable timezone object
+    offset = timezone_offset_in_sec(timezone)
+    _TIMEZONES[timezone] = dt_timezone(timedelta(seconds=offset))
+  else:
+    raise CraftAiTimeError(
+      """Unable to instantiate Time with the given timezone."""
+      """ {} is neither a string nor a timezone.""".format(timezone)
+    )
+  return _TIMEZONES[timezone]
+
+# Formatted UTC offsets, by `timedelta`
+_UTC_OFFSETS_NAMES = {}
+
+def _utc_offset_name(date_time):
+  utc_offset = date_time.utcoffset()
+  if utc_offset not in _UTC_OFFSETS_NAMES:
+    offset = date_time.strftime("%z")
+    _UTC_OFFSETS_NAMES[utc_offset] = offset[:3] + ":" + offset[3:]
+  return _UTC_OFFSETS_NAMES[utc_offset]
+
 class Time(object):
-  """Handles time in a useful way for craft ai's client"""
+  """Handles time in a useful way for craft ai's client
+
+  The local timezone is looked up once, when it is first needed. The fields
+  are computed when they are first accessed.
+  """
+  __slots__ = ("_datetime", "_timestamp", "_timezone", "_utc_iso")
+
   def __init__(self, t=None, timezone=""):
     if not t:
       # If no initial timestamp is given, the current local time is used
-      _time = datetime.now(get_localzone())
+      _time = datetime.now(_get_timezone(timezone))
     elif isinstance(t, int):
       # Else if t is an int we try to use it as a given timestamp with
       # local UTC offset by default
-      try:
-        _time = datetime.fromtimestamp(t, get_localzone())
-      except (OverflowError, OSError) as e:
-        raise CraftAiTimeError(
-          """Unable to instantiate Time from given timestamp. {}""".
-          format(e.__str__()))
+      _time = Time._datetime_from_timestamp(t, _get_timezone(timezone))
     elif isinstance(t, six.string_types):
       # Else if t is a string we try to interprete it as an ISO time
       # string
@@ -41,50 +80,109 @@ class Time(object):
         raise CraftAiTimeError(
           """Unable to instantiate Time from given string. {}""".
           format(e.__str__()))
+      if timezone:
+        _time = _time.astimezone(_get_timezone(timezone))
     else:
       raise CraftAiTimeError(
         """Unable to instantiate Time from given timestamp."""
         """ It must be integer or string."""
       )
 
-    if timezone:
-      # If a timezone is specified we can try to use it
-      if isinstance(timezone, tzinfo):
-        # If it's already a timezone object, no more work is needed
-        _time = _time.astimezone(timezone)
-      elif isinstance(timezone, six.string_types) and is_timezone(timezone):
-        # If it's a string, we convert it to a usable timezone object
-        offset = timezone_offset_in_sec(timezone)
-        _time = _time.astimezone(tz=dt_timezone(timedelta(seconds=offset)))
-      else:
-        raise CraftAiTimeError(
-          """Unable to instantiate Time with the given timezone."""
-          """ {} is neither a string nor a timezone.""".format(timezone)
-        )
+    self._set_datetime(_time)
 
+  @classmethod
+  def from_datetime(cls, date_time, timezone=""):
+    """Returns the Time of the given `datetime`, in the given timezone or in
+    its own one. Naive datetimes are considered to be local times."""
+    if date_time.tzinfo is None:
+      _time = Time._datetime_from_timestamp(Time.timestamp_from_datetime(date_time),
+                                            _get_timezone(timezone))
+    elif timezone:
+      _time = date_time.astimezone(_get_timezone(timezone))
+    else:
+      _time = date_time
+
+    time_instance = cls.__new__(cls)
+    time_instance._set_datetime(_time) #pylint: disable=W0212
+    return time_instance
+
+  @classmethod
+  def from_timestamp(cls, timestamp, timezone=""):
+    """Returns the Time of the given POSIX timestamp, an int or a float, in
+    the given timezone or in the local one."""
+    time_instance = cls.__new__(cls)
+    #pylint: disable=W0212
+    time_instance._set_datetime(Time._datetime_from_timestamp(timestamp,
+                                                              _get_timezone(timezone)))
+    #pylint: enable=W0212
+    return time_instance
+
+  @staticmethod
+  def _datetime_from_timestamp(timestamp, timezone):
     try:
-      self.utc_iso = _time.isoformat()
-    except ValueError as e:
+      return datetime.fromtimestamp(timestamp, timezone)
+    except (OverflowError, OSError, ValueError) as e:
       raise CraftAiTimeError(
-        """Unable to create ISO 8061 UTCstring. {}""".
+        """Unable to instantiate Time from given timestamp. {}""".
         format(e.__str__()))
 
-    self.day_of_week = _time.weekday()
-    self.time_of_day = _time.hour + _time.minute / 60 + _time.second / 3600
-    self.day_of_month = _time.day
-    self.month_of_year = _time.month
-    self.timezone = _time.strftime("%z")[:3] + ":" + _time.strftime("%z")[3:]
-    self.timestamp = Time.timestamp_from_datetime(_time)
+  def _set_datetime(self, date_time):
+    # Every slot is initialized here, the lazy ones being computed by the properties
+    self._datetime = date_time
+    self._timestamp = None
+    self._timezone = None
+    self._utc_iso = None
+
+  @property
+  def utc_iso(self):
+    if self._utc_iso is None:
+      try:
+        self._utc_iso = self._datetime.isoformat() #pylint: disable=W0201
+      except ValueError as e:
+        raise CraftAiTimeError(
+          """Unable to create ISO 8061 UTCstring. {}""".
+          format(e.__str__()))
+    return self._utc_iso
+
+  @property
+  def day_of_week(self):
+    return self._datetime.weekday()
+
+  @property
+  def time_of_day(self):
+    _time = self._datetime
+    return _time.hour + _time.minute / 60 + _time.second / 3600
+
+  @property
+  def day_of_month(self):
+    return self._datetime.day
+
+  @property
+  def month_of_year(self):
+    return self._datetime.month
+
+  @property
+  def timezone(self):
+    if self._timezone is None:
+      self._timezone = _utc_offset_name(self._datetime) #pylint: disable=W0201
+    return self._timezone
+
+  @property
+  def timestamp(self):
+    if self._timestamp is None:
+      self._timestamp = Time.timestamp_from_datetime(self._datetime) #pylint: disable=W0201
+    return self._timestamp
 
   def to_dict(self):
     """Returns the Time instance as a usable dictionary for craftai"""
+    _time = self._datetime
     return {
       "timestamp": int(self.timestamp),
       "timezone": self.timezone,
-      "time_of_day": self.time_of_day,
-      "day_of_week": self.day_of_week,
-      "day_of_month": self.day_of_month,
-      "month_of_year": self.month_of_year,
+      "time_of_day": _time.hour + _time.minute / 60 + _time.second / 3600,
+      "day_of_week": _time.weekday(),
+      "day_of_month": _time.day,
+      "month_of_year": _time.month,
       "utc_iso": self.utc_iso
     }
 
@@ -98,6 +196,119 @@ class Time(object):
 
     return (date_time - _EPOCH).total_seconds()
 
+def _total_seconds(utc_offset):
+  return utc_offset.days * 86400 + utc_offset.seconds
+
+def _utc_offsets(seconds, timezone):
+  """Returns the UTC offsets, in seconds, of the given timezone at the given
+  POSIX timestamps."""
+  import numpy as np
+
+  fixed_offset = timezone.utcoffset(None)
+  if fixed_offset is not None:
+    return np.full(len(seconds), _total_seconds(fixed_offset), dtype=np.int64)
+
+  try:
+    import pandas as pd
+    utc_times = pd.to_datetime(seconds, unit="s", utc=True)
+    local_times = utc_times.tz_convert(timezone).tz_localize(None)
+    return local_times.values.astype("datetime64[s]").astype(np.int64) - seconds
+  except ImportError:
+    # Without pandas, the offsets are retrieved once per distinct timestamp
+    uniques, inverse = np.unique(seconds, return_inverse=True)
+    offsets = np.array([
+      _total_seconds(datetime.fromtimestamp(timestamp, timezone).utcoffset())
+      for timestamp in uniques.tolist()
+    ], dtype=np.int64)
+    return offsets[inverse]
+
+def _timezones_groups(timezone, count):
+  """Returns the `(timezone, rows)` of the groups of times in the same
+  timezone, `timezone` being either a timezone or one timezone per time."""
+  import numpy as np
+
+  if timezone is None or isinstance(timezone, (tzinfo,) + six.string_types):
+    return [(_get_timezone(timezone), slice(None))]
+  if len(timezone) != count:
+    raise CraftAiTimeError(
+      """Unable to compute the time features, {} timezones are given for {} times.""".
+      format(len(timezone), count)
+    )
+  groups_rows = {}
+  for row, row_timezone in enumerate(timezone):
+    groups_rows.setdefault(_get_timezone(row_timezone), []).append(row)
+  return [(group_timezone, np.array(rows, dtype=np.intp))
+          for group_timezone, rows in groups_rows.items()]
+
+def _offsets_and_names(seconds, groups):
+  """Returns the UTC offsets, in seconds, of the given POSIX timestamps and
+  their names, the groups of timestamps being in the same timezone."""
+  import numpy as np
+
+  offsets = np.empty(len(seconds), dtype=np.int64)
+  names = np.empty(len(seconds), dtype=object)
+  for group_timezone, rows in groups:
+    group_seconds = seconds[rows]
+    group_offsets = _utc_offsets(group_seconds, group_timezone)
+    offsets[rows] = group_offsets
+    # The offsets are formatted like `Time` does, once per distinct offset
+    _, first_rows, inverse = np.unique(group_offsets, return_index=True, return_inverse=True)
+    group_names = np.array([
+      _utc_offset_name(datetime.fromtimestamp(group_seconds[first_row], group_timezone))
+      for first_row in first_rows.tolist()
+    ], dtype=object)
+    names[rows] = group_names[inverse.reshape(-1)]
+  return offsets, names
+
+def time_features(timestamps, timezone=None):
+  """Computes the properties generated from the given times at once.
+
+  `timestamps` is a numpy `datetime64` array of UTC times or a pandas
+  `DatetimeIndex`. `timezone` is either a timezone, given like the timezone of
+  a `Time`, or a sequence of timezones, one per time. By default, the timezone
+  of the `DatetimeIndex` is used, or the local one.
+
+  Returns a dictionary of arrays indexed by "time_of_day", "day_of_week",
+  "day_of_month", "month_of_year" and "timezone", whose values are the same
+  as the ones of `Time(timestamp, timezone).to_dict()`, the timestamps being
+  truncated to the second.
+  """
+  import numpy as np
+
+  if hasattr(timestamps, "tz"):
+    # The values of a DatetimeIndex are UTC times, whatever its timezone
+    if timezone is None:
+      timezone = timestamps.tz
+    timestamps = timestamps.values
+  timestamps = np.asarray(timestamps)
+  if timestamps.dtype.kind != "M":
+    raise CraftAiTimeError(
+      """Unable to compute the time features, the given times are not datetimes."""
+    )
+  if np.isnat(timestamps).any():
+    raise CraftAiTimeError(
+      """Unable to compute the time features, the given times contain missing values."""
+    )
+  seconds = timestamps.astype("datetime64[s]").astype(np.int64)
+
+  # Rows are grouped by timezone to retrieve the offsets of each timezone at once
+  offsets, timezones = _offsets_and_names(seconds, _timezones_groups(timezone, len(seconds)))
+
+  local_seconds = seconds + offsets
+  days = local_seconds // 86400
+  seconds_of_day = local_seconds - days * 86400
+  months = days.astype("datetime64[D]").astype("datetime64[M]")
+
+  return {
+    "time_of_day": ((seconds_of_day // 3600) + (seconds_of_day % 3600 // 60) / 60 +
+                    (seconds_of_day % 60) / 3600),
+    # The 1st of January 1970 was a thursday
+    "day_of_week": (days + 3) % 7,
+    "day_of_month": (days - months.astype("datetime64[D]").astype(np.int64)) + 1,
+    "month_of_year": months.astype(np.int64) % 12 + 1,
+    "timezone": timezones
+  }
+
 #pylint: disable=C0103,W0212
 class dt_timezone(tzinfo):
   """
@@ -5,6 +5,7 @@ from os import linesep
 
 import re
 import subprocess
+import sys
 
 try:
   from setuptools import setup
@@ -21,6 +22,11 @@ def get_package_metadata(package, key):
 with open(path.join(here, 'README.rst'), encoding='utf-8') as f:
   long_description = f.read()
 
+packages = ["craftai", "craftai.pandas"]
+# craftai.aio relies on the asynchronous generators of python 3.6
+if sys.version_info >= (3, 6):
+  packages.append("craftai.aio")
+
 setup(
   name=get_package_metadata("craftai", "title"),
   version=get_package_metadata("craftai", "version"),
@@ -52,8 +58,9 @@ setup(
   ],
   keywords="ai craft-ai",
 
-  packages=["craftai"],
+  packages=packages,
   install_requires=[
+    "futures==3.2.0;python_version<'3.2'",
     "requests==2.13.0",
     "six==1.10",
     "datetime==4.1.1",
@@ -63,6 +70,13 @@ setup(
   extras_require = {
     "pandas_support":  [
       "pandas>=0.20"
+    ],
+    "aio_support":  [
+      "aiohttp>=3.3;python_version>='3.6'"
+    ],
+    "fast_json_support":  [
+      "orjson>=2.5;python_version>='3.6'",
+      "ujson>=2.0;python_version>='3.5' and python_version<'3.6'"
     ]
   },
 
@@ -0,0 +1,303 @@
+import random
+
+from craftai import Time, errors as craft_err
+
+LIGHTBULB_CONFIGURATION = {
+  "context": {
+    "presence": {
+      "type": "enum"
+    },
+    "lightIntensity": {
+      "type": "continuous"
+    },
+    "time": {
+      "type": "time_of_day"
+    },
+    "day": {
+      "type": "day_of_week"
+    },
+    "tz": {
+      "type": "timezone"
+    },
+    "lightbulbColor": {
+      "type": "enum"
+    },
+    "lightbulbIntensity": {
+      "type": "continuous"
+    }
+  },
+  "output": ["lightbulbColor", "lightbulbIntensity"],
+  "time_quantum": 100
+}
+
+LIGHTBULB_TREE = {
+  "_version": "1.1.0",
+  "configuration": LIGHTBULB_CONFIGURATION,
+  "trees": {
+    "lightbulbColor": {
+      "children": [
+        {
+          "decision_rule": {
+            "property": "presence",
+            "operator": "is",
+            "operand": "none"
+          },
+          "predicted_value": "black",
+          "confidence": 0.9
+        },
+        {
+          "decision_rule": {
+            "property": "presence",
+            "operator": "is",
+            "operand": "robert"
+          },
+          "children": [
+            {
+              "decision_rule": {
+                "property": "time",
+                "operator": "[in[",
+                "operand": [7, 20]
+              },
+              "predicted_value": "green",
+              "confidence": 0.8
+            },
+            {
+              "decision_rule": {
+                "property": "time",
+                "operator": "[in[",
+                "operand": [20, 7]
+              },
+              "predicted_value": "blue",
+              "confidence": 0.7
+            }
+          ]
+        },
+        {
+          "decision_rule": {
+            "property": "presence",
+            "operator": "is",
+            "operand": "gisele"
+          },
+          "children": [
+            {
+              "decision_rule": {
+                "property": "lightIntensity",
+                "operator": "<",
+                "operand": 0.5
+              },
+              "predicted_value": "red"
+            },
+            {
+              "decision_rule": {
+                "property": "lightIntensity",
+                "operator": ">=",
+                "operand": 0.5
+              },
+              "predicted_value": None,
+              "confidence": 0
+            }
+          ]
+        }
+      ]
+    },
+    "lightbulbIntensity": {
+      "children": [
+        {
+          "decision_rule": {
+            "property": "day",
+            "operator": "[in[",
+            "operand": [0, 5]
+          },
+          "predicted_value": 0.75,
+          "standard_deviation": 0.125,
+          "confidence": 0.6
+        },
+        {
+          "decision_rule": {
+            "property": "day",
+            "operator": "[in[",
+            "operand": [5, 0]
+          },
+          "predicted_value": 0.25,
+          "standard_deviation": 0.5,
+          "confidence": 0.4
+        }
+      ]
+    }
+  }
+}
+
+RANDOM_CONFIGURATION = {
+  "context": {
+    "e1": {
+      "type": "enum"
+    },
+    "e2": {
+      "type": "enum"
+    },
+    "c1": {
+      "type": "continuous"
+    },
+    "c2": {
+      "type": "continuous"
+    },
+    "time": {
+      "type": "time_of_day"
+    },
+    "day": {
+      "type": "day_of_week"
+    },
+    "month": {
+      "type": "month_of_year",
+      "is_generated": False
+    },
+    "tz": {
+      "type": "timezone"
+    },
+    "color": {
+      "type": "enum"
+    },
+    "intensity": {
+      "type": "continuous"
+    }
+  },
+  "output": ["color", "intensity"],
+  "time_quantum": 100
+}
+
+ENUM_VALUES = ["CYAN", "MAGENTA", "YELLOW", "BLACK", "WHITE"]
+TIMEZONES = ["+01:00", "-05:00", "+02:00", "+05:30", "Z"]
+TIMESTAMPS = [1458741230, 1489998174, 1500000000, 1262304000, 1512121212]
+
+def _periodic_operands(rng, period, count):
+  cuts = sorted(rng.sample(range(period), count))
+  return [[cuts[i], cuts[(i + 1) % count]] for i in range(count)]
+
+def _random_rule_children(rng, property_name, property_type):
+  if property_type == "enum" or property_type == "timezone":
+    values = ENUM_VALUES if property_type == "enum" else TIMEZONES
+    operands = list(values)
+    if rng.random() < 0.1:
+      # Leave some values out so that some contexts don't match any child
+      operands = rng.sample(values, rng.randint(2, len(values) - 1))
+    return [(property_name, "is", operand) for operand in operands]
+  if property_type == "continuous":
+    threshold = round(rng.uniform(-10, 10), 2)
+    return [(property_name, "<", threshold), (property_name, ">=", threshold)]
+  if property_type == "time_of_day":
+    return [(property_name, "[in[", operand)
+            for operand in _periodic_operands(rng, 24, rng.randint(2, 4))]
+  if property_type == "day_of_week":
+    return [(property_name, "[in[", operand)
+            for operand in _periodic_operands(rng, 7, rng.randint(2, 4))]
+  return [(property_name, "[in[", operand)
+          for operand in _periodic_operands(rng, 12, 2)]
+
+def _random_leaf(rng, output_type):
+  if rng.random() < 0.02:
+    return {"predicted_value": None, "confidence": 0}
+  if output_type == "enum":
+    leaf = {"predicted_value": rng.choice(ENUM_VALUES)}
+  else:
+    leaf = {
+      "predicted_value": rng.uniform(-100, 100),
+      "standard_deviation": rng.uniform(0, 10)
+    }
+  if rng.random() < 0.9:
+    leaf["confidence"] = rng.random()
+  return leaf
+
+def random_tree(seed, max_depth=6, configuration=None):
+  """Generates a random but valid decision tree."""
+  rng = random.Random(seed)
+  configuration = configuration or RANDOM_CONFIGURATION
+  splittable = [
+    (name, prop["type"]) for name, prop in sorted(configuration["context"].items())
+    if name not in configuration["output"]
+  ]
+
+  def build_node(depth, output_type):
+    node = {}
+    if depth >= max_depth or (depth > 0 and rng.random() < 0.2):
+      node.update(_random_leaf(rng, output_type))
+      return node
+    property_name, property_type = rng.choice(splittable)
+    node["children"] = []
+    rule_children = _random_rule_children(rng, property_name, property_type)
+    for property_name, operator, operand in rule_children:
+      child = build_node(depth + 1, output_type)
+      child["decision_rule"] = {
+        "property": property_name,
+        "operator": operator,
+        "operand": operand
+      }
+      node["children"].append(child)
+    return node
+
+  return {
+    "_version": "1.1.0",
+    "configuration": configuration,
+    "trees": {
+      output: build_node(0, configuration["context"][output]["type"])
+      for output in configuration["output"]
+    }
+  }
+
+def deep_tree(depth):
+  """Builds a tree of the given depth, splitting on 'lightIntensity' at each level."""
+  leaf = {"predicted_value": 0.5, "confidence": 0.9, "standard_deviation": 0.1}
+  node = leaf
+  for level in reversed(range(depth)):
+    node = {
+      "children": [
+        dict(leaf, decision_rule={"property": "lightIntensity", "operator": "<", "operand": level}),
+        dict(node, decision_rule={"property": "lightIntensity", "operator": ">=", "operand": level})
+      ]
+    }
+  return {
+    "_version": "1.1.0",
+    "configuration": {
+      "context": {
+        "lightIntensity": {"type": "continuous"},
+        "lightbulbIntensity": {"type": "continuous"}
+      },
+      "output": ["lightbulbIntensity"]
+    },
+    "trees": {"lightbulbIntensity": node}
+  }
+
+def random_decide_args(seed, configuration=None):
+  """Generates random `decide` arguments, a state and sometimes a `Time`."""
+  rng = random.Random(seed)
+  configuration = configuration or RANDOM_CONFIGURATION
+  state = {}
+  for name, prop in configuration["context"].items():
+    if name in configuration["output"] or rng.random() < 0.02:
+      continue
+    property_type = prop["type"]
+    if property_type == "enum":
+      state[name] = rng.choice(ENUM_VALUES)
+    elif property_type == "continuous":
+      state[name] = rng.choice([rng.uniform(-12, 12), rng.randint(-12, 12)])
+    elif property_type == "timezone":
+      state[name] = rng.choice(TIMEZONES)
+    elif property_type == "time_of_day":
+      state[name] = rng.uniform(0, 24)
+    elif property_type == "day_of_week":
+      state[name] = rng.randint(0, 6)
+    elif property_type == "day_of_month":
+      state[name] = rng.randint(1, 31)
+    else:
+      state[name] = rng.randint(1, 12)
+  if rng.random() < 0.01:
+    state[rng.choice(list(state.keys()))] = "invalid"
+  if rng.random() < 0.8:
+    return state, Time(rng.choice(TIMESTAMPS), rng.choice(TIMEZONES[:-1]))
+  return state, None
+
+def decide_outcome(decide, *args, **kwargs):
+  """Returns the decision, or the type and message of the decision error."""
+  try:
+    return decide(*args, **kwargs)
+  except craft_err.CraftAiDecisionError as e:
+    return type(e), e.message
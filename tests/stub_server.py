@@ -0,0 +1,210 @@
+"""Local stub of the craft ai API used to test the client offline."""
+import base64
+import json
+import threading
+import zlib
+
+from six.moves import BaseHTTPServer, socketserver
+#pylint: disable=C0411
+from six.moves.urllib.parse import parse_qs, urlparse
+#pylint: enable=C0411
+
+OWNER = "stub_owner"
+PROJECT = "stub_project"
+
+def _base64url(data):
+  return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def make_token(platform):
+  """Forges an unsigned token, the client only decodes its payload."""
+  header = _base64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode("utf-8"))
+  payload = _base64url(json.dumps({
+    "owner": OWNER,
+    "project": PROJECT,
+    "platform": platform
+  }).encode("utf-8"))
+  return "{}.{}.{}".format(header, payload, _base64url(b"signature"))
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  daemon_threads = True
+  allow_reuse_address = True
+
+class _StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  disable_nagle_algorithm = True
+
+  def setup(self):
+    BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+    with self.server.stub.lock:
+      self.server.stub.connections_count += 1
+
+  def log_message(self, format, *args): #pylint: disable=W0622
+    pass
+
+  # Names required by BaseHTTPRequestHandler
+  #pylint: disable=C0103
+  def do_GET(self):
+    self._handle("GET")
+
+  def do_POST(self):
+    self._handle("POST")
+
+  def do_DELETE(self):
+    self._handle("DELETE")
+  #pylint: enable=C0103
+
+  def _handle(self, method):
+    stub = self.server.stub
+    parsed_url = urlparse(self.path)
+    query = {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+    raw_body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+    body = raw_body
+    if self.headers.get("Content-Encoding") == "gzip":
+      body = zlib.decompress(raw_body, 16 + zlib.MAX_WBITS)
+    elif self.headers.get("Content-Encoding") == "deflate":
+      body = zlib.decompress(raw_body)
+    with stub.lock:
+      stub.requests.append({
+        "method": method,
+        "path": parsed_url.path,
+        "query": query,
+        "headers": dict(self.headers.items()),
+        "body": body,
+        "raw_body": raw_body
+      })
+
+    prefix = "/api/v1/{}/{}/".format(OWNER, PROJECT)
+    if not parsed_url.path.startswith(prefix):
+      self._send(404, {"message": "Unknown route"})
+      return
+    route = parsed_url.path[len(prefix):].split("/")
+    status, content, headers = stub.handle(method, route, query, body)
+    self._send(status, content, headers)
+
+  def _send(self, status, content, headers=None):
+    body = json.dumps(content).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json; charset=utf-8")
+    if self.server.stub.compress_responses and "gzip" in self.headers.get("Accept-Encoding", ""):
+      compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+      body = compressor.compress(body) + compressor.flush()
+      self.send_header("Content-Encoding", "gzip")
+      with self.server.stub.lock:
+        self.server.stub.responses_encodings.append("gzip")
+    self.send_header("Content-Length", str(len(body)))
+    for key, value in (headers or {}).items():
+      self.send_header(key, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+class StubServer(object): #pylint: disable=R0902
+  """In memory craft ai API served from a background thread.
+
+  `pending_trees` is the number of `202` answers sent before a decision
+  tree is returned, with a `Retry-After` header if `retry_after` is given.
+  `page_size` is the number of items per page of the paginated routes. When
+  `compress_responses` is set, responses are gzipped for the clients
+  accepting it.
+  """
+  def __init__(self, tree=None, page_size=100, pending_trees=0, #pylint: disable=R0913
+               retry_after=None, compress_responses=False):
+    self.tree = tree
+    self.page_size = page_size
+    self.pending_trees = pending_trees
+    self.retry_after = retry_after
+    self.compress_responses = compress_responses
+    self.agents = {}
+    self.requests = []
+    self.responses_encodings = []
+    self.connections_count = 0
+    self.lock = threading.Lock()
+    self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    self._server.stub = self
+    self._thread = threading.Thread(target=self._server.serve_forever)
+    self._thread.daemon = True
+
+  @property
+  def url(self):
+    return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+  @property
+  def client_cfg(self):
+    return {"token": make_token(self.url)}
+
+  def __enter__(self):
+    self._thread.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self._server.shutdown()
+    self._server.server_close()
+
+  def requests_to(self, method, path_suffix):
+    return [
+      request for request in self.requests
+      if request["method"] == method and request["path"].endswith(path_suffix)
+    ]
+
+  def handle(self, method, route, query, body): #pylint: disable=R0911
+    with self.lock:
+      if route == ["agents"]:
+        if method == "POST":
+          payload = json.loads(body.decode("utf-8"))
+          agent_id = payload.get("id", "stub_agent_{}".format(len(self.agents)))
+          self.agents[agent_id] = {"configuration": payload["configuration"], "operations": []}
+          return 201, {"id": agent_id, "configuration": payload["configuration"]}, None
+        return 200, {"agentsList": sorted(self.agents.keys())}, None
+
+      agent_id = route[1]
+      agent = self.agents.get(agent_id)
+      if agent is None:
+        if method == "DELETE":
+          return 200, {"id": agent_id}, None
+        return 404, {"message": "Agent '{}' not found".format(agent_id)}, None
+
+      sub_route = route[2:]
+      if not sub_route:
+        if method == "DELETE":
+          del self.agents[agent_id]
+        return 200, {"id": agent_id, "configuration": agent["configuration"]}, None
+      if sub_route == ["context"] and method == "POST":
+        operations = json.loads(body.decode("utf-8"))
+        agent["operations"].extend(operations)
+        return 201, {"message": "Added {} operations".format(len(operations))}, None
+      if sub_route == ["context"]:
+        return self._page(agent["operations"], route, query)
+      if sub_route == ["context", "state", "history"]:
+        history = [
+          {"timestamp": operation["timestamp"], "sample": operation["context"]}
+          for operation in agent["operations"]
+        ]
+        return self._page(history, route, query)
+      if sub_route == ["decision", "tree"]:
+        if self.pending_trees > 0:
+          self.pending_trees -= 1
+          headers = None if self.retry_after is None else {"Retry-After": self.retry_after}
+          return 202, {"message": "Computation in progress"}, headers
+        return 200, self.tree, None
+    return 404, {"message": "Unknown route"}, None
+
+  def _page(self, items, route, query):
+    start = int(query["start"]) if query.get("start") else None
+    end = int(query["end"]) if query.get("end") else None
+    items = [
+      item for item in items
+      if (start is None or item["timestamp"] >= start) and
+      (end is None or item["timestamp"] <= end)
+    ]
+    offset = int(query.get("offset", 0))
+    page = items[offset:offset + self.page_size]
+    headers = {}
+    if offset + self.page_size < len(items):
+      next_query = ["offset={}".format(offset + self.page_size)]
+      if start is not None:
+        next_query.append("start={}".format(start))
+      if end is not None:
+        next_query.append("end={}".format(end))
+      headers["x-craft-ai-next-page-url"] = "{}/api/v1/{}/{}/{}?{}".format(
+        self.url, OWNER, PROJECT, "/".join(route), "&".join(next_query)
+      )
+    return 200, page, headers
@@ -0,0 +1,94 @@
+import json
+import os
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+import craftai
+
+from .data import valid_data
+from .stub_server import StubServer
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+with open(os.path.join(HERE, "data", "large_operation_list.json")) as large_operation_list_file:
+  LARGE_VALID_OPERATIONS_SET = json.load(large_operation_list_file)
+
+def concurrent_client(server, ordered=False):
+  cfg = server.client_cfg
+  cfg["operationsAdditionConcurrency"] = 4
+  cfg["operationsAdditionOrdered"] = ordered
+  cfg["operationsChunksSize"] = 50
+  return craftai.Client(cfg)
+
+def test_add_operations_concurrently():
+  with StubServer() as server:
+    with concurrent_client(server) as client:
+      client.create_agent(valid_data.VALID_CONFIGURATION, "agent")
+      result = client.add_operations("agent", LARGE_VALID_OPERATIONS_SET)
+
+    assert_equal(len(result["chunks"]), len(server.requests_to("POST", "/context")))
+    assert_equal([chunk["offset"] for chunk in result["chunks"]],
+                 list(range(0, len(LARGE_VALID_OPERATIONS_SET), 50)))
+    assert_true(all(chunk["status"] == "success" for chunk in result["chunks"]))
+    assert_equal(
+      sorted(server.agents["agent"]["operations"], key=lambda op: op["timestamp"]),
+      sorted(LARGE_VALID_OPERATIONS_SET, key=lambda op: op["timestamp"])
+    )
+
+def test_add_agents_operations_ordered():
+  with StubServer() as server:
+    with concurrent_client(server, ordered=True) as client:
+      for agent_id in ["agent_1", "agent_2", "agent_3"]:
+        client.create_agent(valid_data.VALID_CONFIGURATION, agent_id)
+      client.add_agents_operations({
+        "agent_1": LARGE_VALID_OPERATIONS_SET,
+        "agent_2": LARGE_VALID_OPERATIONS_SET[:120],
+        "agent_3": valid_data.VALID_OPERATIONS_SET
+      })
+
+    assert_equal(server.agents["agent_1"]["operations"], LARGE_VALID_OPERATIONS_SET)
+    assert_equal(server.agents["agent_2"]["operations"], LARGE_VALID_OPERATIONS_SET[:120])
+    assert_equal(server.agents["agent_3"]["operations"], valid_data.VALID_OPERATIONS_SET)
+
+def test_add_agents_operations_failure_report():
+  with StubServer() as server:
+    with concurrent_client(server, ordered=True) as client:
+      client.create_agent(valid_data.VALID_CONFIGURATION, "agent_1")
+      with assert_raises(craftai.errors.CraftAiOperationsAdditionError) as context_manager:
+        client.add_agents_operations({
+          "agent_1": LARGE_VALID_OPERATIONS_SET[:120],
+          "unknown_agent": LARGE_VALID_OPERATIONS_SET[:120]
+        })
+
+  chunks = context_manager.exception.chunks
+  unknown_agent_chunks = [chunk for chunk in chunks if chunk["agent_id"] == "unknown_agent"]
+  assert_equal([chunk["status"] for chunk in unknown_agent_chunks],
+               ["error", "skipped", "skipped"])
+  assert_true(isinstance(unknown_agent_chunks[0]["error"], craftai.errors.CraftAiNotFoundError))
+  assert_equal(unknown_agent_chunks[2]["operations"], LARGE_VALID_OPERATIONS_SET[100:120])
+  assert_equal(server.agents["agent_1"]["operations"], LARGE_VALID_OPERATIONS_SET[:120])
+
+def test_add_empty_operations():
+  with StubServer() as server:
+    for ordered in [False, True]:
+      with concurrent_client(server, ordered=ordered) as client:
+        client.create_agent(valid_data.VALID_CONFIGURATION, "agent")
+        assert_equal(client.add_operations("agent", [])["chunks"], [])
+        assert_equal(client.add_agents_operations({"agent": []})["chunks"], [])
+        client.delete_agent("agent")
+    with craftai.Client(server.client_cfg) as client:
+      client.add_operations("unknown_agent", [])
+      client.add_agents_operations({"unknown_agent": []})
+
+    assert_equal(server.requests_to("POST", "/context"), [])
+
+def test_agents_locks_dropped():
+  with StubServer() as server:
+    with concurrent_client(server, ordered=True) as client:
+      for agent_id in ["agent_1", "agent_2"]:
+        client.create_agent(valid_data.VALID_CONFIGURATION, agent_id)
+      client.add_agents_operations({
+        "agent_1": LARGE_VALID_OPERATIONS_SET[:120],
+        "agent_2": valid_data.VALID_OPERATIONS_SET
+      })
+      assert_equal(len(client._agents_locks), 0) #pylint: disable=W0212
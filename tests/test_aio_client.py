@@ -0,0 +1,151 @@
+import sys
+import unittest
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from .data import decision_trees, valid_data
+from .stub_server import StubServer
+
+# The asyncio client relies on asynchronous generators
+AIO_UNSUPPORTED = sys.version_info < (3, 6)
+
+if not AIO_UNSUPPORTED:
+  import asyncio
+  import craftai.aio
+
+OPERATIONS = [
+  {
+    "timestamp": 1464600000 + 100 * i,
+    "context": {
+      "presence": "robert",
+      "lightIntensity": 0.01 * i,
+      "lightbulbColor": "green"
+    }
+  }
+  for i in range(120)
+]
+
+class AioContext(object): #pylint: disable=R0903
+  """Runs the client coroutines in a dedicated event loop."""
+  def __init__(self, server, **cfg):
+    self.loop = asyncio.new_event_loop()
+    cfg.update(server.client_cfg)
+    self.client = craftai.aio.Client(cfg)
+
+  def run(self, coroutine):
+    return self.loop.run_until_complete(coroutine)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.run(self.client.close())
+    self.loop.close()
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_agent_methods():
+  with StubServer() as server:
+    with AioContext(server) as aio:
+      agent = aio.run(aio.client.create_agent(valid_data.VALID_CONFIGURATION, "agent"))
+      assert_equal(agent["id"], "agent")
+      assert_equal(aio.run(aio.client.get_agent("agent"))["configuration"],
+                   valid_data.VALID_CONFIGURATION)
+      assert_equal(aio.run(aio.client.list_agents()), ["agent"])
+      aio.run(aio.client.delete_agent("agent"))
+      assert_raises(craftai.errors.CraftAiNotFoundError,
+                    aio.run, aio.client.get_agent("agent"))
+      assert_raises(craftai.errors.CraftAiBadRequestError,
+                    aio.run, aio.client.get_agent(""))
+
+    assert_equal(server.connections_count, 1)
+    assert_true(all(request["headers"]["Authorization"].startswith("Bearer ")
+                    for request in server.requests))
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_add_operations_and_pagination():
+  with StubServer(page_size=7) as server:
+    with AioContext(server, operationsChunksSize=50) as aio:
+      aio.run(aio.client.create_agent(valid_data.VALID_CONFIGURATION, "agent"))
+      aio.run(aio.client.add_operations("agent", OPERATIONS))
+      assert_equal(len(server.requests_to("POST", "/context")), 3)
+
+      operations = aio.client.iter_operations("agent", OPERATIONS[10]["timestamp"])
+      #pylint: disable=E1101
+      assert_equal(aio.run(operations.__anext__()), OPERATIONS[10])
+      #pylint: enable=E1101
+      assert_equal(aio.run(aio.client.get_operations_list("agent")), OPERATIONS)
+      state_history = aio.run(aio.client.get_state_history("agent", None,
+                                                           OPERATIONS[19]["timestamp"]))
+      assert_equal(state_history, [
+        {"timestamp": operation["timestamp"], "sample": operation["context"]}
+        for operation in OPERATIONS[:20]
+      ])
+      assert_raises(craftai.errors.CraftAiBadRequestError, aio.client.iter_operations, "")
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_add_agents_operations_concurrently():
+  with StubServer() as server:
+    with AioContext(server, operationsChunksSize=10, operationsAdditionConcurrency=4,
+                    operationsAdditionOrdered=True) as aio:
+      aio.run(aio.client.create_agent(valid_data.VALID_CONFIGURATION, "agent_1"))
+      aio.run(aio.client.create_agent(valid_data.VALID_CONFIGURATION, "agent_2"))
+      result = aio.run(aio.client.add_agents_operations({
+        "agent_1": OPERATIONS,
+        "agent_2": OPERATIONS[:35]
+      }))
+      assert_equal(len(result["chunks"]), 16)
+
+      with assert_raises(craftai.errors.CraftAiOperationsAdditionError) as context_manager:
+        aio.run(aio.client.add_agents_operations({"unknown_agent": OPERATIONS[:35]}))
+      assert_equal([chunk["status"] for chunk in context_manager.exception.chunks],
+                   ["error", "skipped", "skipped", "skipped"])
+
+      # The agents' locks are dropped once the operations are added
+      assert_equal(len(aio.client._agents_locks), 0) #pylint: disable=W0212
+
+    assert_equal(server.agents["agent_1"]["operations"], OPERATIONS)
+    assert_equal(server.agents["agent_2"]["operations"], OPERATIONS[:35])
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_add_empty_operations():
+  with StubServer() as server:
+    with AioContext(server) as aio:
+      aio.run(aio.client.add_operations("unknown_agent", []))
+      aio.run(aio.client.add_agents_operations({"unknown_agent": []}))
+
+    assert_equal(server.requests_to("POST", "/context"), [])
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_get_decision_tree_long_poll():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, pending_trees=3) as server:
+    with AioContext(server) as aio:
+      aio.run(aio.client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, "agent"))
+      tree = aio.run(aio.client.get_decision_tree("agent", 1464600000))
+
+      assert_equal(tree, decision_trees.LIGHTBULB_TREE)
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 4)
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_concurrent_get_tree_polls_once():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, pending_trees=3) as server:
+    with AioContext(server, decisionTreeRetrievalInitialDelay=50) as aio:
+      aio.run(aio.client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, "agent"))
+      trees = aio.run(asyncio.gather(*[
+        aio.loop.create_task(aio.client.get_decision_tree("agent", 1464600000))
+        for _ in range(20)
+      ]))
+
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 4)
+      assert_true(all(tree is trees[0] for tree in trees))
+
+@unittest.skipIf(AIO_UNSUPPORTED, "craftai.aio requires python 3.6+")
+def test_aio_compression():
+  with StubServer(compress_responses=True) as server:
+    with AioContext(server, requestCompression="gzip", requestCompressionThreshold=0) as aio:
+      aio.run(aio.client.create_agent(valid_data.VALID_CONFIGURATION, "agent"))
+      aio.run(aio.client.add_operations("agent", OPERATIONS))
+
+      assert_equal(aio.run(aio.client.get_operations_list("agent")), OPERATIONS)
+      assert_true(all(request["headers"]["Content-Encoding"] == "gzip"
+                      for request in server.requests if request["method"] == "POST"))
+      assert_equal(len(server.responses_encodings), len(server.requests))
@@ -0,0 +1,35 @@
+from nose.tools import assert_equal, assert_true
+
+import craftai
+
+from .data import valid_data
+from .stub_server import StubServer
+
+AGENT_ID = "test_client_session"
+
+def test_client_reuses_connections():
+  with StubServer() as server:
+    with craftai.Client(server.client_cfg) as client:
+      client.create_agent(valid_data.VALID_CONFIGURATION, AGENT_ID)
+      for _ in range(20):
+        client.get_agent(AGENT_ID)
+      client.add_operations(AGENT_ID, valid_data.VALID_OPERATIONS_SET)
+      client.get_operations_list(AGENT_ID)
+      client.delete_agent(AGENT_ID)
+
+    assert_equal(len(server.requests), 24)
+    assert_equal(server.connections_count, 1)
+
+def test_client_config_is_completed():
+  with StubServer() as server:
+    cfg = server.client_cfg
+    cfg["poolMaxSize"] = 32
+    cfg["requestTimeout"] = 2000
+    client = craftai.Client(cfg)
+
+    assert_equal(client.config["poolMaxSize"], 32)
+    assert_equal(client.config["poolConnections"], 10)
+    assert_equal(client.config["maxRetries"], 0)
+    assert_equal(client.config["requestTimeout"], 2000)
+    assert_true(isinstance(client.list_agents(), list))
+    client.close()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from nose.tools import assert_equal, assert_true
+
+from craftai import Interpreter, Time
+
+from .data import decision_trees
+from .data.decision_trees import decide_outcome
+
+# The generated code is cached on disk with python 3 only
+CODE_CACHE_UNSUPPORTED = sys.version_info < (3, 3)
+
+def test_generated_tree_matches_compiled_tree():
+  for tree_seed in range(10):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = Interpreter.compile(tree)
+    generated_tree = Interpreter.generate_code(tree)
+    for context_seed in range(100):
+      state, time = decision_trees.random_decide_args(context_seed)
+      for with_rules in [True, False]:
+        assert_equal(decide_outcome(generated_tree.decide, state, time, with_rules=with_rules),
+                     decide_outcome(compiled_tree.decide, state, time, with_rules=with_rules))
+
+def test_generated_tree_decide():
+  generated_tree = Interpreter.generate_code(decision_trees.LIGHTBULB_TREE)
+  state = {"presence": "robert", "lightIntensity": 0.2}
+  time = Time(1458741230, "+02:00")
+  assert_equal(generated_tree.decide(state, time),
+               Interpreter.decide(decision_trees.LIGHTBULB_TREE, [state, time]))
+  assert_true("if value == 'robert':" in generated_tree.source)
+  assert_equal(generated_tree.source, Interpreter.generate_source(decision_trees.LIGHTBULB_TREE))
+
+  deep_tree = decision_trees.deep_tree(2000)
+  generated_tree = Interpreter.generate_code(deep_tree)
+  for light_intensity in [-1, 1000.5, 2000]:
+    assert_equal(generated_tree.decide({"lightIntensity": light_intensity}),
+                 Interpreter.decide(deep_tree, [{"lightIntensity": light_intensity}]))
+
+def test_generated_tree_invalid_operator():
+  tree = {
+    "_version": "1.1.0",
+    "configuration": decision_trees.LIGHTBULB_CONFIGURATION,
+    "trees": {
+      "lightbulbColor": {
+        "children": [
+          {
+            "decision_rule": {"property": "presence", "operator": "ist", "operand": "robert"},
+            "predicted_value": "green"
+          }
+        ]
+      },
+      "lightbulbIntensity": {"predicted_value": 1, "confidence": 1}
+    }
+  }
+  generated_tree = Interpreter.generate_code(tree)
+  context = {"presence": "robert", "lightIntensity": 0.2}
+  time = Time(1458741230, "+02:00")
+  assert_equal(decide_outcome(generated_tree.decide, context, time),
+               decide_outcome(Interpreter.decide, tree, [context, time]))
+
+@unittest.skipIf(CODE_CACHE_UNSUPPORTED, "the code cache requires python 3.3+")
+def test_generated_tree_cache():
+  cache_dir = tempfile.mkdtemp()
+  try:
+    tree = decision_trees.random_tree(2)
+    generated_tree = Interpreter.generate_code(tree, cache_dir)
+    cached_files = sorted(os.listdir(cache_dir))
+    assert_equal(len(cached_files), 2)
+    assert_true(all(cached_file.startswith("craftai_tree_") for cached_file in cached_files))
+
+    cached_tree = Interpreter.generate_code(decision_trees.random_tree(2), cache_dir)
+    assert_equal(cached_tree.source, generated_tree.source)
+    assert_equal(sorted(os.listdir(cache_dir)), cached_files)
+
+    # An invalid compiled code is compiled again from the cached source
+    code_file = [cached_file for cached_file in cached_files if cached_file.endswith(".code")][0]
+    with open(os.path.join(cache_dir, code_file), "wb") as invalid_code_file:
+      invalid_code_file.write(b"invalid")
+    cached_tree = Interpreter.generate_code(tree, cache_dir)
+    for context_seed in range(50):
+      state, time = decision_trees.random_decide_args(context_seed)
+      assert_equal(decide_outcome(cached_tree.decide, state, time),
+                   decide_outcome(generated_tree.decide, state, time))
+
+    Interpreter.generate_code(decision_trees.LIGHTBULB_TREE, cache_dir)
+    assert_equal(len(os.listdir(cache_dir)), 4)
+  finally:
+    shutil.rmtree(cache_dir)
@@ -0,0 +1,229 @@
+from nose.tools import assert_equal, assert_raises
+
+from craftai import Interpreter, Time, errors as craft_err
+from craftai.interpreter import _children_selector
+from craftai.operators import _OPERATORS
+
+from .data import decision_trees
+from .data.decision_trees import decide_outcome
+
+#pylint: disable=E1101
+assert_equal.__self__.maxDiff = None
+#pylint: enable=E1101
+
+#pylint: disable=W0212
+
+def test_compiled_tree_decide():
+  compiled_tree = Interpreter.compile(decision_trees.LIGHTBULB_TREE)
+  decision = compiled_tree.decide(
+    {"presence": "robert", "lightIntensity": 0.2},
+    Time(1458741230, "+02:00")
+  )
+  assert_equal(decision, Interpreter.decide(
+    decision_trees.LIGHTBULB_TREE,
+    [{"presence": "robert", "lightIntensity": 0.2}, Time(1458741230, "+02:00")]
+  ))
+  assert_equal(decision["output"]["lightbulbColor"], {
+    "predicted_value": "green",
+    "confidence": 0.8,
+    "decision_rules": [
+      {
+        "property": "presence",
+        "operator": "is",
+        "operand": "robert"
+      },
+      {
+        "property": "time",
+        "operator": "[in[",
+        "operand": [7, 20]
+      }
+    ]
+  })
+
+def test_compiled_tree_decide_errors():
+  compiled_tree = Interpreter.compile(decision_trees.LIGHTBULB_TREE)
+  assert_raises(
+    craft_err.CraftAiNullDecisionError,
+    compiled_tree.decide,
+    {"presence": "gisele", "lightIntensity": 0.8},
+    Time(1458741230, "+02:00")
+  )
+  assert_raises(
+    craft_err.CraftAiNullDecisionError,
+    compiled_tree.decide,
+    {"presence": "occupant", "lightIntensity": 0.8},
+    Time(1458741230, "+02:00")
+  )
+  assert_raises(
+    craft_err.CraftAiDecisionError,
+    compiled_tree.decide,
+    {"presence": "robert"},
+    Time(1458741230, "+02:00")
+  )
+
+def test_compiled_tree_invalid_tree():
+  assert_raises(
+    craft_err.CraftAiDecisionError,
+    Interpreter.compile,
+    {"_version": "3.0.0", "configuration": {}, "trees": {}}
+  )
+
+def test_compiled_tree_matches_interpreter():
+  for tree_seed in range(20):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = Interpreter.compile(tree)
+    for context_seed in range(200):
+      state, time = decision_trees.random_decide_args(context_seed)
+      args = [state] if time is None else [state, time]
+      assert_equal(
+        decide_outcome(compiled_tree.decide, *args),
+        decide_outcome(Interpreter.decide, tree, [state.copy()] + args[1:])
+      )
+
+def linear_selection(rules, value):
+  for position, (_, operator, operand) in enumerate(rules):
+    if _OPERATORS[operator](value, operand):
+      return position
+  return -1
+
+def test_children_selector_matches_linear_scan():
+  rules_cases = [
+    [("c", "<", 0.5), ("c", ">=", 0.5)],
+    [("c", ">=", 2), ("c", "<", 5), ("c", ">=", -1)],
+    [("t", "[in[", [2, 10]), ("t", "[in[", [10, 22]), ("t", "[in[", [22, 2])],
+    [("t", "[in[", [22, 2]), ("t", "[in[", [5, 5]), ("t", "[in[", [1, 23])],
+    [("t", "[in[", [3, 6]), ("t", "[in[", [8, 12])],
+    [("e", "is", "a"), ("e", "is", "b"), ("e", "is", "a"), ("e", "is", "c")]
+  ]
+  values = [float("-inf"), -1, -0.5, 0, 0.5, 1, 2, 2.5, 3, 5, 6, 8, 9.99, 10, 12, 21.9, 22, 23,
+            float("inf"), "a", "b", "c", "d"]
+  for rules in rules_cases:
+    selector = _children_selector(rules)
+    for value in values:
+      position = selector(value)
+      if position is not None:
+        assert_equal(position, linear_selection(rules, value))
+
+  # Values that can't be looked up
+  assert_equal(_children_selector(rules_cases[0])(float("nan")), None)
+  assert_equal(_children_selector(rules_cases[0])("a"), None)
+  assert_equal(_children_selector(rules_cases[5])(1), None)
+
+def test_children_selector_unindexable_rules():
+  assert_equal(_children_selector([("c", "<", 0.5), ("d", ">=", 0.5)]), None)
+  assert_equal(_children_selector([("c", "<", 0.5), ("c", "is", 0.5)]), None)
+  assert_equal(_children_selector([("e", "is", "a"), ("e", "is", 1)]), None)
+  assert_equal(_children_selector([("t", "[in[", [1]), ("t", "[in[", [1, 2])]), None)
+  assert_equal(_children_selector([("c", "<", "0.5"), ("c", ">=", 0.5)]), None)
+  assert_equal(_children_selector([("c", "<=", 0.5), ("c", ">", 0.5)]), None)
+
+def test_indexed_decisions_match_linear_decisions():
+  for tree_seed in range(20):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = Interpreter.compile(tree)
+    for context_seed in range(200):
+      state, time = decision_trees.random_decide_args(context_seed)
+      try:
+        context = compiled_tree._build_context(state, time)
+      except craft_err.CraftAiDecisionError:
+        continue
+      for output_name, nodes in compiled_tree.outputs:
+        # The interpreter evaluates the rules one by one
+        assert_equal(
+          decide_outcome(Interpreter._decide_tree, tree["trees"][output_name], context),
+          decide_outcome(compiled_tree._decide_output, nodes, context)
+        )
+
+def without_rules(outcome):
+  if isinstance(outcome, dict):
+    for output_decision in outcome["output"].values():
+      del output_decision["decision_rules"]
+  return outcome
+
+def test_decide_without_rules():
+  for tree_seed in range(5):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = Interpreter.compile(tree)
+    for context_seed in range(100):
+      state, time = decision_trees.random_decide_args(context_seed)
+      args = [state] if time is None else [state, time]
+      expected = without_rules(decide_outcome(compiled_tree.decide, *args))
+      assert_equal(decide_outcome(compiled_tree.decide, *args, with_rules=False), expected)
+      assert_equal(
+        decide_outcome(Interpreter.decide, tree, [state.copy()] + args[1:], with_rules=False),
+        expected
+      )
+
+def test_decide_deep_tree():
+  tree = decision_trees.deep_tree(2000)
+  decision = Interpreter.decide(tree, [{"lightIntensity": 5000}])
+  output_decision = decision["output"]["lightbulbIntensity"]
+  assert_equal(len(output_decision["decision_rules"]), 2000)
+  assert_equal(output_decision["decision_rules"][1999],
+               {"property": "lightIntensity", "operator": ">=", "operand": 1999})
+  assert_equal(output_decision["standard_deviation"], 0.1)
+  assert_equal(Interpreter.compile(tree).decide({"lightIntensity": 5000}), decision)
+  assert_equal(
+    len(Interpreter.decide(tree, [{"lightIntensity": 1000.5}])["output"]["lightbulbIntensity"]
+        ["decision_rules"]),
+    1002
+  )
+
+
+def test_cached_decisions_match_interpreter():
+  for tree_seed in range(10):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = Interpreter.compile(tree, cache_size=20)
+    for context_seed in list(range(50)) * 2:
+      state, time = decision_trees.random_decide_args(context_seed)
+      for with_rules in [True, False]:
+        assert_equal(decide_outcome(compiled_tree.decide, state, time, with_rules=with_rules),
+                     decide_outcome(Interpreter.decide, tree, [state, time],
+                                    with_rules=with_rules))
+    assert_equal(compiled_tree.get_cache_stats()["count"], 20)
+
+def test_cached_decisions_keys():
+  compiled_tree = Interpreter.compile(decision_trees.LIGHTBULB_TREE, cache_size=2)
+  assert_equal(compiled_tree._split_properties, ["day", "lightIntensity", "presence", "time"])
+  state = {"presence": "robert", "lightIntensity": 0.2}
+
+  decision = compiled_tree.decide(state, Time(1458741230, "+02:00"))
+  # The timezone isn't used by the tree, the same local time is a hit
+  other_decision = compiled_tree.decide(state, Time(1458741230 - 3600, "+03:00"))
+  assert_equal(other_decision["context"]["tz"], "+03:00")
+  assert_equal(other_decision, Interpreter.decide(decision_trees.LIGHTBULB_TREE,
+                                                  [state, Time(1458741230 - 3600, "+03:00")]))
+  assert_equal(other_decision["output"], decision["output"])
+  stats = compiled_tree.get_cache_stats()
+  assert_equal((stats["hits"], stats["misses"], stats["count"], stats["hit_rate"]), (1, 1, 1, 0.5))
+
+  compiled_tree.decide(state, Time(1458741230, "+02:00"), with_rules=False)
+  compiled_tree.decide({"presence": "gisele", "lightIntensity": 0.2}, Time(1458741230, "+02:00"))
+  stats = compiled_tree.get_cache_stats()
+  assert_equal((stats["misses"], stats["evictions"], stats["count"]), (3, 1, 2))
+
+  assert_raises(craft_err.CraftAiDecisionError, compiled_tree.decide, {"presence": "robert"},
+                Time(1458741230, "+02:00"))
+  compiled_tree.clear_cache()
+  assert_equal(compiled_tree.get_cache_stats()["count"], 0)
+  assert_equal(Interpreter.compile(decision_trees.LIGHTBULB_TREE).get_cache_stats(), None)
+
+def test_cached_decisions_not_shared():
+  compiled_tree = Interpreter.compile(decision_trees.LIGHTBULB_TREE, cache_size=2)
+  state = {"presence": "robert", "lightIntensity": 0.2}
+  time = Time(1458741230, "+02:00")
+  expected = Interpreter.decide(decision_trees.LIGHTBULB_TREE, [state, time])
+
+  decision = compiled_tree.decide(state, time)
+  decision["output"]["lightbulbColor"]["predicted_value"] = "purple"
+  del decision["output"]["lightbulbIntensity"]
+  other_decision = compiled_tree.decide(state, time)
+  assert_equal(compiled_tree.get_cache_stats()["hits"], 1)
+  assert_equal(other_decision, expected)
+
+  # The operands of the cache hits are copies too
+  other_decision["output"]["lightbulbColor"]["decision_rules"][1]["operand"].append(21)
+  other_decision["output"]["lightbulbColor"]["decision_rules"].pop()
+  assert_equal(compiled_tree.decide(state, time), expected)
+  assert_equal(compiled_tree.decide(state, time, with_rules=False)["output"],
+               without_rules(expected)["output"])
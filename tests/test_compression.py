@@ -0,0 +1,68 @@
+import json
+import os
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+import craftai
+
+from .data import decision_trees, valid_data
+from .stub_server import StubServer
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+with open(os.path.join(HERE, "data", "large_operation_list.json")) as large_operation_list_file:
+  LARGE_VALID_OPERATIONS_SET = json.load(large_operation_list_file)
+
+def compressing_client(server, **cfg):
+  cfg.update(server.client_cfg)
+  client = craftai.Client(cfg)
+  client.create_agent(valid_data.VALID_CONFIGURATION, "agent")
+  return client
+
+def test_add_operations_compressed():
+  for compression in ["gzip", "deflate"]:
+    with StubServer() as server:
+      with compressing_client(server, requestCompression=compression) as client:
+        client.add_operations("agent", LARGE_VALID_OPERATIONS_SET[:200])
+
+      request = server.requests_to("POST", "/context")[0]
+      assert_equal(request["headers"]["Content-Encoding"], compression)
+      assert_true(len(request["raw_body"]) * 5 < len(request["body"]))
+      assert_equal(server.agents["agent"]["operations"], LARGE_VALID_OPERATIONS_SET[:200])
+
+def test_compression_threshold():
+  with StubServer() as server:
+    with compressing_client(server,
+                            requestCompression="gzip",
+                            requestCompressionThreshold=10 * 1024) as client:
+      client.add_operations("agent", LARGE_VALID_OPERATIONS_SET[:10])
+      client.add_operations("agent", LARGE_VALID_OPERATIONS_SET[10:200])
+
+    requests = server.requests_to("POST", "/context")
+    assert_true("Content-Encoding" not in requests[0]["headers"])
+    assert_equal(requests[1]["headers"]["Content-Encoding"], "gzip")
+    assert_equal(server.agents["agent"]["operations"], LARGE_VALID_OPERATIONS_SET[:200])
+
+def test_no_compression_by_default():
+  with StubServer() as server:
+    with compressing_client(server) as client:
+      client.add_operations("agent", LARGE_VALID_OPERATIONS_SET[:200])
+
+    assert_true("Content-Encoding" not in server.requests_to("POST", "/context")[0]["headers"])
+
+def test_invalid_compression():
+  with StubServer() as server:
+    cfg = server.client_cfg
+    cfg["requestCompression"] = "brotli"
+    assert_raises(craftai.errors.CraftAiBadRequestError, craftai.Client, cfg)
+
+def test_compressed_responses():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, compress_responses=True) as server:
+    with compressing_client(server) as client:
+      client.add_operations("agent", LARGE_VALID_OPERATIONS_SET)
+
+      assert_equal(client.get_operations_list("agent"), LARGE_VALID_OPERATIONS_SET)
+      assert_equal(client.get_decision_tree("agent", 1464600000), decision_trees.LIGHTBULB_TREE)
+      assert_true(all(request["headers"]["Accept-Encoding"] == "gzip, deflate"
+                      for request in server.requests))
+      assert_equal(len(server.responses_encodings), len(server.requests))
@@ -0,0 +1,101 @@
+import time
+
+from nose.tools import assert_equal, assert_is, assert_is_none
+
+import craftai
+
+from craftai.cache import DecisionTreeCache
+
+from .data import decision_trees, valid_data
+from .stub_server import StubServer
+
+TIMESTAMP = 1464600000
+
+def caching_client(server, **cfg):
+  cfg.update(server.client_cfg)
+  cfg.setdefault("decisionTreeCacheMaxSize", 1024 * 1024)
+  cfg.setdefault("decisionTreeCacheTimeBucket", 60)
+  client = craftai.Client(cfg)
+  client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, "agent")
+  return client
+
+def test_cache_disabled_by_default():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE) as server:
+    with craftai.Client(server.client_cfg) as client:
+      client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, "agent")
+      client.get_decision_tree("agent", TIMESTAMP)
+      client.get_decision_tree("agent", TIMESTAMP)
+
+      assert_is_none(client.decision_tree_cache)
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 2)
+
+def test_cache_hits_within_time_bucket():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE) as server:
+    with caching_client(server) as client:
+      tree = client.get_decision_tree("agent", TIMESTAMP)
+      assert_is(client.get_decision_tree("agent", TIMESTAMP + 10), tree)
+      client.get_decision_tree("agent", TIMESTAMP + 60)
+
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 2)
+      stats = client.decision_tree_cache.stats
+      assert_equal((stats["hits"], stats["misses"], stats["count"]), (1, 2, 2))
+
+def test_cache_invalidation():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE) as server:
+    with caching_client(server) as client:
+      client.get_decision_tree("agent", TIMESTAMP)
+      client.add_operations("agent", valid_data.VALID_OPERATIONS_SET)
+      client.get_decision_tree("agent", TIMESTAMP)
+      client.delete_agent("agent")
+
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 2)
+      stats = client.decision_tree_cache.stats
+      assert_equal((stats["invalidations"], stats["count"], stats["size"]), (2, 0, 0))
+
+def test_cache_ttl():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE) as server:
+    with caching_client(server, decisionTreeCacheTtl=100) as client:
+      client.get_decision_tree("agent", TIMESTAMP)
+      time.sleep(0.2)
+      client.get_decision_tree("agent", TIMESTAMP)
+
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 2)
+      assert_equal(client.decision_tree_cache.stats["expirations"], 1)
+
+def test_cache_lru_eviction_by_size():
+  cache = DecisionTreeCache(max_size=100, ttl=60000, time_bucket=1)
+  cache.put(("o", "p", "a", 1), "tree_1", 40)
+  cache.put(("o", "p", "a", 2), "tree_2", 40)
+  assert_equal(cache.get(("o", "p", "a", 1)), "tree_1")
+  cache.put(("o", "p", "b", 1), "tree_3", 40)
+  cache.put(("o", "p", "b", 2), "tree_4", 101)
+
+  assert_is_none(cache.get(("o", "p", "a", 2)))
+  assert_equal(cache.get(("o", "p", "a", 1)), "tree_1")
+  assert_equal(cache.get(("o", "p", "b", 1)), "tree_3")
+  assert_is_none(cache.get(("o", "p", "b", 2)))
+  assert_equal(cache.stats["evictions"], 1)
+  assert_equal(cache.size, 80)
+
+def test_cache_skips_trees_of_invalidated_agents():
+  cache = DecisionTreeCache(max_size=100, ttl=60000, time_bucket=1)
+  generation = cache.generation("o", "p", "a")
+  cache.invalidate("o", "p", "a")
+  cache.put(("o", "p", "a", 1), "tree_1", 40, generation)
+
+  assert_is_none(cache.get(("o", "p", "a", 1)))
+
+def test_cache_skips_invalid_timestamps():
+  cache = DecisionTreeCache(max_size=100, ttl=60000, time_bucket=60)
+  assert_equal(cache.key("o", "p", "a", 125.5), ("o", "p", "a", 2))
+  for timestamp in [None, "invalid", float("nan"), float("inf")]:
+    assert_is_none(cache.key("o", "p", "a", timestamp))
+
+  # Like without the cache, such timestamps are sent to the API, which rejects them
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE) as server:
+    with caching_client(server) as client:
+      client.get_decision_tree("agent", "invalid")
+      client.get_decision_tree("agent", "invalid")
+
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 2)
+      assert_equal(client.decision_tree_cache.stats["count"], 0)
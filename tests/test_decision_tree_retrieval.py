@@ -0,0 +1,68 @@
+import time
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+import craftai
+
+from .data import decision_trees
+from .stub_server import StubServer
+
+AGENTS_IDS = ["agent_{}".format(i) for i in range(5)]
+
+def retrying_client(server, **cfg):
+  cfg.update(server.client_cfg)
+  client = craftai.Client(cfg)
+  for agent_id in AGENTS_IDS:
+    client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, agent_id)
+  return client
+
+def test_decision_tree_retrieval_delay():
+  cfg = {
+    "decisionTreeRetrievalInitialDelay": 100,
+    "decisionTreeRetrievalMaxDelay": 1000
+  }
+  for attempt in range(10):
+    delay = craftai.client.decision_tree_retrieval_delay(cfg, attempt)
+    assert_true(0 <= delay <= min(0.1 * 2 ** attempt, 1))
+  assert_equal(craftai.client.decision_tree_retrieval_delay(cfg, 3, 4.5), 4.5)
+
+def test_retry_after_seconds():
+  assert_equal(craftai.client.retry_after_seconds({"Retry-After": "3"}), 3)
+  assert_equal(craftai.client.retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+               0)
+  assert_equal(craftai.client.retry_after_seconds({}), None)
+
+def test_get_decision_tree_backs_off():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, pending_trees=1000) as server:
+    with retrying_client(server,
+                         decisionTreeRetrievalTimeout=500,
+                         decisionTreeRetrievalInitialDelay=20) as client:
+      start = time.time()
+      assert_raises(craftai.errors.CraftAiLongRequestTimeOutError,
+                    client.get_decision_tree, AGENTS_IDS[0], 1464600000)
+      assert_true(time.time() - start < 1)
+
+    # Without backoff, hundreds of requests would be sent in 500ms
+    assert_true(len(server.requests_to("GET", "/decision/tree")) < 20)
+
+def test_get_decision_tree_honors_retry_after():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, pending_trees=1, retry_after="1") as server:
+    with retrying_client(server, decisionTreeRetrievalInitialDelay=1) as client:
+      start = time.time()
+      tree = client.get_decision_tree(AGENTS_IDS[0], 1464600000)
+
+      assert_equal(tree, decision_trees.LIGHTBULB_TREE)
+      assert_true(time.time() - start >= 1)
+
+def test_get_decision_tree_future():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, pending_trees=10) as server:
+    with retrying_client(server, decisionTreeRetrievalInitialDelay=10) as client:
+      futures = [
+        client.get_decision_tree_future(agent_id, 1464600000)
+        for agent_id in AGENTS_IDS
+      ]
+
+      assert_equal([future.result() for future in futures],
+                   [decision_trees.LIGHTBULB_TREE] * len(AGENTS_IDS))
+      assert_raises(craftai.errors.CraftAiBadRequestError,
+                    client.get_decision_tree_future, "", 1464600000)
@@ -0,0 +1,253 @@
+import copy
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from nose.tools import assert_equal, assert_raises
+
+from craftai import Interpreter, Time, errors as craft_err
+
+from .data import decision_trees
+from .data.decision_trees import decide_outcome
+
+# Flat trees are evaluated from `memoryview.cast` views
+FLAT_TREES_UNSUPPORTED = sys.version_info < (3, 3)
+SHARED_MEMORY_UNSUPPORTED = sys.version_info < (3, 8)
+
+if not FLAT_TREES_UNSUPPORTED:
+  from craftai import flat_tree as flat_tree_module
+  from craftai.flat_tree import FlatTree, dump_flat_tree_to_shared_memory
+
+# Integers beyond 2 ** 53 aren't exactly represented by doubles
+BIG_INT = 2 ** 53 + 1
+BIG_OPERANDS_TREE = {
+  "_version": "1.1.0",
+  "configuration": {
+    "context": {
+      "c": {
+        "type": "continuous"
+      },
+      "o": {
+        "type": "enum"
+      }
+    },
+    "output": ["o"],
+    "time_quantum": 100
+  },
+  "trees": {
+    "o": {
+      "children": [
+        {
+          "decision_rule": {"property": "c", "operator": "[in[", "operand": [BIG_INT, BIG_INT + 2]},
+          "predicted_value": "in",
+          "confidence": 0.5
+        },
+        {
+          "decision_rule": {"property": "c", "operator": ">=", "operand": BIG_INT},
+          "predicted_value": "gte",
+          "confidence": 0.5
+        },
+        {
+          "decision_rule": {"property": "c", "operator": "<", "operand": BIG_INT},
+          "predicted_value": "lt",
+          "confidence": 0.5
+        }
+      ]
+    }
+  }
+}
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_matches_compiled_tree():
+  for tree_seed in range(20):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = Interpreter.compile(tree)
+    flat_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(tree))
+    for context_seed in range(200):
+      state, time = decision_trees.random_decide_args(context_seed)
+      for with_rules in [True, False]:
+        assert_equal(decide_outcome(flat_tree.decide, state, time, with_rules=with_rules),
+                     decide_outcome(compiled_tree.decide, state, time, with_rules=with_rules))
+
+  compiled_tree = Interpreter.compile(BIG_OPERANDS_TREE)
+  flat_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(BIG_OPERANDS_TREE))
+  for value in [BIG_INT - 2, BIG_INT - 1, BIG_INT, BIG_INT + 1, BIG_INT + 2, float(BIG_INT), 0.5]:
+    assert_equal(decide_outcome(flat_tree.decide, {"c": value}),
+                 decide_outcome(compiled_tree.decide, {"c": value}))
+  assert_equal(flat_tree.to_tree(), BIG_OPERANDS_TREE)
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_decide():
+  flat_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(decision_trees.LIGHTBULB_TREE))
+  assert_equal(
+    flat_tree.decide({"presence": "robert", "lightIntensity": 0.2}, Time(1458741230, "+02:00")),
+    Interpreter.decide(decision_trees.LIGHTBULB_TREE,
+                       [{"presence": "robert", "lightIntensity": 0.2}, Time(1458741230, "+02:00")])
+  )
+
+  deep_tree = decision_trees.deep_tree(2000)
+  flat_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(deep_tree))
+  assert_equal(flat_tree.decide({"lightIntensity": 1000.5}),
+               Interpreter.decide(deep_tree, [{"lightIntensity": 1000.5}]))
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_invalid_operator():
+  tree = {
+    "_version": "1.1.0",
+    "configuration": decision_trees.LIGHTBULB_CONFIGURATION,
+    "trees": {
+      "lightbulbColor": {
+        "children": [
+          {
+            "decision_rule": {"property": "presence", "operator": "ist", "operand": "robert"},
+            "predicted_value": "green"
+          }
+        ]
+      },
+      "lightbulbIntensity": {"predicted_value": 1, "confidence": 1}
+    }
+  }
+  flat_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(tree))
+  context = {"presence": "robert", "lightIntensity": 0.2}
+  time = Time(1458741230, "+02:00")
+  assert_equal(decide_outcome(flat_tree.decide, context, time),
+               decide_outcome(Interpreter.decide, tree, [context, time]))
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_invalid_buffer():
+  assert_raises(craft_err.CraftAiDecisionError, FlatTree, b"CRFT")
+  assert_raises(craft_err.CraftAiDecisionError, FlatTree, b"{\"_version\": \"1.1.0\"}")
+  data = bytearray(Interpreter.dump_flat_tree(decision_trees.LIGHTBULB_TREE))
+  data[4] = 42
+  assert_raises(craft_err.CraftAiDecisionError, FlatTree, data)
+  # Invalid metadata
+  data = bytearray(Interpreter.dump_flat_tree(decision_trees.LIGHTBULB_TREE))
+  data[16] = 0xff
+  assert_raises(craft_err.CraftAiDecisionError, FlatTree, data)
+  data[16:18] = b"[]"
+  assert_raises(craft_err.CraftAiDecisionError, FlatTree, data)
+
+#pylint: disable=W0212
+def corrupted_flat_tree(data, output_name, array_name, index, value):
+  """Returns a copy of the flat tree with a value of one of its arrays replaced."""
+  data = bytearray(data)
+  header = flat_tree_module._HEADER
+  data_start = header.size + header.unpack_from(data)[3]
+  metadata = json.loads(data[header.size:data_start].decode("utf-8"))
+  start, size = dict(metadata["outputs"])[output_name][array_name]
+  array_format = [array_format for name, array_format, _ in flat_tree_module._ARRAYS
+                  if name == array_name][0]
+  memoryview(data)[data_start + start:data_start + start + size].cast(array_format)[index] = value
+  return data
+#pylint: enable=W0212
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_corrupted_nodes():
+  data = Interpreter.dump_flat_tree(decision_trees.LIGHTBULB_TREE)
+  assert_raises(craft_err.CraftAiDecisionError, FlatTree, data[:-16])
+  for array_name, index, value in [
+      ("children", 0, 100),
+      # A child before its parent would make the walk down the tree loop
+      ("children", 3, 1),
+      ("children_start", 2, 0),
+      ("properties", 1, 50),
+      ("operators", 1, 9),
+      ("operands_kinds", 2, 42),
+      ("values", 3, 1e6),
+      ("values", 3, 0.5)
+  ]:
+    assert_raises(craft_err.CraftAiDecisionError, FlatTree,
+                  corrupted_flat_tree(data, "lightbulbColor", array_name, index, value))
+  # The predicted value of the node 1 is an index in the table of values
+  FlatTree(corrupted_flat_tree(data, "lightbulbColor", "values", 3, 0))
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_unsupported_python():
+  tree = Interpreter.dump_flat_tree(decision_trees.LIGHTBULB_TREE)
+  #pylint: disable=W0212
+  flat_tree_module._UNSUPPORTED = True
+  try:
+    assert_raises(craft_err.CraftAiError, Interpreter.dump_flat_tree, decision_trees.LIGHTBULB_TREE)
+    assert_raises(craft_err.CraftAiError, Interpreter.load_flat_tree, tree)
+  finally:
+    flat_tree_module._UNSUPPORTED = False
+  #pylint: enable=W0212
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_to_tree():
+  for tree_seed in range(20):
+    tree = decision_trees.random_tree(tree_seed)
+    assert_equal(Interpreter.load_flat_tree(Interpreter.dump_flat_tree(tree)).to_tree(), tree)
+
+  for tree in [decision_trees.LIGHTBULB_TREE, decision_trees.deep_tree(200)]:
+    restored_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(tree)).to_tree()
+    assert_equal(restored_tree, tree)
+    assert_equal(Interpreter.decide(restored_tree, [{"presence": "robert", "lightIntensity": 0.2},
+                                                    Time(1458741230, "+02:00")]),
+                 Interpreter.decide(tree, [{"presence": "robert", "lightIntensity": 0.2},
+                                           Time(1458741230, "+02:00")]))
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_to_tree_drops_other_keys():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  color_tree = tree["trees"]["lightbulbColor"]
+  color_tree["children"][0]["nb_samples"] = 12
+  color_tree["children"][0]["children"] = []
+  color_tree["children"][1]["predicted_value"] = "green"
+  expected_tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+
+  restored_tree = Interpreter.load_flat_tree(Interpreter.dump_flat_tree(tree)).to_tree()
+  assert_equal(restored_tree, expected_tree)
+
+@unittest.skipIf(FLAT_TREES_UNSUPPORTED, "flat trees require python 3.3+")
+def test_flat_tree_file():
+  directory = tempfile.mkdtemp()
+  try:
+    path = os.path.join(directory, "tree.crft")
+    tree = decision_trees.random_tree(5)
+    Interpreter.save_flat_tree(tree, path)
+    flat_tree = Interpreter.load_flat_tree_file(path)
+    compiled_tree = Interpreter.compile(tree)
+    for context_seed in range(50):
+      state, time = decision_trees.random_decide_args(context_seed)
+      assert_equal(decide_outcome(flat_tree.decide, state, time),
+                   decide_outcome(compiled_tree.decide, state, time))
+    assert_equal(flat_tree.to_tree(), tree)
+    flat_tree.release()
+    state, time = decision_trees.random_decide_args(0)
+    assert_raises(craft_err.CraftAiDecisionError, flat_tree.decide, state, time)
+    assert_raises(craft_err.CraftAiDecisionError, flat_tree.to_tree)
+
+    with open(path, "wb") as invalid_file:
+      invalid_file.write(b"{\"_version\": \"1.1.0\"}")
+    assert_raises(craft_err.CraftAiDecisionError, Interpreter.load_flat_tree_file, path)
+    open(path, "wb").close()
+    assert_raises(craft_err.CraftAiDecisionError, Interpreter.load_flat_tree_file, path)
+  finally:
+    shutil.rmtree(directory)
+
+def decide_from_shared_memory(name, state, time, results):
+  flat_tree = FlatTree.from_shared_memory(name)
+  results.put(flat_tree.decide(state, time))
+  flat_tree.release()
+
+@unittest.skipIf(SHARED_MEMORY_UNSUPPORTED, "shared memory requires python 3.8+")
+def test_flat_tree_shared_memory():
+  tree = decision_trees.random_tree(3)
+  block = dump_flat_tree_to_shared_memory(tree)
+  try:
+    state, time = decision_trees.random_decide_args(4)
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=decide_from_shared_memory,
+                                      args=(block.name, state, time, results))
+    process.start()
+    decision = results.get(timeout=30)
+    process.join()
+    assert_equal(decision, Interpreter.decide(tree, [state, time]))
+  finally:
+    block.close()
+    block.unlink()
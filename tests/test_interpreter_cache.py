@@ -0,0 +1,91 @@
+import copy
+
+from nose.tools import assert_equal, assert_raises
+
+from craftai import Interpreter, Time, errors as craft_err
+
+from .data import decision_trees
+
+STATE = {"presence": "robert", "lightIntensity": 0.2}
+
+def test_version_checked_once():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  Interpreter.clear_cache()
+
+  decisions = [Interpreter.decide(tree, [STATE, Time(1458741230, "+02:00")]) for _ in range(5)]
+
+  assert_equal(decisions, [decisions[0]] * 5)
+  stats = Interpreter.get_cache_stats()
+  assert_equal(stats["versions"]["misses"], 1)
+  assert_equal(stats["versions"]["hits"], 4)
+  assert_equal(stats["versions"]["count"], 1)
+
+def test_configuration_analysed_once():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  Interpreter.clear_cache()
+
+  for _ in range(5):
+    Interpreter.decide(tree, [STATE, Time(1458741230, "+02:00")])
+  # Same content, another configuration object
+  Interpreter.decide(copy.deepcopy(tree), [STATE, Time(1458741230, "+02:00")])
+
+  stats = Interpreter.get_cache_stats()["configurations"]
+  assert_equal((stats["misses"], stats["hits"], stats["count"]), (1, 5, 1))
+
+def test_modified_configuration_decisions():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  state = {"presence": "robert", "lightIntensity": 0.2}
+  Interpreter.clear_cache()
+
+  Interpreter.decide(tree, [dict(state), Time(1458741230, "+02:00")])
+  # The time of day isn't generated anymore, it is expected in the state
+  tree["configuration"]["context"]["time"]["is_generated"] = False
+  with assert_raises(craft_err.CraftAiDecisionError) as context_manager:
+    Interpreter.decide(tree, [dict(state), Time(1458741230, "+02:00")])
+  assert_equal(
+    context_manager.exception.message,
+    "Unable to take decision, the given context is not valid: "
+    "expected property 'time' is not defined."
+  )
+  decision = Interpreter.decide(tree, [dict(state, time=21.5), Time(1458741230, "+02:00")])
+  assert_equal(decision["output"]["lightbulbColor"]["predicted_value"], "blue")
+  assert_equal(Interpreter.get_cache_stats()["configurations"]["count"], 2)
+
+def test_modified_tree_decisions():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  Interpreter.clear_cache()
+
+  decision = Interpreter.decide(tree, [STATE, Time(1458741230, "+02:00")])
+  tree["trees"] = dict(tree["trees"], lightbulbColor={"predicted_value": "purple",
+                                                      "confidence": 0.5})
+  modified_decision = Interpreter.decide(tree, [STATE, Time(1458741230, "+02:00")])
+  assert_equal(modified_decision["output"]["lightbulbColor"],
+               {"predicted_value": "purple", "confidence": 0.5, "decision_rules": []})
+  assert_equal(decision["output"]["lightbulbColor"]["predicted_value"], "green")
+
+  tree["_version"] = "2.0.0"
+  assert_raises(craft_err.CraftAiDecisionError, Interpreter.decide, tree, [STATE])
+
+def test_invalid_version_not_cached():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  tree["_version"] = "0.0.1"
+  Interpreter.clear_cache()
+
+  for _ in range(2):
+    assert_raises(craft_err.CraftAiDecisionError, Interpreter.decide, tree, [STATE])
+
+  assert_equal(Interpreter.get_cache_stats()["versions"]["count"], 0)
+  assert_equal(Interpreter.get_cache_stats()["configurations"]["count"], 0)
+
+def test_cached_version_still_checks_contexts():
+  tree = copy.deepcopy(decision_trees.LIGHTBULB_TREE)
+  Interpreter.clear_cache()
+
+  Interpreter.decide(tree, [STATE, Time(1458741230, "+02:00")])
+  with assert_raises(craft_err.CraftAiDecisionError) as context_manager:
+    Interpreter.decide(tree, [{"presence": "robert"}, Time(1458741230, "+02:00")])
+  assert_equal(
+    context_manager.exception.message,
+    "Unable to take decision, the given context is not valid: "
+    "expected property 'lightIntensity' is not defined."
+  )
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import types
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+import craftai
+
+from craftai import json_codec
+
+from .data import decision_trees
+from .stub_server import StubServer
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+with open(os.path.join(HERE, "data", "large_operation_list.json")) as large_operation_list_file:
+  LARGE_VALID_OPERATIONS_SET = json.load(large_operation_list_file)
+
+def test_codecs_round_trip():
+  tree = decision_trees.random_tree(0)
+  for name in json_codec.available_codecs():
+    codec = json_codec.get_codec(name)
+    assert_equal(codec.loads(codec.dumps(LARGE_VALID_OPERATIONS_SET)),
+                 LARGE_VALID_OPERATIONS_SET)
+    assert_equal(codec.loads(codec.dumps(tree)), tree)
+    assert_equal(codec.loads(json.dumps(tree).encode("utf-8")), tree)
+
+def test_codecs_float_precision():
+  floats = [0.1, 0.1234567890123456789, 1458741230.123456, 2 ** 0.5, 1e-300, 5e-324,
+            1.7976931348623157e308, -123456.789012345678]
+  for name in json_codec.available_codecs():
+    codec = json_codec.get_codec(name)
+    assert_equal(codec.loads(codec.dumps(floats)), floats)
+    assert_equal(codec.loads(json.dumps(floats)), floats)
+
+def test_auto_codec_is_the_fastest_available():
+  assert_equal(json_codec.get_codec("auto").name, json_codec.available_codecs()[0])
+  assert_equal(json_codec.available_codecs()[-1], "json")
+
+def test_unsupported_orjson_version():
+  # orjson before 2.5 lacks the options used by its codec
+  old_orjson = types.ModuleType("orjson")
+  old_orjson.dumps = json.dumps
+  old_orjson.loads = json.loads
+  codecs = json_codec._CODECS.copy() #pylint: disable=W0212
+  json_codec._CODECS.clear() #pylint: disable=W0212
+  orjson_module = sys.modules.get("orjson")
+  sys.modules["orjson"] = old_orjson
+  try:
+    assert_true("orjson" not in json_codec.available_codecs())
+    assert_true(json_codec.get_codec("auto").name != "orjson")
+    assert_raises(craftai.errors.CraftAiBadRequestError, json_codec.get_codec, "orjson")
+  finally:
+    if orjson_module is None:
+      del sys.modules["orjson"]
+    else:
+      sys.modules["orjson"] = orjson_module
+    json_codec._CODECS.clear() #pylint: disable=W0212
+    json_codec._CODECS.update(codecs) #pylint: disable=W0212
+
+def test_invalid_codec():
+  assert_raises(craftai.errors.CraftAiBadRequestError, json_codec.get_codec, "pickle")
+
+def test_load_tree():
+  serialized_tree = json.dumps(decision_trees.LIGHTBULB_TREE)
+  for name in json_codec.available_codecs():
+    assert_equal(craftai.Interpreter.load_tree(serialized_tree, name),
+                 decision_trees.LIGHTBULB_TREE)
+
+def test_client_json_codecs():
+  for name in json_codec.available_codecs():
+    with StubServer(tree=decision_trees.LIGHTBULB_TREE) as server:
+      cfg = server.client_cfg
+      cfg["jsonCodec"] = name
+      with craftai.Client(cfg) as client:
+        client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, "agent")
+        client.add_operations("agent", LARGE_VALID_OPERATIONS_SET[:50])
+
+        assert_equal(client.get_operations_list("agent"), LARGE_VALID_OPERATIONS_SET[:50])
+        assert_equal(client.get_decision_tree("agent", 1464600000), decision_trees.LIGHTBULB_TREE)
+
+def test_client_json_codec_errors():
+  def dumps(_):
+    # Like older versions of rapidjson, for infinite floats
+    raise ValueError("Out of range float values are not JSON compliant")
+
+  with StubServer() as server:
+    cfg = server.client_cfg
+    cfg["jsonCodec"] = json_codec.JsonCodec("strict", dumps, json.loads)
+    with craftai.Client(cfg) as client:
+      assert_raises(craftai.errors.CraftAiBadRequestError,
+                    client.create_agent, decision_trees.LIGHTBULB_CONFIGURATION, "agent")
+      assert_raises(craftai.errors.CraftAiBadRequestError,
+                    client.add_operations, "agent", LARGE_VALID_OPERATIONS_SET[:50])
@@ -0,0 +1,61 @@
+import sys
+
+from nose.tools import assert_equal, assert_raises
+
+import craftai
+
+from .data import valid_data
+from .stub_server import StubServer
+
+OPERATIONS = [
+  {
+    "timestamp": 1464600000 + 100 * i,
+    "context": {
+      "presence": "robert",
+      "lightIntensity": 0.01 * i,
+      "lightbulbColor": "green"
+    }
+  }
+  for i in range(sys.getrecursionlimit() + 200)
+]
+
+def test_iter_operations_pages():
+  with StubServer(page_size=7) as server:
+    with craftai.Client(server.client_cfg) as client:
+      client.create_agent(valid_data.VALID_CONFIGURATION, "agent")
+      client.add_operations("agent", OPERATIONS[:100])
+      pages = list(client.iter_operations_pages("agent", OPERATIONS[10]["timestamp"]))
+
+  assert_equal([len(page) for page in pages], [7] * 12 + [6])
+  assert_equal([operation for page in pages for operation in page], OPERATIONS[10:100])
+
+def test_get_operations_list_many_pages():
+  with StubServer(page_size=1) as server:
+    with craftai.Client(server.client_cfg) as client:
+      client.create_agent(valid_data.VALID_CONFIGURATION, "agent")
+      client.add_operations("agent", OPERATIONS)
+
+      assert_equal(client.get_operations_list("agent"), OPERATIONS)
+      assert_equal(len(server.requests_to("GET", "/context")), len(OPERATIONS))
+
+def test_iter_state_history():
+  with StubServer(page_size=10) as server:
+    with craftai.Client(server.client_cfg) as client:
+      client.create_agent(valid_data.VALID_CONFIGURATION, "agent")
+      client.add_operations("agent", OPERATIONS[:25])
+      states = client.iter_state_history("agent", None, OPERATIONS[19]["timestamp"])
+
+      assert_equal(next(states), {
+        "timestamp": OPERATIONS[0]["timestamp"],
+        "sample": OPERATIONS[0]["context"]
+      })
+      assert_equal(len(list(states)), 19)
+      assert_equal(client.get_state_history("agent"), [
+        {"timestamp": operation["timestamp"], "sample": operation["context"]}
+        for operation in OPERATIONS[:25]
+      ])
+
+def test_iter_operations_invalid_id():
+  with StubServer() as server:
+    client = craftai.Client(server.client_cfg)
+    assert_raises(craftai.errors.CraftAiBadRequestError, client.iter_operations, "")
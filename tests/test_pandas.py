@@ -106,6 +106,7 @@ def test_add_operations_df_bad_index():
     df
   )
 
+#pylint: disable=E1101
 @with_setup(setup_simple_agent, teardown)
 def test_add_operations_df():
   CLIENT.add_operations(AGENT_ID, SIMPLE_AGENT_DATA)
@@ -119,6 +120,7 @@ def test_add_operations_df_complex_agent():
   agent = CLIENT.get_agent(AGENT_ID)
   assert_equal(agent["firstTimestamp"], COMPLEX_AGENT_DATA.first_valid_index().value // 10 ** 9)
   assert_equal(agent["lastTimestamp"], COMPLEX_AGENT_DATA.last_valid_index().value // 10 ** 9)
+#pylint: enable=E1101
 
 @with_setup(setup_simple_agent, teardown)
 def test_add_operations_df_unexpected_property():
@@ -175,7 +177,9 @@ def test_get_operations_list_df_complex_agent():
 
 @with_setup(setup_complex_agent_with_data, teardown)
 def test_decide_from_contexts_df():
+  #pylint: disable=E1101
   tree = CLIENT.get_decision_tree(AGENT_ID, COMPLEX_AGENT_DATA.last_valid_index().value // 10 ** 9)
+  #pylint: enable=E1101
   df = CLIENT.decide_from_contexts_df(tree, COMPLEX_AGENT_DATA)
 
   assert_equal(len(df), 10)
@@ -206,8 +210,10 @@ def setup_complex_agent_2_with_data():
 
 @with_setup(setup_complex_agent_2_with_data, teardown)
 def test_decide_from_contexts_df_null_decisions():
+  #pylint: disable=E1101
   tree = CLIENT.get_decision_tree(AGENT_ID,
                                   COMPLEX_AGENT_DATA.last_valid_index().value // 10 ** 9)
+  #pylint: enable=E1101
 
   test_df = pd.DataFrame(
     [
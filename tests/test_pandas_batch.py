@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+from nose.tools import assert_equal, assert_true
+
+import craftai.pandas
+
+from .data import decision_trees
+
+
+def random_columns(configuration, count):
+  states = [decision_trees.random_decide_args(seed, configuration)[0] for seed in range(count)]
+  return states, {
+    prop_name: [state.get(prop_name) for state in states]
+    for prop_name in configuration["context"]
+    if prop_name not in configuration["output"]
+  }
+
+def single_output_tree(tree, output_name):
+  """Restricts a tree to one of its outputs, to take its decisions separately."""
+  configuration = tree["configuration"]
+  return {
+    "_version": tree["_version"],
+    "configuration": {
+      "context": {
+        prop_name: prop for prop_name, prop in configuration["context"].items()
+        if prop_name == output_name or prop_name not in configuration["output"]
+      },
+      "output": [output_name]
+    },
+    "trees": {output_name: tree["trees"][output_name]}
+  }
+
+def expected_output_decision(tree, output_name, state):
+  try:
+    decision = craftai.Interpreter.decide(single_output_tree(tree, output_name), [state])
+    return decision["output"][output_name]
+  except craftai.errors.CraftAiDecisionError as e:
+    return e.message
+
+def assert_decisions_match_interpreter(tree, states, decisions):
+  for output_name in tree["configuration"]["output"]:
+    output_decisions = decisions[output_name]
+    for row, state in enumerate(states):
+      expected = expected_output_decision(tree, output_name, dict(state))
+      if isinstance(expected, str):
+        assert_equal(output_decisions["error"][row], expected)
+        assert_true(np.isnan(output_decisions["confidence"][row]))
+      else:
+        assert_equal(output_decisions["error"][row], None)
+        assert_equal(output_decisions["predicted_value"][row], expected["predicted_value"])
+        assert_equal(output_decisions["confidence"][row], expected["confidence"])
+        if "standard_deviation" in expected:
+          assert_equal(output_decisions["standard_deviation"][row],
+                       expected["standard_deviation"])
+
+def test_decide_batch_matches_interpreter():
+  states, columns = random_columns(decision_trees.RANDOM_CONFIGURATION, 500)
+  assert_true(any("invalid" in state.values() for state in states))
+  for tree_seed in range(10):
+    tree = decision_trees.random_tree(tree_seed)
+    decisions = craftai.pandas.Interpreter.decide_batch(tree, columns)
+    assert_decisions_match_interpreter(tree, states, decisions)
+
+def test_decide_batch_invalid_values():
+  states = [
+    {"presence": "gisele", "lightIntensity": 0.8, "time": 30.0, "day": 1, "tz": "+01:00"},
+    {"presence": 12, "lightIntensity": 0.8, "time": 12.0, "day": 1, "tz": "+01:00"},
+    {"presence": "robert", "lightIntensity": "high", "time": 12.0, "day": 1.0, "tz": "Paris"},
+    {"presence": "robert", "lightIntensity": 0.8, "time": 12.0, "day": 7, "tz": "+01:00"},
+    {"presence": "robert", "lightIntensity": 0.8, "time": 12.0, "day": 1, "tz": "+01:00"},
+    {"presence": True, "lightIntensity": True, "time": 12, "day": 1, "tz": "+01:00"}
+  ]
+  columns = {
+    prop_name: [state[prop_name] for state in states]
+    for prop_name in ["presence", "lightIntensity", "time", "day", "tz"]
+  }
+  tree = decision_trees.LIGHTBULB_TREE
+  decisions = craftai.pandas.Interpreter.decide_batch(tree, columns)
+  assert_equal(decisions["lightbulbColor"]["error"][0],
+               "Unable to take decision, the given context is not valid: '30.0' is not a valid"
+               " value for property 'time' of type 'time_of_day'.")
+  assert_decisions_match_interpreter(tree, states, decisions)
+
+  # Typed columns
+  df = pd.DataFrame({
+    "presence": ["robert", "gisele", "none"],
+    "lightIntensity": [0.2, 0.8, 0.5],
+    "time": [12.5, 24.0, -1.0],
+    "day": [1, 7, 0],
+    "tz": ["+01:00", "+01:00", "CEST"]
+  })
+  states = df.to_dict("records")
+  assert_decisions_match_interpreter(tree, [
+    dict(state, day=int(state["day"])) for state in states
+  ], craftai.pandas.Interpreter.decide_batch(tree, df))
+
+def test_decide_batch_time_indexed_df():
+  df = pd.DataFrame(
+    [
+      ["robert", 0.2, "+02:00"],
+      ["robert", 0.2, "+02:00"],
+      ["gisele", 0.2, "+02:00"],
+      ["none", 0.8, "+02:00"]
+    ],
+    columns=["presence", "lightIntensity", "tz"],
+    index=pd.DatetimeIndex([
+      "2016-03-23T06:00:00", "2016-03-23T09:00:00", "2016-03-26T12:00:00", "2016-03-27T12:00:00"
+    ]).tz_localize("Europe/Paris")
+  )
+  decisions = craftai.pandas.Interpreter.decide_batch(decision_trees.LIGHTBULB_TREE, df)
+
+  assert_equal(decisions["lightbulbColor"]["predicted_value"].tolist(),
+               ["blue", "green", "red", "black"])
+  assert_equal(decisions["lightbulbColor"]["error"].tolist(), [None, None, None, None])
+  assert_equal(decisions["lightbulbIntensity"]["predicted_value"].tolist(),
+               [0.75, 0.75, 0.25, 0.25])
+  assert_equal(decisions["lightbulbIntensity"]["standard_deviation"].tolist(),
+               [0.125, 0.125, 0.5, 0.5])
+
+def test_decide_batch_missing_values():
+  decisions = craftai.pandas.Interpreter.decide_batch(decision_trees.LIGHTBULB_TREE, {
+    "presence": ["gisele", None],
+    "lightIntensity": [0.8, 0.2],
+    "time": [12, 12],
+    "day": [1, 1],
+    "tz": ["+01:00", "+01:00"]
+  })
+
+  assert_equal(decisions["lightbulbColor"]["error"].tolist(), [
+    "Unable to take decision: the decision tree has no valid predicted value for the given"
+    " context.",
+    "Unable to take decision, the given context is not valid: expected property 'presence'"
+    " is not defined."
+  ])
+  assert_equal(decisions["lightbulbIntensity"]["predicted_value"][0], 0.75)
+
+def test_leaves_masks_partition_rows():
+  states, columns = random_columns(decision_trees.RANDOM_CONFIGURATION, 500)
+  for tree_seed in range(10):
+    tree = decision_trees.random_tree(tree_seed)
+    compiled_tree = craftai.Interpreter.compile(tree)
+    decisions = craftai.pandas.Interpreter.decide_batch(compiled_tree, columns)
+    outputs_leaves = craftai.pandas.Interpreter.leaves_masks(compiled_tree, columns)
+    for output_name in tree["configuration"]["output"]:
+      leaf_indices = decisions[output_name]["leaf_index"]
+      for leaf_index, leaf, mask in outputs_leaves[output_name]:
+        assert_equal(mask.tolist(), (leaf_indices == leaf_index).tolist())
+        for row in np.flatnonzero(mask):
+          expected = expected_output_decision(tree, output_name, dict(states[row]))
+          if not isinstance(expected, str):
+            assert_equal(leaf, expected)
+
+def test_leaves_masks_time_indexed_df():
+  df = pd.DataFrame(
+    [["robert", 0.2], ["robert", 0.2], ["gisele", 0.2], [None, 0.8]],
+    columns=["presence", "lightIntensity"],
+    index=pd.DatetimeIndex([
+      "2016-03-23T06:00:00", "2016-03-23T09:00:00", "2016-03-26T12:00:00", "2016-03-27T12:00:00"
+    ]).tz_localize("Europe/Paris")
+  )
+  outputs_leaves = craftai.pandas.Interpreter.leaves_masks(decision_trees.LIGHTBULB_TREE, df)
+  decisions = craftai.pandas.Interpreter.decide_batch(decision_trees.LIGHTBULB_TREE, df)
+
+  rows_leaves = [
+    [leaf["predicted_value"] for _, leaf, mask in outputs_leaves["lightbulbColor"] if mask[row]]
+    for row in range(len(df.index))
+  ]
+  assert_equal(rows_leaves, [["blue"], ["green"], ["red"], []])
+  assert_equal(decisions["lightbulbColor"]["leaf_index"][3], -1)
+
+def test_decide_from_contexts_df_n_jobs():
+  df = pd.DataFrame(
+    {
+      "presence": ["robert", "gisele", "none", "robert"] * 6 + ["none"] * 6,
+      "lightIntensity": np.linspace(0, 1, 30)
+    },
+    index=pd.date_range("2016-03-23", periods=30, freq="7h", tz="Europe/Paris")
+  )
+  tree = decision_trees.LIGHTBULB_TREE
+  expected = craftai.pandas.Interpreter.decide_from_contexts_df(tree, df)
+  for n_jobs in [2, 3, -1]:
+    decisions = craftai.pandas.Interpreter.decide_from_contexts_df(tree, df, n_jobs=n_jobs)
+    assert_equal(list(decisions.columns), list(expected.columns))
+    assert_true(decisions.equals(expected))
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from nose.tools import assert_equal
+
+import craftai.pandas
+
+from craftai.pandas.operations import operations_chunks
+
+from .stub_server import StubServer
+
+def iterrows_operations(df):
+  return [
+    {
+      "timestamp": row.name.value // 10 ** 9,
+      "context": {col: row[col] for col in df.columns if pd.notnull(row[col])}
+    } for _, row in df.iterrows()
+  ]
+
+def column_values(series):
+  return [None if pd.isnull(value) else value for value in series.tolist()]
+
+def random_df(rows_count):
+  #pylint: disable=E1101
+  rng = np.random.RandomState(0)
+  #pylint: enable=E1101
+  df = pd.DataFrame({
+    "continuous": rng.randn(rows_count),
+    "enum": rng.choice(["CYAN", "MAGENTA", "YELLOW"], rows_count),
+    "tz": "+02:00"
+  }, index=pd.date_range("2016-03-23", periods=rows_count, freq="17min", tz="Europe/Paris"))
+  df.loc[rng.rand(rows_count) < 0.2, "continuous"] = np.nan
+  df.loc[rng.rand(rows_count) < 0.2, "enum"] = None
+  return df
+
+def test_operations_chunks_matches_iterrows():
+  df = random_df(1000)
+  chunks = list(operations_chunks(df, 300))
+
+  assert_equal([offset for offset, _ in chunks], [0, 300, 600, 900])
+  assert_equal([operation for _, chunk in chunks for operation in chunk],
+               iterrows_operations(df))
+
+def test_operations_chunks_without_columns():
+  df = pd.DataFrame(index=pd.date_range("2016-03-23", periods=3, freq="1min"))
+  assert_equal(list(operations_chunks(df, 2)), [
+    (0, [{"timestamp": 1458691200, "context": {}}, {"timestamp": 1458691260, "context": {}}]),
+    (2, [{"timestamp": 1458691320, "context": {}}])
+  ])
+
+def test_add_operations_df():
+  df = random_df(500)
+  with StubServer() as server:
+    with craftai.pandas.Client(server.client_cfg) as client:
+      client.create_agent({"context": {}, "output": []}, "agent")
+      client.add_operations("agent", df)
+
+    assert_equal(len(server.requests_to("POST", "/context")), 3)
+    assert_equal(server.agents["agent"]["operations"], iterrows_operations(df))
+
+FRAME_CONFIGURATION = {
+  "context": {
+    "continuous": {"type": "continuous"},
+    "enum": {"type": "enum"},
+    "tz": {"type": "timezone"},
+    "day": {"type": "day_of_week"}
+  },
+  "output": ["enum"],
+  "time_quantum": 100
+}
+
+def test_get_operations_list_and_state_history_df():
+  df = random_df(250)
+  df["day"] = np.arange(250) % 7
+  with StubServer(page_size=7) as server:
+    with craftai.pandas.Client(server.client_cfg) as client:
+      client.create_agent(FRAME_CONFIGURATION, "agent")
+      client.add_operations("agent", df)
+      operations_df = client.get_operations_list("agent")
+      operations = server.agents["agent"]["operations"]
+      states_df = client.get_state_history("agent", None, operations[99]["timestamp"])
+
+  expected_df = pd.DataFrame(
+    [operation["context"] for operation in operations],
+    index=pd.to_datetime([operation["timestamp"] for operation in operations], unit="s")
+  )
+  assert_equal(list(operations_df.columns), ["continuous", "enum", "tz", "day"])
+  assert_equal(operations_df.dtypes.astype(str).tolist(),
+               ["float64", "category", "category", "float64"])
+  assert_equal(operations_df.index.tolist(), expected_df.index.tolist())
+  for column in operations_df.columns:
+    assert_equal(column_values(operations_df[column]), column_values(expected_df[column]))
+  assert_equal(len(states_df), 100)
+  assert_equal(states_df["enum"].tolist()[:10], operations_df["enum"].tolist()[:10])
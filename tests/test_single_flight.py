@@ -0,0 +1,90 @@
+import functools
+import threading
+
+from nose.tools import assert_equal, assert_is, assert_true
+
+import craftai
+
+from craftai.single_flight import SingleFlight
+
+from .data import decision_trees
+from .stub_server import StubServer
+
+def run_concurrently(function, count):
+  start = threading.Event()
+  outcomes = [None] * count
+
+  def run(index):
+    start.wait()
+    try:
+      outcomes[index] = function()
+    except BaseException as e: #pylint: disable=W0703
+      outcomes[index] = e
+
+  threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+  for thread in threads:
+    thread.start()
+  start.set()
+  for thread in threads:
+    thread.join()
+  return outcomes
+
+def test_single_flight_shares_results_and_errors():
+  flights = SingleFlight()
+  release = threading.Event()
+  calls = []
+
+  def slow_call(value):
+    calls.append(value)
+    release.wait()
+    if value == "error":
+      raise ValueError(value)
+    return [value]
+
+  for value in ["result", "error"]:
+    del calls[:]
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    flight = functools.partial(flights.run, ("key", value), slow_call, value)
+    outcomes = run_concurrently(flight, 10)
+    timer.join()
+    release.clear()
+
+    assert_equal(calls, [value])
+    assert_true(all(outcome is outcomes[0] for outcome in outcomes))
+  assert_true(isinstance(outcomes[0], ValueError))
+
+class Interruption(BaseException):
+  pass
+
+def test_single_flight_shares_interruptions():
+  flights = SingleFlight()
+  release = threading.Event()
+  calls = []
+
+  def interrupted_call():
+    calls.append(None)
+    release.wait()
+    raise Interruption()
+
+  timer = threading.Timer(0.2, release.set)
+  timer.start()
+  outcomes = run_concurrently(functools.partial(flights.run, "key", interrupted_call), 10)
+  timer.join()
+
+  assert_equal(len(calls), 1)
+  assert_true(all(isinstance(outcome, Interruption) for outcome in outcomes))
+  assert_equal(flights.run("key", lambda: "result"), "result")
+
+def test_concurrent_get_decision_tree_polls_once():
+  with StubServer(tree=decision_trees.LIGHTBULB_TREE, pending_trees=3) as server:
+    cfg = server.client_cfg
+    cfg["decisionTreeRetrievalInitialDelay"] = 50
+    with craftai.Client(cfg) as client:
+      client.create_agent(decision_trees.LIGHTBULB_CONFIGURATION, "agent")
+      trees = run_concurrently(lambda: client.get_decision_tree("agent", 1464600000), 20)
+
+      assert_equal(len(server.requests_to("GET", "/decision/tree")), 4)
+      assert_equal(trees[0], decision_trees.LIGHTBULB_TREE)
+      for tree in trees:
+        assert_is(tree, trees[0])
@@ -1,6 +1,9 @@
 import unittest
 
-from craftai import Time
+from datetime import datetime, timedelta
+
+from craftai import Time, errors as craft_err
+from craftai.time import dt_timezone
 
 class TestTime(unittest.TestCase):
 
@@ -10,3 +13,38 @@ class TestTime(unittest.TestCase):
     self.assertEqual(Time(timezone="+0100").timezone, "+01:00")
     self.assertEqual(Time(timezone="+01").timezone, "+01:00")
     self.assertEqual(Time(timezone="CST").timezone, "-06:00")
+
+  def test_to_dict(self):
+    self.assertEqual(Time(1458741230, "+02:00").to_dict(), {
+      "timestamp": 1458741230,
+      "timezone": "+02:00",
+      "time_of_day": 15 + 53 / 60 + 50 / 3600,
+      "day_of_week": 2,
+      "day_of_month": 23,
+      "month_of_year": 3,
+      "utc_iso": "2016-03-23T15:53:50+02:00"
+    })
+    self.assertEqual(Time("2016-03-23T15:53:50+0200").to_dict(),
+                     Time(1458741230, "+02:00").to_dict())
+
+  def test_from_timestamp(self):
+    self.assertEqual(Time.from_timestamp(1458741230, "CET").to_dict(),
+                     Time(1458741230, "CET").to_dict())
+    self.assertEqual(Time.from_timestamp(1458741230).to_dict(), Time(1458741230).to_dict())
+    time = Time.from_timestamp(1458741230.75, "+02:00")
+    self.assertEqual(time.timestamp, 1458741230.75)
+    self.assertEqual(time.to_dict()["timestamp"], 1458741230)
+    self.assertRaises(craft_err.CraftAiTimeError, Time.from_timestamp, 1e20)
+
+  def test_from_datetime(self):
+    date_time = datetime(2016, 3, 23, 15, 53, 50, tzinfo=dt_timezone(timedelta(hours=2)))
+    self.assertEqual(Time.from_datetime(date_time).to_dict(),
+                     Time(1458741230, "+02:00").to_dict())
+    self.assertEqual(Time.from_datetime(date_time, "-05:00").to_dict(),
+                     Time(1458741230, "-05:00").to_dict())
+    naive_date_time = datetime.fromtimestamp(1458741230)
+    self.assertEqual(Time.from_datetime(naive_date_time).to_dict(), Time(1458741230).to_dict())
+
+  def test_invalid_timezone(self):
+    self.assertRaises(craft_err.CraftAiTimeError, Time, 1458741230, "+02:0")
+    self.assertRaises(craft_err.CraftAiTimeError, Time, 1458741230, ["+02:00"])
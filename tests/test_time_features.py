@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytz
+
+from nose.tools import assert_equal, assert_raises
+
+from craftai import Time, errors as craft_err
+from craftai.time import time_features
+
+# numpy's members are not inferred
+#pylint: disable=E1101
+
+TIMESTAMPS = np.concatenate([
+  np.random.RandomState(0).randint(-2500000000, 4000000000, 2000),
+  # Around the daylight saving time changes of Europe/Paris in 2017
+  [0, -1, 1458741230, 1509238800, 1509242399, 1509242400, 1521939600]
+])
+
+GENERATED_TYPES = ["time_of_day", "day_of_week", "day_of_month", "month_of_year", "timezone"]
+
+def assert_features_equal(features, timestamps, timezones):
+  times = [Time.from_timestamp(int(timestamp), timezone).to_dict()
+           for timestamp, timezone in zip(timestamps, timezones)]
+  for generated_type in GENERATED_TYPES:
+    assert_equal(list(features[generated_type]), [time[generated_type] for time in times])
+
+def test_time_features_match_time():
+  datetimes = TIMESTAMPS.astype("datetime64[s]")
+  for timezone in ["+02:00", "CET", "-09:30", pytz.timezone("Europe/Paris"),
+                   pytz.timezone("Asia/Kolkata")]:
+    assert_features_equal(time_features(datetimes, timezone),
+                          TIMESTAMPS, [timezone] * len(TIMESTAMPS))
+
+def test_time_features_local_timezone():
+  assert_features_equal(time_features(TIMESTAMPS.astype("datetime64[s]")),
+                        TIMESTAMPS, [""] * len(TIMESTAMPS))
+
+def test_time_features_datetime_index():
+  index = pd.to_datetime(TIMESTAMPS, unit="s", utc=True).tz_convert("America/New_York")
+  assert_features_equal(time_features(index), TIMESTAMPS, [index.tz] * len(TIMESTAMPS))
+
+def test_time_features_timezone_per_time():
+  timezones = ["+02:00", None, pytz.timezone("Europe/Paris"), "PST"] * (len(TIMESTAMPS) // 4)
+  timestamps = TIMESTAMPS[:len(timezones)]
+  assert_features_equal(time_features(pd.to_datetime(timestamps, unit="s"), timezones),
+                        timestamps, timezones)
+
+def test_time_features_invalid_times():
+  assert_raises(craft_err.CraftAiTimeError, time_features, TIMESTAMPS)
+  assert_raises(craft_err.CraftAiTimeError, time_features,
+                pd.DatetimeIndex(["2017-01-01", None]))
+  assert_raises(craft_err.CraftAiTimeError, time_features,
+                TIMESTAMPS.astype("datetime64[s]"), ["+02:00"])